@@ -1,16 +1,68 @@
+from __future__ import annotations
+
 from dataclasses import dataclass
 import re
 import logging
 import datetime
-from aiohttp import ClientSession
-from aiohttp.http_exceptions import HttpBadRequest
+import importlib
+import time
+from typing import TYPE_CHECKING
+
+from .monitor import operation, phase
+
+if TYPE_CHECKING:
+    from aiohttp import ClientSession
+    from aiohttp.http_exceptions import HttpBadRequest
+
+    from .counters import CounterRecovery
+    from .hedging import HedgePolicy
+    from .ratelimit import FleetRateLimiter
+    from .request_queue import RequestQueue
+    from .transport import AiohttpTransport, RequestTimeout, Transport, probe_port
 
 _LOGGER = logging.getLogger(__name__)
 
+# The HTTP stack (aiohttp, asyncio) is only imported when it is first needed, so that tools using
+# just the result types or the debounce logic start quickly. The names stay importable from the
+# package through `__getattr__` (PEP 562).
+_LAZY_IMPORTS = {
+    "ClientSession": "aiohttp",
+    "HttpBadRequest": "aiohttp.http_exceptions",
+    "HedgePolicy": ".hedging",
+    "FleetRateLimiter": ".ratelimit",
+    "RequestQueue": ".request_queue",
+    "AiohttpTransport": ".transport",
+    "RequestTimeout": ".transport",
+    "Transport": ".transport",
+    "probe_port": ".transport",
+}
+
+
+def __getattr__(name: str):
+    module = _LAZY_IMPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
 class InverterReturnedError(Exception):
     pass
 
 
+class InverterHTTPError(InverterReturnedError):
+    """The inverter answered with an HTTP status other than 200."""
+
+    def __init__(self, status: int) -> None:
+        super().__init__(f"HTTP Error: {status}")
+        self.status = status
+
+
+class InverterUnreachableError(Exception):
+    pass
+
+
 @dataclass
 class ReturnDeviceInfo:
     deviceId: str
@@ -68,11 +120,21 @@ class APsystemsEZ1M:
         self,
         ip_address: str,
         port: int = 8050,
-        timeout: int = 10,
+        timeout: int | RequestTimeout = 10,
         max_power: int = 800,
         min_power: int = 30,
         session: ClientSession | None = None,
         enable_debounce: bool = False,
+        max_in_flight: int | None = 1,
+        transport: Transport | None = None,
+        endpoint_timeouts: dict[str, int | RequestTimeout] | None = None,
+        probe_reachability: bool = False,
+        probe_timeout: float = 0.5,
+        probe_interval: float = 30.0,
+        hedge: HedgePolicy | None = None,
+        rate_limiter: FleetRateLimiter | None = None,
+        counter_recovery: CounterRecovery | None = None,
+        counter_key: str | None = None,
     ) -> None:
         """
         Initializes a new instance of the EZ1Microinverter class with the specified IP address
@@ -81,15 +143,58 @@ class APsystemsEZ1M:
         :param ip_address: The IP address of the EZ1 Microinverter.
         :param port: The port on which the microinverter's server is running. Default is 8050.
         :param timeout: The timeout for all requests. The default of 10 seconds should be plenty.
+                        A `RequestTimeout` sets separate connect, first-byte and total timeouts.
+        :param max_in_flight: Maximum number of concurrent requests to the device, further requests
+                              are queued (see `RequestQueue`). None disables the queue.
+        :param transport: The transport requests are sent with, e.g. the lightweight
+                          `RawHTTPTransport` or a `RecordingTransport`. Default is an
+                          `AiohttpTransport` using `session`.
+        :param endpoint_timeouts: Timeouts of single endpoints (without query), overriding
+                                  `timeout`, e.g. `{"setMaxPower": 30}` to give writes more time.
+        :param probe_reachability: After a failed request, check with a cheap TCP connect whether
+                                   the device is reachable at all before sending the next request.
+                                   While it is not, requests fail immediately with an
+                                   `InverterUnreachableError`.
+        :param probe_timeout: Seconds to wait for the TCP connect of the reachability probe.
+        :param probe_interval: Seconds an unreachable device is not probed again.
+        :param hedge: Hedge slow reads with a second request, see `HedgePolicy`. Off by default.
+        :param rate_limiter: A `FleetRateLimiter` shared by all clients of a site, consulted
+                             before every request.
+        :param counter_recovery: A `CounterRecovery`, e.g. shared by all clients of a site, that
+                                 keeps the energy counters of `get_output_data` monotonic across
+                                 counter resets, lifetime energy included.
+        :param counter_key: The name of the device in `counter_recovery`. Default is its IP address.
         """
+        self.ip_address = ip_address
+        self.port = port
         self.base_url = f"http://{ip_address}:{port}"
         self.timeout = timeout
+        self.endpoint_timeouts = endpoint_timeouts or {}
+        self.probe_reachability = probe_reachability
+        self.probe_timeout = probe_timeout
+        self.probe_interval = probe_interval
+        self._reachable = True
+        self._unreachable_until = 0.0
+        self.hedge = hedge
+        self.rate_limiter = rate_limiter
+        self.counter_recovery = counter_recovery
+        self.counter_key = counter_key or ip_address
         self.session = session
         self.max_power = max_power
         self.min_power = min_power
         self.enable_debounce = enable_debounce
         self._e1 = self._DebounceVal()
         self._e2 = self._DebounceVal()
+        self.request_queue = None
+        if max_in_flight:
+            from .request_queue import RequestQueue  # pylint: disable=import-outside-toplevel
+
+            self.request_queue = RequestQueue(max_in_flight)
+        if transport is None:
+            from .transport import AiohttpTransport  # pylint: disable=import-outside-toplevel
+
+            transport = AiohttpTransport(session)
+        self.transport = transport
 
     async def _request(self, endpoint: str, retry: int = 3) -> dict | None:
         """
@@ -102,30 +207,74 @@ class APsystemsEZ1M:
         :return: The JSON response from the microinverter as a dictionary.
         :raises: Prints an error message if the HTTP request fails for any reason.
         """
+        if self.request_queue is not None:
+            return await self.request_queue.submit(
+                endpoint,
+                lambda: self._send(endpoint, retry),
+                write=endpoint.startswith("set"),
+            )
+        return await self._send(endpoint, retry)
+
+    async def _check_reachable(self) -> None:
+        """Fails fast if the last request failed and the device does not accept connections."""
+        if self._reachable:
+            return
+        if time.monotonic() < self._unreachable_until:
+            raise InverterUnreachableError(f"{self.base_url} is unreachable")
+        from .transport import probe_port  # pylint: disable=import-outside-toplevel
+
+        if not await probe_port(self.ip_address, self.port, self.probe_timeout):
+            self._unreachable_until = time.monotonic() + self.probe_interval
+            raise InverterUnreachableError(f"{self.base_url} is unreachable")
+        self._reachable = True
+
+    async def _reserve_hedge(self) -> bool:
+        """Admits a hedged request within the device's request cap and the fleet rate limit."""
+        if self.request_queue is not None and not self.request_queue.try_reserve():
+            return False
+        try:
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire(self.ip_address)
+        except BaseException:
+            if self.request_queue is not None:
+                self.request_queue.release()
+            raise
+        return True
+
+    async def _send(self, endpoint: str, retry: int = 3) -> dict | None:
+        """Sends a request to the device right away, see `_request`."""
+        timeout = self.endpoint_timeouts.get(endpoint.partition("?")[0], self.timeout)
+        if self.probe_reachability:
+            await self._check_reachable()
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire(self.ip_address)
         url = f"{self.base_url}/{endpoint}"
-        if self.session is None:
-            ses = ClientSession()
-        else:
-            ses = self.session
         try:
-            async with ses.get(url, timeout=self.timeout) as resp:
-                data = await resp.json()
-                _LOGGER.debug("%s: %s", endpoint, data)
-
-                # Handle response
-                if resp.status != 200:
-                    raise HttpBadRequest(f"HTTP Error: {resp.status}")
-                if data["message"] == "SUCCESS":
-                    return data
-                if retry > 0:  # Re-run request when the inverter returned failed because of unknown reason
-                    _LOGGER.debug(f"The request to {endpoint} failed. Retrying (retry count: {retry})...")
-                    return await self._request(endpoint, retry=retry - 1)
-                raise InverterReturnedError
-        finally:
-            # Close if session created on per-execution base
-
-            if self.session is None:
-                await ses.close()
+            with operation(self.ip_address, endpoint), phase("request"):
+                if self.hedge is not None and endpoint.startswith("get"):
+                    status, data = await self.hedge.get(
+                        self.transport,
+                        url,
+                        timeout,
+                        self._reserve_hedge,
+                        self.request_queue.release if self.request_queue is not None else None,
+                    )
+                else:
+                    status, data = await self.transport.get(url, timeout)
+        except Exception:
+            self._reachable = False
+            raise
+        _LOGGER.debug("%s: %s", endpoint, data)
+
+        # Handle response
+        if status != 200:
+            raise InverterHTTPError(status)
+        if data["message"] == "SUCCESS":
+            return data
+        if retry > 0:  # Re-run request when the inverter returned failed because of unknown reason
+            _LOGGER.debug(f"The request to {endpoint} failed. Retrying (retry count: {retry})...")
+            return await self._send(endpoint, retry=retry - 1)
+        raise InverterReturnedError
 
     def _debounce(self, state: _DebounceVal, new_state: float) -> float:
         """Recover total value in case state is reset during a day."""
@@ -138,9 +287,10 @@ class APsystemsEZ1M:
 
         state.old_state = new_state
 
-        # reset basis each day
-        if state.last_update != datetime.datetime.now().day:
-            state.last_update = datetime.datetime.now().day
+        # reset basis each day (compare whole dates, a pause may span several days)
+        today = datetime.datetime.now().toordinal()
+        if state.last_update != today:
+            state.last_update = today
             state.base_state = 0.0
 
         if isinstance(new_state, float):
@@ -148,6 +298,11 @@ class APsystemsEZ1M:
 
         return new_state
 
+    def reset_debounce(self) -> None:
+        """Forgets the debounce state, e.g. before resuming polling after a night without polls."""
+        self._e1 = self._DebounceVal()
+        self._e2 = self._DebounceVal()
+
     async def get_device_info(self) -> ReturnDeviceInfo | None:
         """
         Retrieves detailed information about the device. This method sends a request to the
@@ -244,12 +399,17 @@ class APsystemsEZ1M:
             }
 
         if self.enable_debounce and response:
-            response["data"].update(
-                {
-                    "e1": self._debounce(self._e1, response["data"]["e1"]),
-                    "e2": self._debounce(self._e2, response["data"]["e2"]),
-                }
-            )
+            with phase("debounce"):
+                response["data"].update(
+                    {
+                        "e1": self._debounce(self._e1, response["data"]["e1"]),
+                        "e2": self._debounce(self._e2, response["data"]["e2"]),
+                    }
+                )
+
+        if self.counter_recovery is not None and response:
+            with phase("debounce"):
+                response["data"].update(self.counter_recovery.correct(self.counter_key, response["data"]))
 
         return ReturnOutputData(**response["data"]) if response else None
 
@@ -0,0 +1,94 @@
+import argparse
+import asyncio
+import logging
+
+from . import APsystemsEZ1M
+
+
+def _parse_intervals(values: list[str]) -> dict[str, float]:
+    """Parses `--interval` values; raises ValueError with a message for the user."""
+    from .gateway import DEFAULT_POLL_INTERVALS
+
+    intervals = {}
+    for value in values:
+        endpoint, _, seconds = value.partition("=")
+        if endpoint not in DEFAULT_POLL_INTERVALS:
+            expected = ", ".join(DEFAULT_POLL_INTERVALS)
+            raise ValueError(f"--interval: unknown endpoint '{endpoint}', expected one of {expected}")
+        try:
+            intervals[endpoint] = float(seconds)
+        except ValueError:
+            raise ValueError(f"--interval: expected ENDPOINT=SECONDS, got '{value}'") from None
+        if not intervals[endpoint] > 0:
+            raise ValueError(f"--interval: seconds must be positive, got '{value}'")
+    return intervals
+
+
+async def _run_gateway(args: argparse.Namespace, intervals: dict[str, float]) -> None:
+    from .gateway import Gateway
+
+    ez1m = APsystemsEZ1M(args.inverter, port=args.inverter_port, timeout=args.timeout)
+    gateway = Gateway(
+        ez1m,
+        host=args.host,
+        port=args.port,
+        poll_intervals=intervals,
+    )
+    await gateway.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await gateway.stop()
+
+
+async def _run_discover(args: argparse.Namespace) -> None:
+    from .discovery import discover
+
+    found = await discover(args.network, port=args.port, connect_timeout=args.connect_timeout)
+    for device_id, info in sorted(found.items()):
+        print(f"{device_id}\t{info.ipAddr}\t{info.devVer}")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m APsystemsEZ1")
+    parser.add_argument("-v", "--verbose", action="store_true", help="enable debug logging")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    gateway = commands.add_parser(
+        "gateway", help="serve one inverter to many clients from a shared cache"
+    )
+    gateway.add_argument("inverter", help="IP address of the EZ1 inverter")
+    gateway.add_argument("--inverter-port", type=int, default=8050)
+    gateway.add_argument("--timeout", type=int, default=10)
+    gateway.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    gateway.add_argument("--port", type=int, default=8050, help="port to listen on")
+    gateway.add_argument(
+        "--interval",
+        action="append",
+        default=[],
+        metavar="ENDPOINT=SECONDS",
+        help="poll interval of a read endpoint, e.g. getOutputData=2",
+    )
+
+    discover = commands.add_parser("discover", help="find EZ1 inverters in a subnet")
+    discover.add_argument("network", help="the subnet to scan, e.g. 192.168.1.0/24")
+    discover.add_argument("--port", type=int, default=8050)
+    discover.add_argument("--connect-timeout", type=float, default=0.3)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO)
+    if args.command == "gateway":
+        try:
+            intervals = _parse_intervals(args.interval)
+        except ValueError as exc:
+            gateway.error(str(exc))
+        try:
+            asyncio.run(_run_gateway(args, intervals))
+        except KeyboardInterrupt:
+            pass
+    elif args.command == "discover":
+        asyncio.run(_run_discover(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+import ipaddress
+import statistics
+from array import array
+from dataclasses import dataclass
+from typing import Any, Mapping, Sequence
+
+from . import ReturnOutputData
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None
+
+_FIELDS = ("p1", "e1", "te1", "p2", "e2", "te2")
+_P1, _E1, _TE1, _P2, _E2, _TE2 = range(6)
+
+
+@dataclass
+class FleetTotals:
+    power: float
+    energy_today: float
+    energy_lifetime: float
+    reporting: int
+
+
+class FleetReadings:
+    """The latest output data of a fleet in contiguous arrays, for fast site-wide statistics.
+
+    Readings are stored column by column (p1, e1, te1, p2, e2, te2), one row per device. With
+    NumPy installed the statistics are computed in vectorized passes; without it the same results
+    are computed over `array.array` columns in plain Python.
+
+    Devices that have not reported yet, or whose last poll failed, are left out of all statistics.
+    """
+
+    def __init__(
+        self,
+        devices: Sequence[str] = (),
+        tags: Mapping[str, str] | None = None,
+        addresses: Mapping[str, str] | None = None,
+        use_numpy: bool | None = None,
+    ) -> None:
+        """
+        :param devices: The names of the devices. Unknown devices are added on their first update.
+        :param tags: A tag per device name for `sum_by_tag`, e.g. a roof or a string.
+        :param addresses: The IP address per device name for `sum_by_subnet`.
+        :param use_numpy: Use NumPy. Defaults to whether NumPy is installed.
+        """
+        if use_numpy and np is None:
+            raise ImportError("NumPy is not installed")
+        self._np = np if use_numpy is not False else None
+        self.devices: list[str] = []
+        self._index: dict[str, int] = {}
+        self._tags: list[str | None] = []
+        self._addresses: list[str | None] = []
+        self._codes: dict[Any, tuple[Any, list[str]]] = {}
+        if self._np is not None:
+            self._values = self._np.zeros((6, 16))
+            self._valid = self._np.zeros(16, dtype=bool)
+        else:
+            self._values = [array("d") for _ in _FIELDS]
+            self._valid = bytearray()
+        for device in devices:
+            self.add(device, (tags or {}).get(device), (addresses or {}).get(device))
+
+    def __len__(self) -> int:
+        return len(self.devices)
+
+    def add(self, device: str, tag: str | None = None, address: str | None = None) -> int:
+        """Adds a device and returns its row."""
+        if device in self._index:
+            raise ValueError(f"{device} is already known")
+        row = self._index[device] = len(self.devices)
+        self.devices.append(device)
+        self._tags.append(tag)
+        self._addresses.append(address)
+        self._codes.clear()
+        if self._np is not None:
+            if row == self._valid.shape[0]:
+                self._values = self._np.concatenate((self._values, self._np.zeros_like(self._values)), axis=1)
+                self._valid = self._np.concatenate((self._valid, self._np.zeros_like(self._valid)))
+        else:
+            for column in self._values:
+                column.append(0.0)
+            self._valid.append(0)
+        return row
+
+    def update(self, device: str, data: ReturnOutputData | None) -> None:
+        """Stores the latest output data of a device. None marks the device as not reporting."""
+        row = self._index.get(device)
+        if row is None:
+            row = self.add(device)
+        if data is None:
+            self._valid[row] = False
+            return
+        for column, field in enumerate(_FIELDS):
+            self._values[column][row] = getattr(data, field)
+        self._valid[row] = True
+
+    def on_result(self, device: str, method: str, value: Any) -> None:
+        """A `PollScheduler` result callback that stores output data."""
+        if method == "get_output_data":
+            self.update(device, value)
+
+    def _power(self):
+        """Total power per device (p1 + p2), NaN for devices that do not report."""
+        n = len(self.devices)
+        if self._np is not None:
+            power = self._values[_P1, :n] + self._values[_P2, :n]
+            return self._np.where(self._valid[:n], power, self._np.nan)
+        p1, p2 = self._values[_P1], self._values[_P2]
+        return array("d", (p1[row] + p2[row] if self._valid[row] else float("nan") for row in range(n)))
+
+    def totals(self) -> FleetTotals:
+        """The total power (W) and energy (kWh) of all reporting devices."""
+        n = len(self.devices)
+        if self._np is not None:
+            valid = self._valid[:n]
+            sums = self._values[:, :n][:, valid].sum(axis=1)
+            return FleetTotals(
+                float(sums[_P1] + sums[_P2]),
+                float(sums[_E1] + sums[_E2]),
+                float(sums[_TE1] + sums[_TE2]),
+                int(valid.sum()),
+            )
+        rows = [row for row in range(n) if self._valid[row]]
+        sums = [sum(column[row] for row in rows) for column in self._values]
+        return FleetTotals(sums[_P1] + sums[_P2], sums[_E1] + sums[_E2], sums[_TE1] + sums[_TE2], len(rows))
+
+    def _group_codes(self, key: Any, labels: list[str | None]):
+        """Group numbers per row and the group names, cached until a device is added."""
+        if key not in self._codes:
+            names: dict[str, int] = {}
+            codes = [names.setdefault(label, len(names)) if label is not None else -1 for label in labels]
+            if self._np is not None:
+                codes = self._np.array(codes, dtype=self._np.intp)
+            self._codes[key] = (codes, list(names))
+        return self._codes[key]
+
+    def _sum_by(self, key: Any, labels: list[str | None]) -> dict[str, FleetTotals]:
+        codes, names = self._group_codes(key, labels)
+        n = len(self.devices)
+        if self._np is not None:
+            rows = self._valid[:n] & (codes >= 0)
+            grouped = codes[rows]
+            values = self._values[:, :n][:, rows]
+            sums = [self._np.bincount(grouped, weights=column, minlength=len(names)) for column in values]
+            counts = self._np.bincount(grouped, minlength=len(names))
+            return {
+                name: FleetTotals(
+                    float(sums[_P1][group] + sums[_P2][group]),
+                    float(sums[_E1][group] + sums[_E2][group]),
+                    float(sums[_TE1][group] + sums[_TE2][group]),
+                    int(counts[group]),
+                )
+                for group, name in enumerate(names)
+            }
+        groups = {name: [0.0] * 7 for name in names}
+        for row in range(n):
+            if codes[row] < 0 or not self._valid[row]:
+                continue
+            sums = groups[names[codes[row]]]
+            for column, values in enumerate(self._values):
+                sums[column] += values[row]
+            sums[6] += 1
+        return {
+            name: FleetTotals(sums[_P1] + sums[_P2], sums[_E1] + sums[_E2], sums[_TE1] + sums[_TE2], int(sums[6]))
+            for name, sums in groups.items()
+        }
+
+    def sum_by_tag(self) -> dict[str, FleetTotals]:
+        """Totals per tag. Devices without a tag are left out."""
+        return self._sum_by("tag", self._tags)
+
+    def sum_by_subnet(self, prefix: int = 24) -> dict[str, FleetTotals]:
+        """Totals per subnet, e.g. "192.168.1.0/24". Devices without an address are left out."""
+        subnets = [
+            str(ipaddress.ip_network(f"{address}/{prefix}", strict=False)) if address else None
+            for address in self._addresses
+        ]
+        return self._sum_by(("subnet", prefix), subnets)
+
+    def top(self, n: int = 10) -> list[tuple[str, float]]:
+        """The `n` reporting devices with the highest power, highest first."""
+        power = self._power()
+        if self._np is not None:
+            rows = self._np.flatnonzero(~self._np.isnan(power))
+            if len(rows) > n:
+                rows = rows[self._np.argpartition(-power[rows], n - 1)[:n]]
+            rows = rows[self._np.argsort(-power[rows], kind="stable")]
+            return [(self.devices[row], float(power[row])) for row in rows]
+        rows = [row for row in range(len(power)) if power[row] == power[row]]
+        rows.sort(key=lambda row: -power[row])
+        return [(self.devices[row], power[row]) for row in rows[:n]]
+
+    def median_power(self) -> float | None:
+        """The median power of the reporting devices."""
+        power = self._power()
+        if self._np is not None:
+            power = power[~self._np.isnan(power)]
+            return float(self._np.median(power)) if len(power) else None
+        power = [value for value in power if value == value]
+        return statistics.median(power) if power else None
+
+    def underperformers(self, ratio: float = 0.5) -> list[tuple[str, float]]:
+        """
+        The reporting devices producing less than `ratio` times the fleet median power, lowest
+        first. Useful to spot shaded, soiled or failing panels while the fleet produces.
+        """
+        median = self.median_power()
+        if not median:
+            return []
+        power = self._power()
+        if self._np is not None:
+            rows = self._np.flatnonzero(power < ratio * median)
+            rows = rows[self._np.argsort(power[rows], kind="stable")]
+            return [(self.devices[row], float(power[row])) for row in rows]
+        rows = sorted((row for row in range(len(power)) if power[row] < ratio * median), key=lambda row: power[row])
+        return [(self.devices[row], power[row]) for row in rows]
@@ -0,0 +1,180 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Literal, Mapping
+
+from . import APsystemsEZ1M
+
+_LOGGER = logging.getLogger(__name__)
+
+Status = Literal["verified", "unverified", "failed", "timeout"]
+
+
+@dataclass
+class WriteOutcome:
+    """The outcome of a bulk write on one inverter.
+
+    "verified": the device acknowledged the write and reads back the requested value (without
+    read-back: acknowledged the requested value).
+    "unverified": the device acknowledged the write, but reads back something else (`value`).
+    "failed": the last attempt raised `error` or was not acknowledged.
+    "timeout": the deadline passed before the write could be verified.
+    """
+
+    status: Status
+    value: Any = None
+    attempts: int = 0
+    elapsed: float = 0.0
+    error: str | None = None
+
+
+@dataclass
+class BulkWriteResult:
+    target: dict[str, Any]
+    outcomes: dict[str, WriteOutcome] = field(default_factory=dict)
+    elapsed: float = 0.0
+
+    @property
+    def verified(self) -> list[str]:
+        return [name for name, outcome in self.outcomes.items() if outcome.status == "verified"]
+
+    @property
+    def stragglers(self) -> list[str]:
+        """The inverters that are not verified."""
+        return [name for name, outcome in self.outcomes.items() if outcome.status != "verified"]
+
+    @property
+    def ok(self) -> bool:
+        return not self.stragglers
+
+
+class BulkWriter:
+    """Applies one command to many inverters at once, e.g. curtailment requested by the grid operator.
+
+    The writes are fanned out concurrently (at most `concurrency` at a time), each one is verified
+    by reading the value back (`getMaxPower`/`getOnOff`), and only the inverters that failed or
+    did not verify are retried, until all are verified, they ran out of attempts or the deadline
+    of the whole operation passed.
+    """
+
+    def __init__(
+        self,
+        inverters: Mapping[str, APsystemsEZ1M],
+        concurrency: int = 32,
+        deadline: float = 10.0,
+        attempts: int = 3,
+        retry_delay: float = 0.5,
+        verify: bool = True,
+    ) -> None:
+        """
+        :param inverters: The inverters of the site by name.
+        :param concurrency: Maximum number of inverters written to at the same time.
+        :param deadline: Seconds the whole operation may take, retries included.
+        :param attempts: Maximum number of writes per inverter.
+        :param retry_delay: Seconds to wait before retrying the stragglers.
+        :param verify: Read every written value back. Without, the value the device acknowledged
+                       is taken as its state.
+        """
+        self.inverters = dict(inverters)
+        self.concurrency = concurrency
+        self.deadline = deadline
+        self.attempts = attempts
+        self.retry_delay = retry_delay
+        self.verify = verify
+
+    async def _apply(
+        self, name: str, method: str, read_back: str, value: Any, outcome: WriteOutcome, started: float
+    ) -> None:
+        ez1m = self.inverters[name]
+        outcome.attempts += 1
+        try:
+            acknowledged = await getattr(ez1m, method)(value)
+            if acknowledged is None:
+                outcome.status, outcome.error = "failed", "not acknowledged"
+                return
+            outcome.value = await getattr(ez1m, read_back)() if self.verify else acknowledged
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:  # pylint: disable=broad-except
+            _LOGGER.debug("%s of %s failed: %s", method, name, exc)
+            outcome.status, outcome.error = "failed", repr(exc)
+            return
+        outcome.error = None
+        outcome.status = "verified" if outcome.value == value else "unverified"
+        outcome.elapsed = time.monotonic() - started
+
+    async def _write(
+        self, method: str, read_back: str, target: dict[str, Any], deadline: float | None
+    ) -> BulkWriteResult:
+        started = time.monotonic()
+        end = started + (self.deadline if deadline is None else deadline)
+        result = BulkWriteResult(target)
+        result.outcomes = {name: WriteOutcome("timeout") for name in target}
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def apply(name: str) -> None:
+            async with semaphore:
+                await self._apply(name, method, read_back, target[name], result.outcomes[name], started)
+
+        pending = list(target)
+        while pending:
+            tasks = [asyncio.create_task(apply(name)) for name in pending]
+            _, not_done = await asyncio.wait(tasks, timeout=max(0.0, end - time.monotonic()))
+            for task in not_done:
+                task.cancel()
+            await asyncio.gather(*not_done, return_exceptions=True)
+            if not_done:
+                for name, task in zip(pending, tasks):
+                    if task in not_done:
+                        result.outcomes[name].status = "timeout"
+                break
+            pending = [
+                name
+                for name in pending
+                if result.outcomes[name].status != "verified" and result.outcomes[name].attempts < self.attempts
+            ]
+            if pending:
+                if time.monotonic() + self.retry_delay >= end:
+                    break
+                await asyncio.sleep(self.retry_delay)
+
+        result.elapsed = time.monotonic() - started
+        return result
+
+    def _targets(self, value: Any, devices: Iterable[str] | None) -> dict[str, Any]:
+        if isinstance(value, Mapping):
+            return dict(value)
+        return {name: value for name in (self.inverters if devices is None else devices)}
+
+    async def set_max_power(
+        self,
+        power_limit: int | Mapping[str, int],
+        devices: Iterable[str] | None = None,
+        deadline: float | None = None,
+    ) -> BulkWriteResult:
+        """
+        Sets the power limit of many inverters.
+
+        :param power_limit: One limit in watts for all `devices`, or the limits by inverter name.
+        :param devices: The names of the inverters to write to. Default: all.
+        :param deadline: Seconds the operation may take, overriding `deadline` of the writer.
+        """
+        return await self._write("set_max_power", "get_max_power", self._targets(power_limit, devices), deadline)
+
+    async def set_device_power_status(
+        self,
+        power_status: bool | Mapping[str, bool],
+        devices: Iterable[str] | None = None,
+        deadline: float | None = None,
+    ) -> BulkWriteResult:
+        """
+        Switches many inverters on (True) or off (False).
+
+        :param power_status: One status for all `devices`, or the status by inverter name.
+        :param devices: The names of the inverters to write to. Default: all.
+        :param deadline: Seconds the operation may take, overriding `deadline` of the writer.
+        """
+        return await self._write(
+            "set_device_power_status", "get_device_power_status", self._targets(power_status, devices), deadline
+        )
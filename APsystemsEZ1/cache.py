@@ -0,0 +1,90 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Generic, TypeVar
+
+from . import APsystemsEZ1M, ReturnAlarmInfo, ReturnOutputData
+
+_LOGGER = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+@dataclass
+class CachedReading(Generic[T]):
+    value: T
+    age: float
+    stale: bool
+
+
+class StaleWhileRevalidate:
+    """Answers reads of an inverter immediately from the last good value.
+
+    A value younger than `max_age` is returned as is. An older value is returned right away,
+    flagged as `stale`, while a refresh runs in the background. Values older than
+    `max_staleness` are not returned anymore (the read yields None) until a refresh succeeds.
+    Only the very first read of a getter waits for the device.
+    """
+
+    def __init__(self, ez1m: APsystemsEZ1M, max_age: float = 5.0, max_staleness: float = 300.0) -> None:
+        """
+        :param ez1m: The inverter to read from.
+        :param max_age: Seconds a value is considered fresh.
+        :param max_staleness: Seconds after which a value is not returned anymore.
+        """
+        self.ez1m = ez1m
+        self.max_age = max_age
+        self.max_staleness = max_staleness
+        self._values: dict[str, tuple[float, Any]] = {}
+        self._refreshing: dict[str, asyncio.Task] = {}
+        self.refresh_errors = 0
+
+    async def _refresh(self, method: str) -> None:
+        try:
+            value = await getattr(self.ez1m, method)()
+        except Exception as exc:  # pylint: disable=broad-except
+            self.refresh_errors += 1
+            _LOGGER.debug("Refreshing %s failed: %s", method, exc)
+            return
+        if value is not None:
+            self._values[method] = (time.monotonic(), value)
+
+    def refresh(self, method: str) -> asyncio.Task:
+        """Starts a background refresh of a getter, unless one is already running."""
+        task = self._refreshing.get(method)
+        if task is None or task.done():
+            task = self._refreshing[method] = asyncio.create_task(self._refresh(method))
+        return task
+
+    async def get(self, method: str) -> CachedReading | None:
+        """
+        Reads a getter of `APsystemsEZ1M`, e.g. "get_output_data", through the cache.
+
+        :return: The last good value with its age in seconds, or None if there is no value that
+                 is younger than `max_staleness`.
+        """
+        if method not in self._values:
+            await asyncio.shield(self.refresh(method))
+            if method not in self._values:
+                return None
+        updated, value = self._values[method]
+        age = time.monotonic() - updated
+        if age <= self.max_age:
+            return CachedReading(value, age, stale=False)
+        self.refresh(method)
+        if age > self.max_staleness:
+            return None
+        return CachedReading(value, age, stale=True)
+
+    async def get_output_data(self) -> CachedReading[ReturnOutputData] | None:
+        return await self.get("get_output_data")
+
+    async def get_alarm_info(self) -> CachedReading[ReturnAlarmInfo] | None:
+        return await self.get("get_alarm_info")
+
+    async def get_max_power(self) -> CachedReading[int] | None:
+        return await self.get("get_max_power")
+
+    async def get_device_power_status(self) -> CachedReading[bool] | None:
+        return await self.get("get_device_power_status")
@@ -0,0 +1,163 @@
+import datetime
+import inspect
+from array import array
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Literal, Mapping, Sequence
+
+from . import ReturnOutputData
+
+Rollover = Literal["day", "never"]
+ResultCallback = Callable[[str, str, Any], Awaitable[None] | None]
+
+
+@dataclass(frozen=True)
+class CounterSpec:
+    """How to recover one monotonic counter of `get_output_data`.
+
+    A drop of the counter by more than `tolerance` (or `relative_tolerance` times its value) is a
+    reset: the value before the drop is added to all following values. Smaller drops are jitter,
+    the previous value is kept. Counters with a "day" rollover start over every (local) day, like
+    the daily energy `e1`/`e2`; "never" counters, like the lifetime energy `te1`/`te2`, do not.
+    """
+
+    field: str
+    rollover: Rollover = "never"
+    tolerance: float = 0.0
+    relative_tolerance: float = 0.0
+
+
+DEFAULT_COUNTERS = (
+    CounterSpec("e1", rollover="day"),
+    CounterSpec("e2", rollover="day"),
+    CounterSpec("te1", tolerance=0.01),
+    CounterSpec("te2", tolerance=0.01),
+)
+"""The energy counters of the EZ1: daily energy per input and lifetime energy per input."""
+
+
+class CounterRecovery:
+    """Keeps monotonic counters of a whole fleet monotonic across counter resets, e.g. by
+    firmware updates or power loss.
+
+    The state of all counters of all devices lives in three flat arrays (last raw value, offset
+    and day of the last update), so thousands of inverters cost a few bytes per counter. The
+    state can be persisted with `state` and `restore`, so lifetime counters stay corrected
+    across restarts.
+    """
+
+    def __init__(self, specs: Sequence[CounterSpec] = DEFAULT_COUNTERS, devices: Sequence[str] = ()) -> None:
+        """
+        :param specs: The counters to recover.
+        :param devices: The names of the devices. Unknown devices are added on their first value.
+        """
+        self.specs = tuple(specs)
+        self.fields = [spec.field for spec in self.specs]
+        self.devices: list[str] = []
+        self._rows: dict[str, int] = {}
+        self._last = array("d")
+        self._offset = array("d")
+        self._day = array("l")  # ordinal of the day of the last value, 0 before the first value
+        self.resets = array("L")
+        for device in devices:
+            self.add(device)
+
+    def add(self, device: str) -> int:
+        """Adds a device and returns its row."""
+        if device in self._rows:
+            raise ValueError(f"{device} is already known")
+        row = self._rows[device] = len(self.devices)
+        self.devices.append(device)
+        columns = len(self.specs)
+        self._last.extend([0.0] * columns)
+        self._offset.extend([0.0] * columns)
+        self._day.extend([0] * columns)
+        self.resets.extend([0] * columns)
+        return row
+
+    def correct(self, device: str, values: Mapping[str, Any], day: datetime.date | None = None) -> dict[str, float]:
+        """
+        Corrects the counters of one reading of a device.
+
+        :param device: The device name.
+        :param values: The raw values by field name. Fields that are missing or not numbers are
+                       skipped.
+        :param day: The (local) day of the reading. Default: today.
+        :return: The corrected values of the counters by field name.
+        """
+        row = self._rows.get(device)
+        if row is None:
+            row = self.add(device)
+        today = (day or datetime.date.today()).toordinal()
+        corrected = {}
+        for column, spec in enumerate(self.specs):
+            value = values.get(spec.field)
+            if not isinstance(value, (int, float)):
+                continue
+            slot = row * len(self.specs) + column
+            last_day = self._day[slot]
+            if spec.rollover == "day" and last_day != today:
+                self._offset[slot] = 0.0
+            elif last_day:
+                drop = self._last[slot] - value
+                if drop > max(spec.tolerance, spec.relative_tolerance * self._last[slot]):
+                    self._offset[slot] += self._last[slot]
+                    self.resets[slot] += 1
+                elif drop > 0:
+                    value = self._last[slot]
+            self._last[slot] = value
+            self._day[slot] = today
+            corrected[spec.field] = value + self._offset[slot]
+        return corrected
+
+    def correct_output_data(
+        self, device: str, data: ReturnOutputData, day: datetime.date | None = None
+    ) -> ReturnOutputData:
+        """Returns a copy of the output data with corrected counters."""
+        values = vars(data)
+        return ReturnOutputData(**{**values, **self.correct(device, values, day)})
+
+    def wrap(self, on_result: ResultCallback) -> ResultCallback:
+        """
+        Wraps a result callback of `PollScheduler` (or `ShardedPoller`), so that it receives
+        output data with corrected counters.
+        """
+
+        async def corrected(device: str, method: str, value: Any) -> None:
+            if isinstance(value, ReturnOutputData):
+                value = self.correct_output_data(device, value)
+            result = on_result(device, method, value)
+            if inspect.isawaitable(result):
+                await result
+
+        return corrected
+
+    def reset_count(self, device: str, field: str) -> int:
+        """How often a counter of a device was reset so far."""
+        return self.resets[self._rows[device] * len(self.specs) + self.fields.index(field)]
+
+    def state(self) -> dict[str, Any]:
+        """The recovery state as plain data, e.g. to store it as JSON."""
+        return {
+            "fields": self.fields,
+            "devices": self.devices,
+            "last": self._last.tolist(),
+            "offset": self._offset.tolist(),
+            "day": self._day.tolist(),
+        }
+
+    def restore(self, state: Mapping[str, Any]) -> None:
+        """Restores a state saved with `state`. Counters that are not recovered are ignored."""
+        columns = {field: column for column, field in enumerate(state["fields"])}
+        width = len(state["fields"])
+        for index, device in enumerate(state["devices"]):
+            row = self._rows.get(device)
+            if row is None:
+                row = self.add(device)
+            for column, field in enumerate(self.fields):
+                if field not in columns:
+                    continue
+                source = index * width + columns[field]
+                slot = row * len(self.specs) + column
+                self._last[slot] = state["last"][source]
+                self._offset[slot] = state["offset"][source]
+                self._day[slot] = state["day"][source]
@@ -0,0 +1,49 @@
+import asyncio
+import ipaddress
+import logging
+
+from . import APsystemsEZ1M, ReturnDeviceInfo
+from .transport import Transport, probe_port
+
+_LOGGER = logging.getLogger(__name__)
+
+
+async def discover(
+    network: str = "192.168.1.0/24",
+    port: int = 8050,
+    concurrency: int = 256,
+    connect_timeout: float = 0.3,
+    timeout: float = 3.0,
+    transport: Transport | None = None,
+) -> dict[str, ReturnDeviceInfo]:
+    """
+    Finds the EZ1 inverters in a subnet.
+
+    All hosts of the network are probed concurrently for an open `port`, with a short connect
+    timeout so that unused addresses cost almost nothing. Every open port is then confirmed by
+    requesting `getDeviceInfo`.
+
+    :param network: The subnet to scan, e.g. "192.168.1.0/24".
+    :param port: The port of the local API.
+    :param concurrency: Maximum number of hosts probed at the same time.
+    :param connect_timeout: Seconds to wait for a TCP connection to a host.
+    :param timeout: Seconds to wait for the `getDeviceInfo` confirmation.
+    :param transport: The transport for the confirmation requests, see `APsystemsEZ1M`.
+    :return: The device information of all found inverters by deviceId.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def check(host: str) -> ReturnDeviceInfo | None:
+        async with semaphore:
+            if not await probe_port(host, port, connect_timeout):
+                return None
+            ez1m = APsystemsEZ1M(host, port=port, timeout=timeout, transport=transport)
+            try:
+                return await ez1m.get_device_info()
+            except Exception as exc:  # pylint: disable=broad-except
+                _LOGGER.debug("%s:%s is not an EZ1: %s", host, port, exc)
+                return None
+
+    hosts = [str(host) for host in ipaddress.ip_network(network, strict=False).hosts()]
+    results = await asyncio.gather(*(check(host) for host in hosts))
+    return {info.deviceId: info for info in results if info is not None}
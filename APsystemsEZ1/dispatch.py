@@ -0,0 +1,191 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Literal, Mapping
+
+from . import APsystemsEZ1M
+from .bulk import BulkWriter, WriteOutcome
+
+_LOGGER = logging.getLogger(__name__)
+
+Strategy = Literal["proportional", "headroom"]
+
+
+def _water_fill(
+    budget: float,
+    base: dict[str, float],
+    weights: dict[str, float],
+    bounds: Mapping[str, tuple[int, int]],
+) -> dict[str, float]:
+    """Distributes `budget` on top of `base` in proportion to `weights`, within `bounds`.
+
+    Units whose share would leave their bounds are pinned to the bound, and the rest of the
+    budget is distributed among the remaining units until no unit violates its bounds. Each pass
+    pins one side only: the units above their max if they exceed them by more than the units
+    below their min fall short, the units below their min otherwise. Pinning both at once would
+    hand out more (or less) than the budget.
+    """
+    result: dict[str, float] = {}
+    free = set(base)
+    while free:
+        remaining = budget - sum(base[name] for name in free)
+        total_weight = sum(weights[name] for name in free)
+        shares = {
+            name: base[name]
+            + remaining * (weights[name] / total_weight if total_weight > 0 else 1 / len(free))
+            for name in free
+        }
+        excess = sum(share - bounds[name][1] for name, share in shares.items() if share > bounds[name][1])
+        deficit = sum(bounds[name][0] - share for name, share in shares.items() if share < bounds[name][0])
+        if excess > deficit:
+            pinned = {name: bounds[name][1] for name, share in shares.items() if share > bounds[name][1]}
+        else:
+            pinned = {name: bounds[name][0] for name, share in shares.items() if share < bounds[name][0]}
+        if not pinned:
+            result.update(shares)
+            break
+        result.update(pinned)
+        budget -= sum(pinned.values())
+        free -= pinned.keys()
+    return result
+
+
+def allocate_limits(
+    total_limit: float,
+    production: Mapping[str, float],
+    bounds: Mapping[str, tuple[int, int]],
+    strategy: Strategy = "proportional",
+) -> dict[str, int]:
+    """
+    Splits a site-level power limit into per-inverter max power limits.
+
+    - __proportional__: every inverter gets a share of the limit in proportion to its current
+      production. Inverters without production get an equal share if nobody produces.
+    - __headroom__: every inverter keeps its current production, the remaining budget is
+      distributed in proportion to how far each inverter is below its max power. If the site
+      already produces more than the limit, this falls back to proportional.
+
+    :param total_limit: The site limit in watts.
+    :param production: The current production of every inverter in watts.
+    :param bounds: The (min_power, max_power) setting range of every inverter.
+    :param strategy: Either "proportional" or "headroom".
+    :return: The max power limit of every inverter. The sum never exceeds `total_limit`, unless
+             the limit is lower than the sum of all min_power values.
+    """
+    if strategy not in ("proportional", "headroom"):
+        raise ValueError(f"Unknown allocation strategy '{strategy}'")
+    production = {name: max(0.0, float(production.get(name) or 0.0)) for name in bounds}
+    if strategy == "headroom" and sum(production.values()) <= total_limit:
+        base = {
+            name: min(max(power, bounds[name][0]), bounds[name][1])
+            for name, power in production.items()
+        }
+        weights = {name: bounds[name][1] - base[name] for name in bounds}
+    else:
+        base = dict.fromkeys(bounds, 0.0)
+        weights = production
+    limits = _water_fill(total_limit, base, weights, bounds)
+    return {name: int(limits[name]) for name in bounds}
+
+
+@dataclass
+class DispatchResult:
+    limits: dict[str, int]
+    changed: list[str] = field(default_factory=list)
+    failed: list[str] = field(default_factory=list)
+    unverified: list[str] = field(default_factory=list)
+    outcomes: dict[str, WriteOutcome] = field(default_factory=dict)
+    elapsed: float = 0.0
+
+
+class PowerLimitDispatcher:
+    """Keeps a site-level export limit across a fleet of inverters.
+
+    Each `dispatch` allocates per-inverter limits from a production snapshot and pushes only the
+    limits that changed with a `BulkWriter`: concurrently, verified by reading them back, with
+    the stragglers retried until the deadline.
+    """
+
+    def __init__(
+        self,
+        inverters: Mapping[str, APsystemsEZ1M],
+        strategy: Strategy = "proportional",
+        tolerance: int = 0,
+        verify: bool = True,
+        deadline: float = 10.0,
+        attempts: int = 3,
+        retry_delay: float = 0.5,
+    ) -> None:
+        """
+        :param inverters: The inverters of the site by name.
+        :param strategy: The allocation strategy, see `allocate_limits`.
+        :param tolerance: Limits that differ by no more than this many watts from the current
+                          setpoint are not pushed.
+        :param verify: Whether to read back pushed limits with `get_max_power`.
+        :param deadline: Seconds pushing the limits may take, retries included.
+        :param attempts: Maximum number of writes per inverter.
+        :param retry_delay: Seconds to wait before retrying the inverters that failed.
+        """
+        self.inverters = dict(inverters)
+        self.strategy = strategy
+        self.tolerance = tolerance
+        self.writer = BulkWriter(
+            self.inverters, deadline=deadline, attempts=attempts, retry_delay=retry_delay, verify=verify
+        )
+        self.setpoints: dict[str, int] = {}
+
+    async def _gather(self, coroutines: dict) -> dict:
+        results = await asyncio.gather(*coroutines.values(), return_exceptions=True)
+        for name, result in zip(coroutines, results):
+            if isinstance(result, Exception):
+                _LOGGER.debug("%s failed: %s", name, result)
+        return dict(zip(coroutines, results))
+
+    async def snapshot(self) -> dict[str, float]:
+        """Reads the current production of all inverters concurrently. Offline inverters count as 0 W."""
+        results = await self._gather(
+            {name: ez1m.get_total_output() for name, ez1m in self.inverters.items()}
+        )
+        return {
+            name: result if isinstance(result, float) else 0.0
+            for name, result in results.items()
+        }
+
+    async def dispatch(
+        self, total_limit: float, production: Mapping[str, float] | None = None
+    ) -> DispatchResult:
+        """
+        Allocates and pushes the per-inverter limits for a new site limit.
+
+        :param total_limit: The site limit in watts.
+        :param production: A live production snapshot in watts by inverter name, e.g. from your
+                           own poller. Read from the inverters if omitted.
+        """
+        started = time.monotonic()
+        if production is None:
+            production = await self.snapshot()
+        limits = allocate_limits(
+            total_limit,
+            production,
+            {name: (ez1m.min_power, ez1m.max_power) for name, ez1m in self.inverters.items()},
+            self.strategy,
+        )
+        result = DispatchResult(limits=limits)
+        result.changed = [
+            name
+            for name, limit in limits.items()
+            if name not in self.setpoints or abs(self.setpoints[name] - limit) > self.tolerance
+        ]
+
+        written = await self.writer.set_max_power({name: limits[name] for name in result.changed})
+        result.outcomes = written.outcomes
+        for name, outcome in written.outcomes.items():
+            if outcome.status == "verified":
+                self.setpoints[name] = outcome.value
+                continue
+            (result.unverified if outcome.status == "unverified" else result.failed).append(name)
+            self.setpoints.pop(name, None)
+
+        result.elapsed = time.monotonic() - started
+        return result
@@ -0,0 +1,216 @@
+import asyncio
+import logging
+from dataclasses import dataclass, fields
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+from . import APsystemsEZ1M, ReturnAlarmInfo, ReturnOutputData
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_DEADBANDS: dict[str, float] = {
+    "p1": 1.0,
+    "p2": 1.0,
+    "e1": 0.01,
+    "e2": 0.01,
+    "te1": 0.01,
+    "te2": 0.01,
+}
+"""Default per-field deadbands for `ReturnOutputData` (watts for power, kWh for energy)."""
+
+
+@dataclass
+class OutputDataEvent:
+    device: str
+    data: ReturnOutputData
+    previous: ReturnOutputData | None
+    changed: tuple[str, ...]
+
+
+@dataclass
+class AlarmInfoEvent:
+    device: str
+    data: ReturnAlarmInfo
+    previous: ReturnAlarmInfo | None
+    changed: tuple[str, ...]
+
+
+class Subscription:
+    """A bounded event queue handed out by `EventBus.subscribe`.
+
+    When the queue is full the oldest event is discarded to make room for the new one, so a
+    slow subscriber always sees the most recent state and never blocks the publisher.
+    """
+
+    def __init__(self, bus: "EventBus", maxsize: int, devices: set[str] | None) -> None:
+        self._bus = bus
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.devices = devices
+        self.dropped = 0
+
+    def _put(self, event: OutputDataEvent | AlarmInfoEvent) -> None:
+        if self.devices is not None and event.device not in self.devices:
+            return
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(event)
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    async def get(self) -> OutputDataEvent | AlarmInfoEvent:
+        """Wait for and return the next event."""
+        return await self._queue.get()
+
+    def get_nowait(self) -> OutputDataEvent | AlarmInfoEvent:
+        return self._queue.get_nowait()
+
+    def close(self) -> None:
+        """Stop receiving events from the bus."""
+        self._bus.unsubscribe(self)
+
+    def __aiter__(self) -> AsyncIterator[OutputDataEvent | AlarmInfoEvent]:
+        return self
+
+    async def __anext__(self) -> OutputDataEvent | AlarmInfoEvent:
+        return await self.get()
+
+
+class EventBus:
+    """Fans out polled inverter data to any number of async subscribers, but only on change.
+
+    An `OutputDataEvent` is emitted when any field of `ReturnOutputData` moved further than its
+    deadband away from the value of the last *emitted* event, so slow drifts are still reported
+    once they add up. An `AlarmInfoEvent` is emitted whenever one of the `ReturnAlarmInfo` flags
+    flips. The first reading of a device is always emitted.
+    """
+
+    def __init__(
+        self,
+        deadbands: dict[str, float] | None = None,
+        queue_size: int = 100,
+    ) -> None:
+        """
+        :param deadbands: Per-field deadbands for `ReturnOutputData`. Missing fields fall back to
+                          `DEFAULT_DEADBANDS`.
+        :param queue_size: Default queue size of new subscriptions.
+        """
+        self.deadbands = {**DEFAULT_DEADBANDS, **(deadbands or {})}
+        self.queue_size = queue_size
+        self._subscriptions: list[Subscription] = []
+        self._last_output: dict[str, ReturnOutputData] = {}
+        self._last_alarm: dict[str, ReturnAlarmInfo] = {}
+        self.published = 0
+        self.suppressed = 0
+
+    def subscribe(self, maxsize: int | None = None, devices: list[str] | None = None) -> Subscription:
+        """
+        Creates a new subscription.
+
+        :param maxsize: Queue size of the subscription, defaults to the bus `queue_size`.
+        :param devices: Only deliver events of these devices. All devices if omitted.
+        """
+        subscription = Subscription(
+            self,
+            self.queue_size if maxsize is None else maxsize,
+            set(devices) if devices is not None else None,
+        )
+        self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        if subscription in self._subscriptions:
+            self._subscriptions.remove(subscription)
+
+    def _emit(self, event: OutputDataEvent | AlarmInfoEvent) -> None:
+        self.published += 1
+        for subscription in self._subscriptions:
+            subscription._put(event)
+
+    def publish_output_data(self, device: str, data: ReturnOutputData | None) -> OutputDataEvent | None:
+        """
+        Offers a new reading to the bus. Readings of offline devices (`None`) are ignored.
+
+        :return: The emitted event, or None if the reading stayed within all deadbands.
+        """
+        if data is None:
+            return None
+        previous = self._last_output.get(device)
+        if previous is None:
+            changed = tuple(f.name for f in fields(ReturnOutputData))
+        else:
+            changed = tuple(
+                f.name
+                for f in fields(ReturnOutputData)
+                if abs(getattr(data, f.name) - getattr(previous, f.name))
+                > self.deadbands.get(f.name, 0.0)
+            )
+        if not changed:
+            self.suppressed += 1
+            return None
+        self._last_output[device] = data
+        event = OutputDataEvent(device=device, data=data, previous=previous, changed=changed)
+        self._emit(event)
+        return event
+
+    def publish_alarm_info(self, device: str, data: ReturnAlarmInfo | None) -> AlarmInfoEvent | None:
+        """
+        Offers new alarm information to the bus. Readings of offline devices (`None`) are ignored.
+
+        :return: The emitted event, or None if no alarm flag flipped.
+        """
+        if data is None:
+            return None
+        previous = self._last_alarm.get(device)
+        changed = tuple(
+            f.name
+            for f in fields(ReturnAlarmInfo)
+            if previous is None or getattr(data, f.name) != getattr(previous, f.name)
+        )
+        if not changed:
+            self.suppressed += 1
+            return None
+        self._last_alarm[device] = data
+        event = AlarmInfoEvent(device=device, data=data, previous=previous, changed=changed)
+        self._emit(event)
+        return event
+
+    async def poll(
+        self,
+        device: str,
+        ez1m: APsystemsEZ1M,
+        interval: float = 5.0,
+        alarm_interval: float = 30.0,
+    ) -> None:
+        """
+        Polls a single inverter forever and publishes its readings to the bus. Run one task per
+        device; failed polls (e.g. the inverter is offline at night) are logged and skipped.
+
+        :param device: The name under which events of this inverter are published.
+        :param ez1m: The inverter to poll.
+        :param interval: Seconds between two `get_output_data` polls.
+        :param alarm_interval: Seconds between two `get_alarm_info` polls.
+        """
+        loop = asyncio.get_running_loop()
+        next_alarm = loop.time()
+        while True:
+            # Each endpoint on its own, so that a failing output data poll does not hide alarms.
+            await self._poll_endpoint(device, "output data", ez1m.get_output_data, self.publish_output_data)
+            if loop.time() >= next_alarm:
+                next_alarm = loop.time() + alarm_interval
+                await self._poll_endpoint(device, "alarm info", ez1m.get_alarm_info, self.publish_alarm_info)
+            await asyncio.sleep(interval)
+
+    @staticmethod
+    async def _poll_endpoint(
+        device: str,
+        name: str,
+        read: Callable[[], Awaitable[Any]],
+        publish: Callable[[str, Any], Any],
+    ) -> None:
+        try:
+            publish(device, await read())
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:  # pylint: disable=broad-except
+            _LOGGER.debug("Polling the %s of %s failed: %s", name, device, exc)
@@ -0,0 +1,172 @@
+import asyncio
+import logging
+import time
+
+from aiohttp import web
+
+from . import APsystemsEZ1M
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_POLL_INTERVALS: dict[str, float] = {
+    "getOutputData": 5.0,
+    "getAlarm": 30.0,
+    "getOnOff": 60.0,
+    "getMaxPower": 60.0,
+    "getDeviceInfo": 3600.0,
+}
+"""Seconds between two polls of every read endpoint served by the gateway."""
+
+WRITE_ENDPOINTS: dict[str, str] = {
+    "setMaxPower": "getMaxPower",
+    "setOnOff": "getOnOff",
+}
+"""Write endpoints and the read endpoint whose cached value their response replaces."""
+
+
+class Gateway:
+    """A local HTTP server that exposes the endpoints of one EZ1 to any number of clients.
+
+    Reads (`getOutputData`, `getAlarm`, ...) are answered from a cache that is fed by a single
+    scheduled poller, writes (`setMaxPower`, `setOnOff`) are queued and forwarded one at a time.
+    The inverter therefore never sees more than one request at a time, no matter how many
+    clients are connected to the gateway.
+    """
+
+    def __init__(
+        self,
+        ez1m: APsystemsEZ1M,
+        host: str = "127.0.0.1",
+        port: int = 8050,
+        poll_intervals: dict[str, float] | None = None,
+    ) -> None:
+        """
+        :param ez1m: The inverter served by this gateway.
+        :param host: The address the gateway listens on.
+        :param port: The port the gateway listens on. Default is 8050 like the inverter itself.
+        :param poll_intervals: Per-endpoint poll intervals, merged into `DEFAULT_POLL_INTERVALS`.
+        """
+        self.ez1m = ez1m
+        self.host = host
+        self.port = port
+        self.poll_intervals = {**DEFAULT_POLL_INTERVALS, **(poll_intervals or {})}
+        self.cache: dict[str, tuple[float, dict]] = {}
+        self._device_lock = asyncio.Lock()
+        self._writes: asyncio.Queue = asyncio.Queue()
+        self._tasks: list[asyncio.Task] = []
+        self._runner: web.AppRunner | None = None
+
+    async def _device_request(self, endpoint: str) -> dict | None:
+        async with self._device_lock:
+            return await self.ez1m._request(endpoint)  # pylint: disable=protected-access
+
+    async def refresh(self, endpoint: str) -> dict | None:
+        """Polls a read endpoint from the inverter and stores the response in the cache."""
+        response = await self._device_request(endpoint)
+        if response:
+            self.cache[endpoint] = (time.monotonic(), response)
+        return response
+
+    async def _poll_loop(self) -> None:
+        next_poll = dict.fromkeys(self.poll_intervals, 0.0)
+        while True:
+            now = time.monotonic()
+            for endpoint, due in next_poll.items():
+                if due > now:
+                    continue
+                next_poll[endpoint] = now + self.poll_intervals[endpoint]
+                try:
+                    await self.refresh(endpoint)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as exc:  # pylint: disable=broad-except
+                    _LOGGER.debug("Polling %s failed: %s", endpoint, exc)
+            await asyncio.sleep(max(0.0, min(next_poll.values()) - time.monotonic()))
+
+    async def _write_loop(self) -> None:
+        while True:
+            endpoint, query, future = await self._writes.get()
+            try:
+                response = await self._device_request(f"{endpoint}?{query}")
+                if response:
+                    self.cache[WRITE_ENDPOINTS[endpoint]] = (time.monotonic(), response)
+                if not future.done():
+                    future.set_result(response)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:  # pylint: disable=broad-except
+                if not future.done():
+                    future.set_exception(exc)
+            finally:
+                self._writes.task_done()
+
+    async def write(self, endpoint: str, query: str) -> dict | None:
+        """Queues a write for the inverter and waits until it has been sent."""
+        future = asyncio.get_running_loop().create_future()
+        await self._writes.put((endpoint, query, future))
+        return await future
+
+    def _validate_write(self, endpoint: str, request: web.Request) -> str:
+        if endpoint == "setMaxPower":
+            value = request.query.get("p", "")
+            if not value.isdigit() or not self.ez1m.min_power <= int(value) <= self.ez1m.max_power:
+                raise web.HTTPBadRequest(text=f"Invalid setMaxPower value: '{value}'")
+            return f"p={int(value)}"
+        value = request.query.get("status", "")
+        if value not in ("0", "1"):
+            raise web.HTTPBadRequest(text=f"Invalid setOnOff value: '{value}'")
+        return f"status={value}"
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        endpoint = request.match_info["endpoint"]
+        try:
+            if endpoint in WRITE_ENDPOINTS:
+                response = await self.write(endpoint, self._validate_write(endpoint, request))
+                return web.json_response(response)
+            if endpoint not in self.poll_intervals:
+                raise web.HTTPNotFound()
+            if endpoint not in self.cache:
+                await self.refresh(endpoint)
+        except web.HTTPException:
+            raise
+        except Exception as exc:  # pylint: disable=broad-except
+            _LOGGER.debug("Request to %s failed: %s", endpoint, exc)
+        if endpoint not in self.cache:
+            return web.json_response({"data": {}, "message": "FAILED", "deviceId": ""}, status=503)
+        updated, response = self.cache[endpoint]
+        return web.json_response(
+            response, headers={"X-Cache-Age": f"{time.monotonic() - updated:.3f}"}
+        )
+
+    def make_app(self) -> web.Application:
+        """Creates the aiohttp application serving the inverter endpoints."""
+        app = web.Application()
+        app.router.add_get("/{endpoint}", self._handle)
+        app.on_startup.append(self._on_startup)
+        app.on_cleanup.append(self._on_cleanup)
+        return app
+
+    async def _on_startup(self, _app: web.Application) -> None:
+        self._tasks = [
+            asyncio.create_task(self._poll_loop()),
+            asyncio.create_task(self._write_loop()),
+        ]
+
+    async def _on_cleanup(self, _app: web.Application) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def start(self) -> None:
+        """Starts the poller and the HTTP server."""
+        self._runner = web.AppRunner(self.make_app())
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        _LOGGER.info("Serving %s on http://%s:%s", self.ez1m.base_url, self.host, self.port)
+
+    async def stop(self) -> None:
+        """Stops the HTTP server and the poller."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,147 @@
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+from .transport import RequestTimeout, Transport
+
+
+@dataclass
+class HedgeStats:
+    requests: int = 0
+    hedged: int = 0
+    hedge_wins: int = 0
+    capped: int = 0
+    latency_saved: float = 0.0
+
+    @property
+    def hedge_rate(self) -> float:
+        """Share of requests for which a second request was sent."""
+        return self.hedged / self.requests if self.requests else 0.0
+
+
+class HedgePolicy:
+    """Sends a second copy of a slow read and uses whichever response arrives first.
+
+    The hedge delay is the `quantile` of the latencies observed recently, so only the slowest
+    requests (by default 5 %) are hedged. The loser of the race is cancelled. A policy tracks the
+    requests of one device: it never has more than `max_in_flight` requests in flight, hedges
+    included, so use one policy per `APsystemsEZ1M`. The client additionally only hedges while
+    its `RequestQueue` has a free slot, i.e. with `max_in_flight` of 2 or more, and takes a token
+    of its rate limiter for the hedge.
+
+    `stats.latency_saved` is an estimate: for every race won by the hedge, the difference between
+    the recent 99th percentile latency and the latency the caller actually saw.
+    """
+
+    def __init__(
+        self,
+        quantile: float = 0.95,
+        window: int = 200,
+        min_samples: int = 20,
+        min_delay: float = 0.02,
+        max_in_flight: int = 2,
+    ) -> None:
+        """
+        :param quantile: Latency quantile after which a request is hedged.
+        :param window: Number of recent latencies the quantile is computed from.
+        :param min_samples: Requests are not hedged before this many latencies were observed.
+        :param min_delay: Lower bound of the hedge delay in seconds.
+        :param max_in_flight: Maximum number of requests in flight to the device, hedges included.
+        """
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.max_in_flight = max_in_flight
+        self.latencies: deque[float] = deque(maxlen=window)
+        self.in_flight = 0
+        self.stats = HedgeStats()
+
+    def _percentile(self, quantile: float) -> float:
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(quantile * len(ordered)))]
+
+    def delay(self) -> float | None:
+        """The current hedge delay in seconds, None while too few latencies were observed."""
+        if len(self.latencies) < self.min_samples:
+            return None
+        return max(self.min_delay, self._percentile(self.quantile))
+
+    async def _send(self, transport: Transport, url: str, timeout: float | RequestTimeout) -> tuple[int, Any]:
+        self.in_flight += 1
+        try:
+            return await transport.get(url, timeout)
+        finally:
+            self.in_flight -= 1
+
+    async def get(
+        self,
+        transport: Transport,
+        url: str,
+        timeout: float | RequestTimeout,
+        reserve: Callable[[], Awaitable[bool]] | None = None,
+        release: Callable[[], None] | None = None,
+    ) -> tuple[int, Any]:
+        """
+        Sends an idempotent GET request with `transport`, hedging it if it is slow.
+
+        :param reserve: Awaited before a hedge is sent; returns whether it may be sent, e.g.
+                        after taking a slot of the device's request queue.
+        :param release: Called when a hedge admitted by `reserve` is done.
+        """
+        self.stats.requests += 1
+        started = time.monotonic()
+        delay = self.delay()
+        primary = asyncio.ensure_future(self._send(transport, url, timeout))
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait({primary}, timeout=delay)
+                if not done and (
+                    self.in_flight >= self.max_in_flight or (reserve is not None and not await reserve())
+                ):
+                    self.stats.capped += 1
+                elif not done:
+                    return await self._race(primary, transport, url, timeout, started, release)
+            result = await primary
+        except BaseException:
+            primary.cancel()
+            raise
+        self.latencies.append(time.monotonic() - started)
+        return result
+
+    async def _race(
+        self,
+        primary: asyncio.Future,
+        transport: Transport,
+        url: str,
+        timeout: float | RequestTimeout,
+        started: float,
+        release: Callable[[], None] | None,
+    ) -> tuple[int, Any]:
+        self.stats.hedged += 1
+        hedge = asyncio.ensure_future(self._send(transport, url, timeout))
+        if release is not None:
+            # Also released if the hedge is cancelled before it started.
+            hedge.add_done_callback(lambda _: release())
+        pending = {primary, hedge}
+        error: BaseException | None = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for winner in done:
+                    if winner.exception() is not None:
+                        error = error or winner.exception()
+                        continue
+                    elapsed = time.monotonic() - started
+                    if winner is hedge:
+                        self.stats.hedge_wins += 1
+                        self.stats.latency_saved += max(0.0, self._percentile(0.99) - elapsed)
+                    # A win of the hedge only tells that the primary took at least this long.
+                    self.latencies.append(elapsed)
+                    return winner.result()
+            raise error
+        finally:
+            for loser in pending:
+                loser.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
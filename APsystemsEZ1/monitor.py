@@ -0,0 +1,289 @@
+import contextvars
+import logging
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Iterator
+
+_LOGGER = logging.getLogger(__name__)
+
+# This module is imported by the package itself, which keeps asyncio out of `import APsystemsEZ1`;
+# asyncio is imported once a monitor starts.
+
+_operation: contextvars.ContextVar[tuple[str, str] | None] = contextvars.ContextVar("operation", default=None)
+_phase: contextvars.ContextVar[str | None] = contextvars.ContextVar("phase", default=None)
+_active: "LoopMonitor | None" = None
+
+
+@contextmanager
+def operation(device: str, endpoint: str) -> Iterator[None]:
+    """Marks the device and endpoint the current task works on, for slow callback reports."""
+    if _active is None:
+        yield
+        return
+    token = _operation.set((device, endpoint))
+    try:
+        yield
+    finally:
+        _operation.reset(token)
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Times a phase of a poll ("request", "parse", "debounce" or "sinks") while monitored."""
+    monitor = _active
+    if monitor is None:
+        yield
+        return
+    token = _phase.set(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        monitor._phase_done(name, started, time.perf_counter())  # pylint: disable=protected-access
+        _phase.reset(token)
+
+
+def cycle_done() -> None:
+    """Marks the end of a poll cycle while monitored, see `LoopMonitor.end_cycle`."""
+    if _active is not None:
+        _active.end_cycle()
+
+
+@dataclass
+class PhaseStats:
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+@dataclass
+class SlowCallback:
+    duration: float
+    callback: str
+    device: str | None
+    endpoint: str | None
+    phase: str | None
+    phase_times: dict[str, float] = field(default_factory=dict)
+
+
+@dataclass
+class LagStats:
+    samples: int
+    mean: float
+    p99: float
+    max: float
+
+
+@dataclass
+class MonitorReport:
+    lag: LagStats
+    phases: dict[str, PhaseStats]
+    slow_callbacks: list[SlowCallback] = field(default_factory=list)
+
+    @property
+    def device_time(self) -> float:
+        """Seconds spent waiting for the devices: requests without parsing the responses."""
+        request, parse = self.phases.get("request", PhaseStats()), self.phases.get("parse", PhaseStats())
+        return request.total - parse.total
+
+    @property
+    def client_time(self) -> float:
+        """Seconds spent in our own code: parsing, debouncing and result sinks."""
+        return sum(self.phases[name].total for name in ("parse", "debounce", "sinks") if name in self.phases)
+
+
+def _describe(callback: Any) -> str:
+    task = getattr(callback, "__self__", None)
+    get_coro = getattr(task, "get_coro", None)
+    if get_coro is not None:
+        coroutine = get_coro()
+        return f"Task {getattr(coroutine, '__qualname__', repr(coroutine))}"
+    return getattr(callback, "__qualname__", repr(callback))
+
+
+class LoopMonitor:
+    """Watches the event loop of a poller, to tell our own latency apart from the devices'.
+
+    While running, the monitor
+    - measures the scheduling lag of the loop, i.e. how late a timer fires,
+    - reports every callback (task step) that blocks the loop for `slow_callback` seconds or more,
+      with the device, endpoint and phase it was working on, and
+    - times the phases of every poll: "request" (sending the request and receiving and parsing
+      the response), "parse" (parsing the response only), "debounce" and "sinks" (result
+      callbacks of `PollScheduler`).
+
+    `PollScheduler` marks the end of each poll cycle, and the statistics of every cycle are kept
+    in `cycles`, so the device and client time of one cycle can be compared with the others.
+
+    Only one monitor can run per process. To find slow callbacks, it wraps `asyncio.Handle._run`
+    while it runs.
+    """
+
+    def __init__(
+        self,
+        interval: float = 0.05,
+        slow_callback: float = 0.05,
+        window: int = 1000,
+        max_slow_callbacks: int = 100,
+        max_cycles: int = 100,
+    ) -> None:
+        """
+        :param interval: Seconds between two lag samples.
+        :param slow_callback: Callbacks running at least this many seconds are reported.
+        :param window: Number of lag samples the statistics are computed over.
+        :param max_slow_callbacks: Number of slow callbacks kept, the most recent ones.
+        :param max_cycles: Number of poll cycle reports kept, the most recent ones.
+        """
+        self.interval = interval
+        self.slow_callback = slow_callback
+        self.lags: deque[float] = deque(maxlen=window)
+        self.phases: dict[str, PhaseStats] = {}
+        self.slow_callbacks: deque[SlowCallback] = deque(maxlen=max_slow_callbacks)
+        self.cycles: deque[MonitorReport] = deque(maxlen=max_cycles)
+        self._cycle_lags: list[float] = []
+        self._cycle_phases: dict[str, PhaseStats] = {}
+        self._cycle_slow_callbacks: list[SlowCallback] = []
+        self._sampler = None
+        self._original_run = None
+        self._step_started = 0.0
+        self._step_phases: dict[str, float] = {}
+
+    def _phase_done(self, name: str, started: float, ended: float) -> None:
+        self.phases.setdefault(name, PhaseStats()).add(ended - started)
+        self._cycle_phases.setdefault(name, PhaseStats()).add(ended - started)
+        # The part of the phase that ran in the current callback, not while it awaited.
+        in_step = ended - max(started, self._step_started)
+        self._step_phases[name] = self._step_phases.get(name, 0.0) + in_step
+
+    def _record_slow(self, handle: Any, duration: float, current: tuple[str, str] | None, current_phase: str | None) -> None:
+        context = getattr(handle, "_context", None)
+        if current is None and context is not None:
+            current = context.get(_operation)
+            current_phase = current_phase or context.get(_phase)
+        device, endpoint = current or (None, None)
+        slow = SlowCallback(
+            duration,
+            _describe(getattr(handle, "_callback", None)),
+            device,
+            endpoint,
+            current_phase,
+            dict(self._step_phases),
+        )
+        self.slow_callbacks.append(slow)
+        self._cycle_slow_callbacks.append(slow)
+        _LOGGER.warning(
+            "%s blocked the event loop for %.3f s (device %s, endpoint %s, phases %s)",
+            slow.callback, duration, device, endpoint, slow.phase_times or current_phase,
+        )
+
+    def _install(self) -> None:
+        import asyncio  # pylint: disable=import-outside-toplevel
+
+        original_run = self._original_run = asyncio.Handle._run
+        monitor = self
+
+        def _run(handle) -> None:
+            context = handle._context  # pylint: disable=protected-access
+            # A step often leaves the operation it worked on before it ends, so look before.
+            current = context.get(_operation) if context is not None else None
+            current_phase = context.get(_phase) if context is not None else None
+            started = monitor._step_started = time.perf_counter()
+            monitor._step_phases.clear()
+            try:
+                original_run(handle)
+            finally:
+                duration = time.perf_counter() - started
+                if duration >= monitor.slow_callback:
+                    monitor._record_slow(handle, duration, current, current_phase)
+
+        asyncio.Handle._run = _run
+
+    async def _sample(self) -> None:
+        import asyncio  # pylint: disable=import-outside-toplevel
+
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            self.lags.append(lag)
+            self._cycle_lags.append(lag)
+
+    def start(self) -> None:
+        """Starts monitoring the running event loop."""
+        global _active  # pylint: disable=global-statement
+        import asyncio  # pylint: disable=import-outside-toplevel
+
+        if _active is not None:
+            raise RuntimeError("A loop monitor is already running")
+        _active = self
+        self._install()
+        self._sampler = asyncio.create_task(self._sample())
+
+    async def stop(self) -> None:
+        """Stops monitoring. The statistics are kept."""
+        global _active  # pylint: disable=global-statement
+        import asyncio  # pylint: disable=import-outside-toplevel
+
+        if _active is not self:
+            return
+        _active = None
+        asyncio.Handle._run = self._original_run
+        self._sampler.cancel()
+        await asyncio.gather(self._sampler, return_exceptions=True)
+
+    def reset(self) -> None:
+        """Clears the statistics."""
+        self.lags.clear()
+        self.phases = {}
+        self.slow_callbacks.clear()
+        self.cycles.clear()
+        self._cycle_lags = []
+        self._cycle_phases = {}
+        self._cycle_slow_callbacks = []
+
+    @staticmethod
+    def _report(lags: list[float], phases: dict[str, PhaseStats], slow_callbacks: list[SlowCallback]) -> MonitorReport:
+        lags = sorted(lags)
+        lag = LagStats(
+            len(lags),
+            sum(lags) / len(lags) if lags else 0.0,
+            lags[min(len(lags) - 1, int(len(lags) * 0.99))] if lags else 0.0,
+            lags[-1] if lags else 0.0,
+        )
+        phases = {name: PhaseStats(stats.count, stats.total, stats.max) for name, stats in phases.items()}
+        return MonitorReport(lag, phases, list(slow_callbacks))
+
+    def report(self) -> MonitorReport:
+        """The statistics since the monitor started or was reset."""
+        return self._report(list(self.lags), self.phases, list(self.slow_callbacks))
+
+    def end_cycle(self) -> MonitorReport:
+        """
+        Ends a poll cycle: adds the statistics since the end of the previous cycle to `cycles`.
+        A phase counts in the cycle it ends in.
+        """
+        report = self._report(self._cycle_lags, self._cycle_phases, self._cycle_slow_callbacks)
+        self._cycle_lags = []
+        self._cycle_phases = {}
+        self._cycle_slow_callbacks = []
+        self.cycles.append(report)
+        return report
+
+    async def __aenter__(self) -> "LoopMonitor":
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.stop()
@@ -0,0 +1,364 @@
+import asyncio
+import json
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Any, Awaitable, Callable, Mapping
+
+from .ratelimit import TokenBucket
+
+_LOGGER = logging.getLogger(__name__)
+
+Position = tuple[int, int]
+"""A position in the spool: segment number and byte offset in the segment."""
+
+_FRAME = struct.Struct("<II")  # payload length, CRC-32 of the payload
+_SUFFIX = ".seg"
+_CURSOR = "cursor"
+
+
+def _segment_name(segment: int) -> str:
+    return f"{segment:012d}{_SUFFIX}"
+
+
+def _fsync(fds: list[int]) -> None:
+    for fd in fds:
+        os.fsync(fd)
+
+
+def _valid_length(path: Path) -> int:
+    """The length of the intact records at the start of a segment."""
+    length = 0
+    with path.open("rb") as file:
+        while True:
+            header = file.read(_FRAME.size)
+            if len(header) < _FRAME.size:
+                return length
+            size, crc = _FRAME.unpack(header)
+            payload = file.read(size)
+            if len(payload) < size or zlib.crc32(payload) != crc:
+                return length
+            length += _FRAME.size + size
+
+
+@dataclass
+class SpoolStats:
+    appended: int = 0
+    syncs: int = 0
+    dropped_segments: int = 0
+    dropped_bytes: int = 0
+    corrupt_segments: int = 0
+
+
+class DiskSpool:
+    """A bounded, append-only record log on disk, split into segment files.
+
+    Records are appended to the newest segment through a buffered file, without waiting for the
+    disk; `sync` makes them durable with one fsync for everything written since the last sync.
+    Readers read from the acknowledged position onwards and `ack` the records they delivered;
+    segments that are acknowledged completely are deleted. If the spool grows beyond
+    `max_bytes`, the oldest segments are dropped.
+
+    The acknowledged position is saved without fsync: after a crash, records may be read again,
+    but none are lost (at-least-once delivery).
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        segment_bytes: int = 4 * 1024 * 1024,
+        max_bytes: int = 256 * 1024 * 1024,
+    ) -> None:
+        """
+        :param directory: The directory of the segment files, created if needed.
+        :param segment_bytes: Size in bytes after which a new segment is started.
+        :param max_bytes: Maximum size of the spool in bytes; must hold at least two segments.
+        """
+        if max_bytes < 2 * segment_bytes:
+            raise ValueError(f"max_bytes ({max_bytes}) must hold at least two segments of {segment_bytes} bytes")
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.stats = SpoolStats()
+        self._lock = threading.Lock()
+        self._acked = self._load_cursor()
+        self._segments = sorted(int(path.stem) for path in self.directory.glob(f"*{_SUFFIX}"))
+        if not self._segments:
+            self._segments.append(self._acked[0])
+            self._path(self._acked[0]).touch()
+        self._sizes = {segment: self._path(segment).stat().st_size for segment in self._segments}
+        active = self._path(self._segments[-1])
+        # Cut off a record torn by a crash while it was written.
+        self._sizes[self._segments[-1]] = _valid_length(active)
+        os.truncate(active, self._sizes[self._segments[-1]])
+        self._total = sum(self._sizes.values())
+        self._file: IO[bytes] = active.open("ab")
+        self._unsynced: list[IO[bytes]] = []
+
+    def _path(self, segment: int) -> Path:
+        return self.directory / _segment_name(segment)
+
+    def _load_cursor(self) -> Position:
+        try:
+            segment, offset = (self.directory / _CURSOR).read_text().split()
+            return int(segment), int(offset)
+        except (FileNotFoundError, ValueError):
+            return 0, 0
+
+    @property
+    def acked(self) -> Position:
+        """The position up to which all records are acknowledged."""
+        return self._acked
+
+    @property
+    def size(self) -> int:
+        """Bytes on disk, acknowledged records of the oldest segment included."""
+        return self._total
+
+    def append(self, record: bytes) -> None:
+        """Appends a record. Does not wait for the disk, see `sync`."""
+        frame = _FRAME.pack(len(record), zlib.crc32(record)) + record
+        with self._lock:
+            if self._sizes[self._segments[-1]] and self._sizes[self._segments[-1]] + len(frame) > self.segment_bytes:
+                self._rotate()
+            self._file.write(frame)
+            self._sizes[self._segments[-1]] += len(frame)
+            self._total += len(frame)
+            dropped = self._drop_oldest() if self._total > self.max_bytes else []
+        self.stats.appended += 1
+        for path in dropped:
+            path.unlink(missing_ok=True)
+
+    def _rotate(self) -> None:
+        self._file.flush()
+        self._unsynced.append(self._file)
+        segment = self._segments[-1] + 1
+        self._segments.append(segment)
+        self._sizes[segment] = 0
+        self._file = self._path(segment).open("ab")
+
+    def _drop_oldest(self) -> list[Path]:
+        dropped = []
+        while self._total > self.max_bytes and len(self._segments) > 1:
+            segment = self._segments.pop(0)
+            size = self._sizes.pop(segment)
+            self._total -= size
+            self.stats.dropped_segments += 1
+            self.stats.dropped_bytes += size
+            dropped.append(self._path(segment))
+        if dropped:
+            _LOGGER.warning("Spool in %s is full, dropped %d segments", self.directory, len(dropped))
+        return dropped
+
+    def flush(self) -> None:
+        """Hands the buffered records to the OS, which makes them visible to `read`."""
+        self._file.flush()
+
+    async def sync(self) -> None:
+        """Flushes and fsyncs the records appended so far, without blocking the event loop."""
+        self.flush()
+        files, self._unsynced = self._unsynced, []
+        fds = [file.fileno() for file in files] + [self._file.fileno()]
+        if files:
+            directory = os.open(self.directory, os.O_RDONLY)
+            fds.append(directory)
+        fsync = asyncio.ensure_future(asyncio.to_thread(_fsync, fds))
+        try:
+            await asyncio.shield(fsync)
+        finally:
+            # Even when cancelled, the files must stay open until the fsync is done.
+            await asyncio.wait([fsync])
+            if files:
+                os.close(directory)
+            for file in files:
+                file.close()
+        self.stats.syncs += 1
+
+    def read(self, position: Position | None = None, max_records: int = 100) -> tuple[list[bytes], Position]:
+        """
+        Reads records, e.g. in a worker thread.
+
+        :param position: The position to read from. Default: the acknowledged position.
+        :param max_records: Maximum number of records to read.
+        :return: The records and the position after the last of them.
+        """
+        with self._lock:
+            segments = list(self._segments)
+        segment, offset = position or self._acked
+        if segment < segments[0]:
+            segment, offset = segments[0], 0
+        records: list[bytes] = []
+        while len(records) < max_records:
+            active = segment == segments[-1]
+            try:
+                file = self._path(segment).open("rb")
+            except FileNotFoundError:  # dropped meanwhile
+                file = None
+            if file is not None:
+                with file:
+                    file.seek(offset)
+                    while len(records) < max_records:
+                        header = file.read(_FRAME.size)
+                        if len(header) < _FRAME.size:
+                            break
+                        size, crc = _FRAME.unpack(header)
+                        payload = file.read(size)
+                        if len(payload) < size or zlib.crc32(payload) != crc:
+                            if not active:
+                                _LOGGER.warning("Skipping the corrupt rest of %s", file.name)
+                                self.stats.corrupt_segments += 1
+                            break
+                        records.append(payload)
+                        offset += _FRAME.size + size
+            if active or len(records) == max_records:
+                break
+            segment, offset = segments[segments.index(segment) + 1], 0
+        return records, (segment, offset)
+
+    def ack(self, position: Position) -> None:
+        """Acknowledges all records before `position` and deletes the segments read completely."""
+        with self._lock:
+            self._acked = position
+            done = [segment for segment in self._segments[:-1] if segment < position[0]]
+            for segment in done:
+                self._segments.remove(segment)
+                self._total -= self._sizes.pop(segment)
+        cursor = self.directory / _CURSOR
+        cursor.with_suffix(".tmp").write_text(f"{position[0]} {position[1]}\n")
+        os.replace(cursor.with_suffix(".tmp"), cursor)
+        for segment in done:
+            self._path(segment).unlink(missing_ok=True)
+
+    def close(self) -> None:
+        """Flushes, fsyncs and closes the segment files."""
+        self.flush()
+        for file in [*self._unsynced, self._file]:
+            os.fsync(file.fileno())
+            file.close()
+        self._unsynced = []
+
+
+@dataclass
+class OutboxStats:
+    delivered: int = 0
+    batches: int = 0
+    failures: int = 0
+
+
+class Outbox:
+    """Delivers poll results to a sink (broker, database) through a `DiskSpool`.
+
+    `on_result` only appends to the spool, so polling never waits for the sink or the disk. A
+    background task sends the spooled records in batches, at most `rate` records per second, and
+    acknowledges them once `send` returned; while the sink fails, the same batch is retried with
+    exponential backoff and new records pile up on disk, not in memory. Records are delivered at
+    least once and in order.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        send: Callable[[list[dict[str, Any]]], Awaitable[Any]],
+        rate: float | None = None,
+        batch_size: int = 100,
+        fsync_interval: float = 1.0,
+        retry_delay: float = 1.0,
+        max_retry_delay: float = 60.0,
+        segment_bytes: int = 4 * 1024 * 1024,
+        max_bytes: int = 256 * 1024 * 1024,
+    ) -> None:
+        """
+        :param directory: The directory of the spool.
+        :param send: Coroutine function delivering a batch of records; raises if it failed.
+        :param rate: Maximum records per second sent to the sink, e.g. to catch up after an
+                     outage without overloading it. None: as fast as the sink accepts them.
+        :param batch_size: Maximum number of records per `send`.
+        :param fsync_interval: Seconds between two fsyncs of the spool.
+        :param retry_delay: Seconds to wait before the first retry of a failed batch.
+        :param max_retry_delay: Maximum seconds between two retries.
+        :param segment_bytes: Size of a spool segment in bytes.
+        :param max_bytes: Maximum size of the spool in bytes, the oldest records are dropped
+                          beyond it.
+        """
+        self.spool = DiskSpool(directory, segment_bytes, max_bytes)
+        self.send = send
+        self.limiter = TokenBucket(rate, batch_size) if rate else None
+        self.batch_size = batch_size
+        self.fsync_interval = fsync_interval
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.stats = OutboxStats()
+        self._wakeup = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+
+    def put(self, record: Mapping[str, Any]) -> None:
+        """Spools a record; objects like `ReturnOutputData` are stored as their attributes."""
+        self.spool.append(json.dumps(record, default=vars, separators=(",", ":")).encode())
+        self._wakeup.set()
+
+    def on_result(self, device: str, method: str, value: Any) -> None:
+        """A result callback for `PollScheduler`."""
+        if value is not None:
+            self.put({"device": device, "method": method, "time": time.time(), "value": value})
+
+    async def _sync(self) -> None:
+        while True:
+            await asyncio.sleep(self.fsync_interval)
+            await self.spool.sync()
+
+    async def _deliver(self, records: list[bytes]) -> None:
+        if self.limiter is not None:
+            for _ in records:
+                await self.limiter.acquire()
+        await self.send([json.loads(record) for record in records])
+
+    async def _drain(self) -> None:
+        position = self.spool.acked
+        delay = self.retry_delay
+        while True:
+            self._wakeup.clear()
+            self.spool.flush()
+            records, next_position = await asyncio.to_thread(self.spool.read, position, self.batch_size)
+            if not records:
+                await self._wakeup.wait()
+                continue
+            try:
+                await self._deliver(records)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:  # pylint: disable=broad-except
+                self.stats.failures += 1
+                _LOGGER.warning("Delivering %d records failed, retrying in %.1f s: %s", len(records), delay, exc)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_retry_delay)
+                continue
+            delay = self.retry_delay
+            await asyncio.to_thread(self.spool.ack, next_position)
+            position = next_position
+            self.stats.delivered += len(records)
+            self.stats.batches += 1
+
+    def start(self) -> None:
+        """Starts delivering and syncing in the running event loop."""
+        self._tasks = [asyncio.create_task(self._drain()), asyncio.create_task(self._sync())]
+
+    async def stop(self) -> None:
+        """Stops delivering and closes the spool; undelivered records stay on disk."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self.spool.close()
+
+    async def __aenter__(self) -> "Outbox":
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.stop()
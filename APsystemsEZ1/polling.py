@@ -0,0 +1,294 @@
+import asyncio
+import datetime
+import heapq
+import inspect
+import itertools
+import logging
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Mapping
+
+from . import APsystemsEZ1M, ReturnAlarmInfo, ReturnOutputData
+from .monitor import cycle_done, operation, phase
+from .profiling import PollProfiler
+from .sun import NightMode
+from .transport import probe_port
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class PollRate:
+    """The poll interval of one `APsystemsEZ1M` getter.
+
+    Adaptive getters stretch their interval towards `max_interval` while the values are stable
+    and jump back to `min_interval` on activity. Without bounds the interval is fixed. Getters
+    polled only `once` are retried every `interval` seconds until they succeed.
+    """
+
+    interval: float
+    min_interval: float | None = None
+    max_interval: float | None = None
+    once: bool = False
+
+
+DEFAULT_RATES: dict[str, PollRate] = {
+    "get_output_data": PollRate(1.0, min_interval=1.0, max_interval=10.0),
+    "get_alarm_info": PollRate(30.0, min_interval=5.0, max_interval=120.0),
+    "get_max_power": PollRate(300.0),
+    "get_device_power_status": PollRate(300.0),
+    "get_device_info": PollRate(60.0, once=True),
+}
+"""Default poll rates by `APsystemsEZ1M` method name."""
+
+ResultCallback = Callable[[str, str, Any], Awaitable[None] | None]
+
+
+def _alarm_active(alarm: ReturnAlarmInfo) -> bool:
+    return alarm.offgrid or alarm.shortcircuit_1 or alarm.shortcircuit_2 or not alarm.operating
+
+
+class PollScheduler:
+    """Polls every getter of every inverter on its own, adaptive interval.
+
+    The first poll of each getter is spread evenly over its interval across the fleet, so the
+    devices are not polled in bursts. Output data is polled more slowly while the power is stable
+    and at the fastest rate again as soon as it ramps by more than `ramp_threshold` watts or an
+    alarm shows up; the alarm interval tightens while an alarm is active.
+
+    With a `NightMode` polling is suspended at night, or slowed down to one poll per getter every
+    `night_interval` seconds. A poll of a device at night, and its first poll after the night, is
+    preceded by a cheap TCP probe; while the device's port is still closed it is probed again
+    every `dawn_probe_interval` seconds instead of being polled. Once it answers, its intervals are
+    reset to their fastest rate and its debounce state is reset, so that the daily energy counters
+    start from the new day.
+    """
+
+    def __init__(
+        self,
+        inverters: Mapping[str, APsystemsEZ1M],
+        rates: dict[str, PollRate | None] | None = None,
+        on_result: ResultCallback | None = None,
+        ramp_threshold: float = 20.0,
+        stretch: float = 1.5,
+        concurrency: int = 64,
+        night_mode: NightMode | None = None,
+        dawn_probe_interval: float = 60.0,
+        profiler: PollProfiler | None = None,
+        cycle_interval: float | None = None,
+    ) -> None:
+        """
+        :param inverters: The inverters to poll by name.
+        :param rates: Poll rates by method name, merged into `DEFAULT_RATES`. Set a rate to None
+                      to not poll that getter at all.
+        :param on_result: Called (or awaited) with device name, method name and the result of
+                          every poll. The result is None if the poll failed.
+        :param ramp_threshold: Change of the total power in watts that counts as activity.
+        :param stretch: Factor an adaptive interval grows by after a poll without activity.
+        :param concurrency: Maximum number of polls running at the same time.
+        :param night_mode: Suspend polling at night, see `NightMode`.
+        :param dawn_probe_interval: Seconds between two TCP probes of a device after the night.
+        :param profiler: Profiles poll cycles on demand, see `PollProfiler`. By default a profiler
+                         configured by `APSYSTEMS_EZ1_PROFILE`. While the scheduler runs,
+                         SIGUSR1 starts the profiler.
+        :param cycle_interval: Seconds per poll cycle, after which a running `LoopMonitor` starts
+                               new statistics. Default: the shortest poll interval.
+        """
+        self.inverters = dict(inverters)
+        merged = {**DEFAULT_RATES, **(rates or {})}
+        self.rates: dict[str, PollRate] = {name: rate for name, rate in merged.items() if rate is not None}
+        self.on_result = on_result
+        self.ramp_threshold = ramp_threshold
+        self.stretch = stretch
+        self.intervals: dict[tuple[str, str], float] = {
+            (device, method): rate.interval for device in self.inverters for method, rate in self.rates.items()
+        }
+        self.last: dict[tuple[str, str], Any] = {}
+        self.night_mode = night_mode
+        self.dawn_probe_interval = dawn_probe_interval
+        self.asleep: set[str] = set()
+        self._night_polls: set[tuple[str, str]] = set()
+        self.profiler = profiler if profiler is not None else PollProfiler.from_env()
+        self.cycle_interval = cycle_interval or min(
+            (rate.interval for rate in self.rates.values() if not rate.once), default=60.0
+        )
+        self._phase = {device: index / len(self.inverters) for index, device in enumerate(self.inverters)}
+        self.polls = 0
+        self._concurrency = asyncio.Semaphore(concurrency)
+        self._heap: list[tuple[float, int, str, str]] = []
+        self._sequence = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._tasks: set[asyncio.Task] = set()
+        self._running = False
+
+    def add(self, device: str, ez1m: APsystemsEZ1M) -> None:
+        """Adds an inverter to poll. Can be called while the scheduler runs."""
+        self.inverters[device] = ez1m
+        # Golden ratio steps keep devices added one by one spread over the interval.
+        self._phase[device] = (len(self._phase) * 0.6180339887) % 1.0
+        for method, rate in self.rates.items():
+            self.intervals[(device, method)] = rate.interval
+            if self._running:
+                now = asyncio.get_running_loop().time()
+                self._schedule(now + (0.0 if rate.once else rate.interval * self._phase[device]), device, method)
+
+    def remove(self, device: str) -> APsystemsEZ1M:
+        """Stops polling an inverter and returns it."""
+        ez1m = self.inverters.pop(device)
+        self._phase.pop(device, None)
+        self.asleep.discard(device)
+        for method in self.rates:
+            self.intervals.pop((device, method), None)
+            self.last.pop((device, method), None)
+            self._night_polls.discard((device, method))
+        self._heap = [entry for entry in self._heap if entry[2] != device]
+        heapq.heapify(self._heap)
+        return ez1m
+
+    def _schedule(self, due: float, device: str, method: str) -> None:
+        heapq.heappush(self._heap, (due, next(self._sequence), device, method))
+        self._wakeup.set()
+
+    def _stagger(self, now: float) -> None:
+        for device, offset in self._phase.items():
+            for method, rate in self.rates.items():
+                self._schedule(now + (0.0 if rate.once else rate.interval * offset), device, method)
+
+    def _wake(self, device: str) -> None:
+        """Prepares a device for its first poll after the night."""
+        self.asleep.discard(device)
+        for method, rate in self.rates.items():
+            self.intervals[(device, method)] = rate.min_interval or rate.interval
+        ez1m = self.inverters[device]
+        if isinstance(ez1m, APsystemsEZ1M) and ez1m.enable_debounce:
+            ez1m.reset_debounce()
+
+    async def _dawn_probe(self, device: str) -> bool:
+        ez1m = self.inverters[device]
+        if not isinstance(ez1m, APsystemsEZ1M):
+            return True
+        return await probe_port(ez1m.ip_address, ez1m.port, ez1m.probe_timeout)
+
+    def _activity(self, device: str, method: str, previous: Any, value: Any) -> bool | None:
+        """True on activity, False when stable, None for getters with a fixed interval."""
+        if method == "get_output_data":
+            if not isinstance(value, ReturnOutputData) or not isinstance(previous, ReturnOutputData):
+                return value is not None and previous is None
+            return abs((value.p1 + value.p2) - (previous.p1 + previous.p2)) > self.ramp_threshold
+        if method == "get_alarm_info":
+            if not isinstance(value, ReturnAlarmInfo):
+                return False
+            active = _alarm_active(value) or (previous is not None and value != previous)
+            if active and (device, "get_output_data") in self.intervals:
+                rate = self.rates["get_output_data"]
+                self.intervals[(device, "get_output_data")] = rate.min_interval or rate.interval
+            return active
+        return None
+
+    def _next_interval(self, device: str, method: str, value: Any) -> float:
+        rate = self.rates[method]
+        key = (device, method)
+        interval = self.intervals[key]
+        activity = self._activity(device, method, self.last.get(key), value)
+        if activity:
+            interval = rate.min_interval or rate.interval
+        elif activity is False:
+            interval = min(rate.max_interval or rate.interval, interval * self.stretch)
+        if value is not None:
+            self.last[key] = value
+        self.intervals[key] = interval
+        return interval
+
+    async def _poll(self, device: str, method: str) -> None:
+        with operation(device, method):
+            await self._poll_device(device, method)
+
+    async def _poll_device(self, device: str, method: str) -> None:
+        async with self._concurrency:
+            if device not in self.inverters:
+                return
+            if device in self.asleep:
+                if not await self._dawn_probe(device):
+                    self._schedule(
+                        asyncio.get_running_loop().time() + self.dawn_probe_interval, device, method
+                    )
+                    return
+                self._wake(device)
+            try:
+                value = await getattr(self.inverters[device], method)()
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:  # pylint: disable=broad-except
+                _LOGGER.debug("%s of %s failed: %s", method, device, exc)
+                value = None
+        if device not in self.inverters:
+            return
+        self.polls += 1
+        if self.profiler is not None:
+            self.profiler.poll_done()
+        interval = self._next_interval(device, method, value)
+        if not self.rates[method].once or value is None:
+            self._schedule(asyncio.get_running_loop().time() + interval, device, method)
+        if self.on_result is not None:
+            with phase("sinks"):
+                result = self.on_result(device, method, value)
+                if inspect.isawaitable(result):
+                    await result
+
+    async def run(self) -> None:
+        """Polls until cancelled."""
+        loop = asyncio.get_running_loop()
+        profile_on_signal = False
+        if self.profiler is not None:
+            try:
+                self.profiler.install_signal_handler()
+                profile_on_signal = True
+            except (NotImplementedError, RuntimeError, ValueError) as exc:
+                _LOGGER.debug("Cannot start profiling on a signal: %s", exc)
+            if self.profiler.autostart:
+                self.profiler.start()
+        self._stagger(loop.time())
+        next_cycle = loop.time() + self.cycle_interval
+        self._running = True
+        try:
+            while True:
+                self._wakeup.clear()
+                now = loop.time()
+                if now >= next_cycle:
+                    cycle_done()
+                    next_cycle = now + self.cycle_interval
+                due = min(self._heap[0][0], next_cycle) if self._heap else next_cycle
+                if due > now:
+                    # Not wait_for: on Python 3.11 it can swallow a cancellation that arrives
+                    # just as the wakeup event is set.
+                    timer = loop.call_later(due - now, self._wakeup.set)
+                    try:
+                        await self._wakeup.wait()
+                    finally:
+                        timer.cancel()
+                    continue
+                _, _, device, method = heapq.heappop(self._heap)
+                if self.night_mode is not None and (
+                    pause := self.night_mode.pause(datetime.datetime.now(datetime.timezone.utc))
+                ):
+                    self.asleep.add(device)
+                    if self.night_mode.night_interval is None or (device, method) not in self._night_polls:
+                        # With a night interval, the entry comes due again after the pause and is
+                        # polled then (behind the dawn probe, as the device is asleep).
+                        if self.night_mode.night_interval is not None:
+                            self._night_polls.add((device, method))
+                        rate = self.rates[method]
+                        offset = 0.0 if rate.once else rate.interval * self._phase[device]
+                        self._schedule(loop.time() + pause + offset, device, method)
+                        continue
+                self._night_polls.discard((device, method))
+                task = asyncio.create_task(self._poll(device, method))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+        finally:
+            self._running = False
+            if profile_on_signal:
+                self.profiler.remove_signal_handler()
+            tasks = list(self._tasks)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,201 @@
+import cProfile
+import io
+import logging
+import os
+import pstats
+import signal
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from types import FrameType
+
+_LOGGER = logging.getLogger(__name__)
+
+PROFILE_ENV = "APSYSTEMS_EZ1_PROFILE"
+"""Configures the profiler of every `PollScheduler` as `CYCLES[:MODE][:start]`, e.g. `200`,
+`200:cprofile` or `200:start`. The profiler is armed and started by SIGUSR1; `start` also starts
+it with the scheduler. `off` disables the profiler and its signal handler."""
+
+PROFILE_DIR_ENV = "APSYSTEMS_EZ1_PROFILE_DIR"
+"""The directory profiles are written to. Defaults to the temporary directory."""
+
+
+def _frame_name(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class PollProfiler:
+    """Profiles a number of poll cycles of a `PollScheduler` on demand.
+
+    Armed with `start` (or with a signal, see `install_signal_handler`), the profiler records
+    everything the event loop thread does until `cycles` polls of any device have completed, so
+    the profile covers the whole fleet. Then it writes a report of the hottest functions and,
+    in "sampling" mode, the sampled stacks in the collapsed format of flame graph tools
+    (`flamegraph.pl`, speedscope) or, in "cprofile" mode, the `pstats` file.
+
+    The "sampling" mode takes a stack sample of the loop thread every `interval` seconds from a
+    background thread and adds almost no overhead; "cprofile" traces every call and is exact,
+    but slows the poller down considerably while it runs.
+    """
+
+    def __init__(
+        self,
+        cycles: int = 200,
+        mode: str = "sampling",
+        interval: float = 0.001,
+        output_dir: str | Path | None = None,
+        top: int = 25,
+        autostart: bool = False,
+    ) -> None:
+        """
+        :param cycles: Number of polls to profile after `start`.
+        :param mode: "sampling" or "cprofile".
+        :param interval: Seconds between two stack samples in "sampling" mode.
+        :param output_dir: The directory the profiles are written to. Default: the temporary
+                           directory.
+        :param top: Number of functions in the report.
+        :param autostart: Start profiling when the `PollScheduler` starts.
+        """
+        if mode not in ("sampling", "cprofile"):
+            raise ValueError(f"Unknown profiling mode: {mode}")
+        self.cycles = cycles
+        self.mode = mode
+        self.interval = interval
+        self.output_dir = Path(output_dir or tempfile.gettempdir())
+        self.top = top
+        self.autostart = autostart
+        self.stacks: Counter[str] = Counter()
+        self.profile: cProfile.Profile | None = None
+        self.last_paths: list[Path] = []
+        self._remaining = 0
+        self._profiled = 0
+        self._started = 0.0
+        self._thread_id: int | None = None
+        self._sampler: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    @classmethod
+    def from_env(cls) -> "PollProfiler | None":
+        """
+        A profiler configured by `APSYSTEMS_EZ1_PROFILE`, or None if it is "off". Unless asked
+        to start right away, the profiler only waits for a signal.
+        """
+        value = os.environ.get(PROFILE_ENV, "")
+        if value == "off":
+            return None
+        options: dict = {"output_dir": os.environ.get(PROFILE_DIR_ENV)}
+        for token in filter(None, value.split(":")):
+            if token == "start":
+                options["autostart"] = True
+            elif token.isdigit():
+                options["cycles"] = int(token)
+            else:
+                options["mode"] = token
+        return cls(**options)
+
+    @property
+    def active(self) -> bool:
+        return self._remaining > 0
+
+    def start(self, cycles: int | None = None) -> None:
+        """Starts profiling the next `cycles` polls. Must be called from the event loop thread."""
+        if self.active:
+            return
+        self._remaining = self._profiled = cycles or self.cycles
+        self._started = time.perf_counter()
+        self.stacks = Counter()
+        if self.mode == "cprofile":
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+            return
+        self._thread_id = threading.get_ident()
+        self._stop.clear()
+        self._sampler = threading.Thread(target=self._sample, name="APsystemsEZ1-profiler", daemon=True)
+        self._sampler.start()
+
+    def install_signal_handler(self, signum: int | None = None) -> None:
+        """
+        Starts profiling whenever the process receives `signum`, by default SIGUSR1
+        (`kill -USR1 <pid>`). Must be called from the event loop in the main thread.
+        """
+        import asyncio  # pylint: disable=import-outside-toplevel
+
+        asyncio.get_running_loop().add_signal_handler(signum or signal.SIGUSR1, self.start)
+
+    def remove_signal_handler(self, signum: int | None = None) -> None:
+        import asyncio  # pylint: disable=import-outside-toplevel
+
+        asyncio.get_running_loop().remove_signal_handler(signum or signal.SIGUSR1)
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)  # pylint: disable=protected-access
+            names = []
+            while frame is not None:
+                names.append(_frame_name(frame))
+                frame = frame.f_back
+            if names:
+                self.stacks[";".join(reversed(names))] += 1
+
+    def poll_done(self) -> None:
+        """Counts a completed poll; called by `PollScheduler`."""
+        if not self.active:
+            return
+        self._remaining -= 1
+        if not self._remaining:
+            self.stop()
+
+    def stop(self) -> list[Path]:
+        """Stops profiling and writes the profile. Returns the paths of the files written."""
+        self._remaining = 0
+        elapsed = time.perf_counter() - self._started
+        if self.profile is not None:
+            self.profile.disable()
+        if self._sampler is not None:
+            self._stop.set()
+            self._sampler.join()
+            self._sampler = None
+        self.last_paths = self.dump(elapsed)
+        return self.last_paths
+
+    def report(self) -> str:
+        """The hottest functions of the last profile, as text."""
+        if self.mode == "cprofile":
+            if self.profile is None:
+                return ""
+            out = io.StringIO()
+            pstats.Stats(self.profile, stream=out).sort_stats("tottime").print_stats(self.top)
+            return out.getvalue()
+        total = sum(self.stacks.values())
+        if not total:
+            return "No samples\n"
+        own: Counter[str] = Counter()
+        inclusive: Counter[str] = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            for name in set(frames):
+                inclusive[name] += count
+        lines = [f"{total} samples", f"{'own %':>7} {'total %':>8}  function"]
+        for name, count in own.most_common(self.top):
+            lines.append(f"{count / total:>7.1%} {inclusive[name] / total:>8.1%}  {name}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, elapsed: float = 0.0) -> list[Path]:
+        """Writes the report and the profile to `output_dir`."""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        base = self.output_dir / f"ez1-profile-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        paths = [base.with_suffix(".txt")]
+        paths[0].write_text(f"{self._profiled} poll cycles in {elapsed:.3f} s ({self.mode})\n" + self.report())
+        if self.mode == "cprofile" and self.profile is not None:
+            paths.append(base.with_suffix(".prof"))
+            self.profile.dump_stats(paths[-1])
+        else:
+            paths.append(base.with_suffix(".collapsed"))
+            paths[-1].write_text("".join(f"{stack} {count}\n" for stack, count in self.stacks.items()))
+        _LOGGER.info("Wrote poll profile to %s", ", ".join(map(str, paths)))
+        return paths
@@ -0,0 +1,115 @@
+import asyncio
+import ipaddress
+import time
+from dataclasses import dataclass
+
+
+class TokenBucket:
+    """An async token bucket: `rate` tokens per second, at most `burst` tokens saved up.
+
+    Waiters are served in FIFO order.
+    """
+
+    def __init__(self, rate: float, burst: float) -> None:
+        """
+        :param rate: Sustained rate in tokens per second.
+        :param burst: Capacity of the bucket, i.e. how many tokens can be taken at once.
+        """
+        if rate <= 0 or burst < 1:
+            raise ValueError(f"Invalid token bucket: rate={rate}, burst={burst}")
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> float:
+        """
+        Takes a token, waiting for it if the bucket is empty.
+
+        :return: Seconds waited for the token.
+        """
+        started = time.monotonic()
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+        return time.monotonic() - started
+
+
+@dataclass
+class RateLimiterStats:
+    requests: int = 0
+    delayed: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+    @property
+    def mean_wait(self) -> float:
+        """Mean time in seconds a request waited for its tokens."""
+        return self.total_wait / self.requests if self.requests else 0.0
+
+
+class FleetRateLimiter:
+    """Caps the request rate of many `APsystemsEZ1M` clients, globally and per subnet.
+
+    Share one limiter between all clients of a site (`APsystemsEZ1M(..., rate_limiter=...)`).
+    Every request takes a token from the bucket of its subnet and from the global bucket.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: float = 10,
+        subnet_rate: float | None = None,
+        subnet_burst: float | None = None,
+        subnet_prefix: int = 24,
+    ) -> None:
+        """
+        :param rate: Sustained requests per second of the whole fleet.
+        :param burst: Requests the whole fleet may send at once.
+        :param subnet_rate: Sustained requests per second per subnet. None: no subnet limit.
+        :param subnet_burst: Requests per subnet at once. Defaults to `burst`.
+        :param subnet_prefix: Prefix length that defines a subnet, e.g. 24 for a /24.
+        """
+        self.bucket = TokenBucket(rate, burst)
+        self.subnet_rate = subnet_rate
+        self.subnet_burst = subnet_burst if subnet_burst is not None else burst
+        self.subnet_prefix = subnet_prefix
+        self.subnets: dict[str, TokenBucket] = {}
+        self.stats = RateLimiterStats()
+
+    def subnet(self, host: str) -> str:
+        """The subnet a host belongs to. Host names are their own subnet."""
+        try:
+            return str(ipaddress.ip_network(f"{host}/{self.subnet_prefix}", strict=False))
+        except ValueError:
+            return host
+
+    async def acquire(self, host: str) -> float:
+        """
+        Waits until a request to `host` may be sent.
+
+        :return: Seconds waited.
+        """
+        started = time.monotonic()
+        if self.subnet_rate is not None:
+            subnet = self.subnet(host)
+            if subnet not in self.subnets:
+                self.subnets[subnet] = TokenBucket(self.subnet_rate, self.subnet_burst)
+            await self.subnets[subnet].acquire()
+        await self.bucket.acquire()
+        waited = time.monotonic() - started
+        self.stats.requests += 1
+        self.stats.total_wait += waited
+        self.stats.max_wait = max(self.stats.max_wait, waited)
+        if waited > 0.001:
+            self.stats.delayed += 1
+        return waited
@@ -0,0 +1,220 @@
+import asyncio
+import ipaddress
+import json
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+from . import APsystemsEZ1M, ReturnDeviceInfo
+from .discovery import discover
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class DeviceMismatchError(Exception):
+    pass
+
+
+@dataclass
+class RegistryEntry:
+    device_id: str
+    ip_address: str
+    port: int = 8050
+    device_info: ReturnDeviceInfo | None = None
+    last_seen: float = 0.0
+
+
+class RegisteredEZ1M(APsystemsEZ1M):
+    """An `APsystemsEZ1M` that is addressed by deviceId through a `DeviceRegistry`.
+
+    Every response is checked against the expected deviceId. After `failure_threshold` failed
+    requests in a row, or when another device answers, the registry re-resolves the device's
+    address in the background, at most once per rescan interval (see `DeviceRegistry`).
+    """
+
+    def __init__(self, registry: "DeviceRegistry", entry: RegistryEntry, **kwargs: Any) -> None:
+        super().__init__(entry.ip_address, port=entry.port, **kwargs)
+        self.registry = registry
+        self.device_id = entry.device_id
+        self.failures = 0
+
+    def set_address(self, ip_address: str, port: int) -> None:
+        self.ip_address, self.port = ip_address, port
+        self._reachable = True
+        self.base_url = f"http://{ip_address}:{port}"
+        self.failures = 0
+
+    async def _request(self, endpoint: str, retry: int = 3) -> dict | None:
+        try:
+            response = await super()._request(endpoint, retry)
+        except Exception:
+            self.failures += 1
+            if self.failures >= self.registry.failure_threshold:
+                self.registry.schedule_resolve(self.device_id)
+            raise
+        if response and response.get("deviceId") not in (None, "", self.device_id):
+            self.registry.schedule_resolve(self.device_id)
+            raise DeviceMismatchError(
+                f"Expected {self.device_id} at {self.base_url}, got {response['deviceId']}"
+            )
+        self.failures = 0
+        self.registry.seen(self.device_id)
+        return response
+
+
+class DeviceRegistry:
+    """Persists the last known address and device information of every inverter by deviceId.
+
+    Clients are created from the registry file without any request to the devices, so a large
+    fleet starts up instantly. When a device stops answering (e.g. because its DHCP lease
+    changed) the registry rescans the network for it and moves its client to the new address.
+
+    A device is rescanned at most every `rescan_interval` seconds; every rescan that does not
+    find it doubles the interval, up to `max_rescan_interval`. So inverters that are simply off
+    at night do not flood the network with rescans.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        network: str | None = None,
+        failure_threshold: int = 3,
+        client_options: dict[str, Any] | None = None,
+        rescan_interval: float = 300.0,
+        max_rescan_interval: float = 3600.0,
+    ) -> None:
+        """
+        :param path: The JSON file the registry is stored in.
+        :param network: The subnet to rescan. Defaults to the /24 of the device's last address.
+        :param failure_threshold: Failed requests in a row before a device is re-resolved.
+        :param client_options: Keyword arguments for every `RegisteredEZ1M`, e.g. `timeout`.
+        :param rescan_interval: Minimum seconds between two rescans for the same device.
+        :param max_rescan_interval: Upper bound of the rescan interval after failed rescans.
+        """
+        self.path = Path(path)
+        self.network = network
+        self.failure_threshold = failure_threshold
+        self.client_options = client_options or {}
+        self.rescan_interval = rescan_interval
+        self.max_rescan_interval = max_rescan_interval
+        self.entries: dict[str, RegistryEntry] = {}
+        self.clients: dict[str, RegisteredEZ1M] = {}
+        self._resolving: dict[str, asyncio.Task] = {}
+        self._rescan_delay: dict[str, float] = {}
+        self._next_rescan: dict[str, float] = {}
+        self.load()
+
+    def load(self) -> None:
+        """Loads the registry file, if it exists."""
+        if not self.path.exists():
+            return
+        devices = json.loads(self.path.read_text(encoding="utf-8")).get("devices", {})
+        for device_id, entry in devices.items():
+            info = entry.get("device_info")
+            self.entries[device_id] = RegistryEntry(
+                device_id=device_id,
+                ip_address=entry["ip_address"],
+                port=entry.get("port", 8050),
+                device_info=ReturnDeviceInfo(**info) if info else None,
+                last_seen=entry.get("last_seen", 0.0),
+            )
+
+    def save(self) -> None:
+        """Writes the registry file atomically."""
+        devices = {
+            device_id: {
+                "ip_address": entry.ip_address,
+                "port": entry.port,
+                "device_info": asdict(entry.device_info) if entry.device_info else None,
+                "last_seen": entry.last_seen,
+            }
+            for device_id, entry in self.entries.items()
+        }
+        temporary = self.path.with_name(self.path.name + ".tmp")
+        temporary.write_text(json.dumps({"devices": devices}, indent=2), encoding="utf-8")
+        os.replace(temporary, self.path)
+
+    def register(self, info: ReturnDeviceInfo, ip_address: str | None = None, port: int = 8050) -> RegistryEntry:
+        """Adds or updates a device from its `ReturnDeviceInfo`."""
+        entry = self.entries.get(info.deviceId)
+        ip_address = ip_address or info.ipAddr
+        if entry is None:
+            entry = self.entries[info.deviceId] = RegistryEntry(info.deviceId, ip_address, port)
+        elif (entry.ip_address, entry.port) != (ip_address, port):
+            _LOGGER.info("%s moved from %s to %s", info.deviceId, entry.ip_address, ip_address)
+            entry.ip_address, entry.port = ip_address, port
+            if (client := self.clients.get(info.deviceId)) is not None:
+                client.set_address(ip_address, port)
+        entry.device_info = info
+        entry.last_seen = time.time()
+        return entry
+
+    def seen(self, device_id: str) -> None:
+        if (entry := self.entries.get(device_id)) is not None:
+            entry.last_seen = time.time()
+
+    async def add(self, ip_address: str, port: int = 8050) -> RegisteredEZ1M:
+        """Registers the inverter at an address and returns its client."""
+        info = await APsystemsEZ1M(ip_address, port=port, **self.client_options).get_device_info()
+        if info is None:
+            raise DeviceMismatchError(f"No device information from {ip_address}:{port}")
+        self.register(info, ip_address, port)
+        self.save()
+        return self.client(info.deviceId)
+
+    def client(self, device_id: str) -> RegisteredEZ1M:
+        """Returns the (cached) client of a registered device."""
+        if device_id not in self.clients:
+            self.clients[device_id] = RegisteredEZ1M(
+                self, self.entries[device_id], **self.client_options
+            )
+        return self.clients[device_id]
+
+    def device_info(self, device_id: str) -> ReturnDeviceInfo | None:
+        """Returns the cached device information, without a request to the device."""
+        return self.entries[device_id].device_info
+
+    async def resolve(self, device_id: str) -> RegistryEntry | None:
+        """
+        Rescans the network for a device and updates the addresses of all devices found.
+
+        :return: The updated entry, or None if the device was not found.
+        """
+        entry = self.entries[device_id]
+        network = self.network or str(ipaddress.ip_network(f"{entry.ip_address}/24", strict=False))
+        found = await discover(network, port=entry.port)
+        for info in found.values():
+            self.register(info, info.ipAddr, entry.port)
+        self.save()
+        return self.entries[device_id] if device_id in found else None
+
+    def schedule_resolve(self, device_id: str) -> asyncio.Task:
+        """
+        Starts a background `resolve` of a device, unless one is already running or the last one
+        was less than the rescan interval ago. Returns the running or the last task.
+        """
+        task = self._resolving.get(device_id)
+        if task is not None and (not task.done() or time.monotonic() < self._next_rescan.get(device_id, 0.0)):
+            return task
+        task = self._resolving[device_id] = asyncio.create_task(self._resolve(device_id))
+        return task
+
+    async def _resolve(self, device_id: str) -> None:
+        found = None
+        try:
+            found = await self.resolve(device_id)
+            if found is None:
+                _LOGGER.warning("%s not found in the network", device_id)
+        except Exception as exc:  # pylint: disable=broad-except
+            _LOGGER.warning("Resolving %s failed: %s", device_id, exc)
+        finally:
+            delay = self._rescan_delay.get(device_id, self.rescan_interval)
+            self._next_rescan[device_id] = time.monotonic() + delay
+            self._rescan_delay[device_id] = (
+                self.rescan_interval if found is not None else min(self.max_rescan_interval, delay * 2)
+            )
+            if (client := self.clients.get(device_id)) is not None:
+                client.failures = 0
@@ -0,0 +1,170 @@
+import asyncio
+import functools
+import heapq
+import itertools
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+PRIORITY_WRITE = 0
+PRIORITY_READ = 1
+
+
+@dataclass
+class RequestQueueStats:
+    submitted: int = 0
+    completed: int = 0
+    coalesced: int = 0
+    max_depth: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+    @property
+    def mean_wait(self) -> float:
+        """Mean time in seconds a request waited in the queue before it was sent."""
+        started = self.submitted - self.coalesced
+        return self.total_wait / started if started else 0.0
+
+
+class RequestQueue:
+    """Serializes the requests sent to a single inverter.
+
+    At most `max_in_flight` requests are sent to the device at the same time, all others wait
+    in a queue. Writes jump ahead of queued reads, and a read of an endpoint that is already
+    waiting in the queue is not queued a second time: its caller shares the result of the
+    pending request instead. A request whose callers are all cancelled is dropped from the
+    queue, or cancelled if it was already sent, so that it gives back its slot.
+    """
+
+    def __init__(self, max_in_flight: int = 1) -> None:
+        """
+        :param max_in_flight: Maximum number of concurrent requests to the device.
+        """
+        if max_in_flight < 1:
+            raise ValueError(f"max_in_flight must be at least 1, got '{max_in_flight}'")
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.stats = RequestQueueStats()
+        self._heap: list[tuple[int, int, float, str, Callable[[], Awaitable[Any]], asyncio.Future]] = []
+        self._pending_reads: dict[str, asyncio.Future] = {}
+        self._sequence = itertools.count()
+        self._tasks: set[asyncio.Task] = set()
+        self._running: dict[asyncio.Future, asyncio.Task] = {}
+        self._waiters: dict[asyncio.Future, int] = {}
+
+    @property
+    def depth(self) -> int:
+        """Number of requests waiting to be sent."""
+        return len(self._heap)
+
+    async def submit(
+        self, endpoint: str, send: Callable[[], Awaitable[Any]], write: bool = False
+    ) -> Any:
+        """
+        Queues a request and waits for its result.
+
+        :param endpoint: The endpoint (including query) the request is sent to. Used to detect
+                         duplicate reads.
+        :param send: Coroutine function that sends the request once it is the request's turn.
+        :param write: Whether the request changes the device state.
+        :return: The result of `send`.
+        """
+        self.stats.submitted += 1
+        if not write and (pending := self._pending_reads.get(endpoint)) is not None:
+            self.stats.coalesced += 1
+            return await self._wait(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(
+            self._heap,
+            (
+                PRIORITY_WRITE if write else PRIORITY_READ,
+                next(self._sequence),
+                time.monotonic(),
+                endpoint,
+                send,
+                future,
+            ),
+        )
+        if not write:
+            self._pending_reads[endpoint] = future
+        self.stats.max_depth = max(self.stats.max_depth, len(self._heap))
+        self._dispatch()
+        return await self._wait(future)
+
+    async def _wait(self, future: asyncio.Future) -> Any:
+        self._waiters[future] = self._waiters.get(future, 0) + 1
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if self._waiters[future] == 1 and not future.done():
+                self._abandon(future)
+            raise
+        finally:
+            self._waiters[future] -= 1
+            if not self._waiters[future]:
+                del self._waiters[future]
+
+    def _abandon(self, future: asyncio.Future) -> None:
+        """Drops or cancels a request nobody waits for anymore."""
+        task = self._running.get(future)
+        if task is not None:
+            task.cancel()
+            return
+        future.cancel()
+        self._heap = [entry for entry in self._heap if entry[5] is not future]
+        heapq.heapify(self._heap)
+        for endpoint, pending in list(self._pending_reads.items()):
+            if pending is future:
+                del self._pending_reads[endpoint]
+
+    def try_reserve(self) -> bool:
+        """
+        Takes a free slot right away, e.g. for a hedged request, unless requests are waiting for
+        one. A reserved slot must be given back with `release`.
+        """
+        if self._heap or self.in_flight >= self.max_in_flight:
+            return False
+        self.in_flight += 1
+        return True
+
+    def release(self) -> None:
+        """Gives back a slot taken with `try_reserve`."""
+        self.in_flight -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        while self.in_flight < self.max_in_flight and self._heap:
+            _, _, enqueued, endpoint, send, future = heapq.heappop(self._heap)
+            waited = time.monotonic() - enqueued
+            self.stats.total_wait += waited
+            self.stats.max_wait = max(self.stats.max_wait, waited)
+            # A started read must not be shared with new callers, they want a fresh value.
+            if self._pending_reads.get(endpoint) is future:
+                del self._pending_reads[endpoint]
+            self.in_flight += 1
+            task = asyncio.ensure_future(self._run(send, future))
+            self._running[future] = task
+            self._tasks.add(task)
+            task.add_done_callback(functools.partial(self._finished, future))
+
+    @staticmethod
+    async def _run(send: Callable[[], Awaitable[Any]], future: asyncio.Future) -> None:
+        try:
+            result = await send()
+        except Exception as exc:  # pylint: disable=broad-except
+            if not future.done():
+                future.set_exception(exc)
+        else:
+            if not future.done():
+                future.set_result(result)
+
+    def _finished(self, future: asyncio.Future, task: asyncio.Task) -> None:
+        # A done callback rather than `finally`, which is skipped for a task cancelled before
+        # it started.
+        self._tasks.discard(task)
+        del self._running[future]
+        future.cancel()
+        self.in_flight -= 1
+        self.stats.completed += 1
+        self._dispatch()
@@ -0,0 +1,323 @@
+import asyncio
+import dataclasses
+import inspect
+import logging
+import multiprocessing
+import os
+import queue
+from typing import Any, Callable, Mapping
+
+from aiohttp import ClientSession, TCPConnector
+
+from . import APsystemsEZ1M, ReturnAlarmInfo, ReturnDeviceInfo, ReturnOutputData
+from .polling import PollRate, PollScheduler, ResultCallback
+
+_LOGGER = logging.getLogger(__name__)
+
+Address = str | tuple[str, int]
+"""An inverter address: an IP address (port 8050) or an (IP address, port) tuple."""
+
+METHODS = (
+    "get_output_data",
+    "get_alarm_info",
+    "get_device_info",
+    "get_max_power",
+    "get_device_power_status",
+)
+"""The getters a shard can poll. Results refer to them by index to keep batches small."""
+
+_RESULT_TYPES = {
+    "get_output_data": ReturnOutputData,
+    "get_alarm_info": ReturnAlarmInfo,
+    "get_device_info": ReturnDeviceInfo,
+}
+
+
+def encode(method: str, value: Any) -> tuple:
+    """Packs a poll result into a (method index, plain values) tuple that pickles compactly."""
+    if dataclasses.is_dataclass(value):
+        value = dataclasses.astuple(value)
+    return METHODS.index(method), value
+
+
+def decode(code: int, value: Any) -> tuple[str, Any]:
+    """The inverse of `encode`: returns the method name and the result object."""
+    method = METHODS[code]
+    result_type = _RESULT_TYPES.get(method)
+    if result_type is None or value is None:
+        return method, value
+    if result_type is ReturnOutputData:
+        return method, ReturnOutputData(**dict(zip(("p1", "e1", "te1", "p2", "e2", "te2"), value)))
+    return method, result_type(*value)
+
+
+def _split_address(address: Address) -> tuple[str, int]:
+    if isinstance(address, str):
+        return address, 8050
+    return address[0], address[1]
+
+
+async def _run_shard(
+    shard: int,
+    devices: dict[str, Address],
+    rates: dict[str, PollRate | None] | None,
+    client_options: dict[str, Any],
+    scheduler_options: dict[str, Any],
+    connection_limit: int,
+    batch_size: int,
+    batch_interval: float,
+    results: multiprocessing.Queue,
+    control: multiprocessing.Queue,
+) -> None:
+    loop = asyncio.get_running_loop()
+    batch: list[tuple] = []
+
+    def flush() -> None:
+        if batch:
+            results.put((shard, batch.copy()))
+            batch.clear()
+
+    def on_result(device: str, method: str, value: Any) -> None:
+        batch.append((device, *encode(method, value)))
+        if len(batch) >= batch_size:
+            flush()
+
+    async with ClientSession(connector=TCPConnector(limit=connection_limit)) as session:
+
+        def client(address: Address) -> APsystemsEZ1M:
+            ip_address, port = _split_address(address)
+            return APsystemsEZ1M(ip_address, port, session=session, **client_options)
+
+        scheduler = PollScheduler(
+            {name: client(address) for name, address in devices.items()},
+            rates=rates,
+            on_result=on_result,
+            **scheduler_options,
+        )
+        poller = asyncio.create_task(scheduler.run())
+        command = loop.run_in_executor(None, control.get)
+        try:
+            while True:
+                done, _ = await asyncio.wait({command, poller}, timeout=batch_interval)
+                flush()
+                if poller in done:
+                    poller.result()
+                if command not in done:
+                    continue
+                message = command.result()
+                if message is None:
+                    break
+                match message:
+                    case ("add", name, address):
+                        scheduler.add(name, client(address))
+                    case ("remove", name):
+                        scheduler.remove(name)
+                command = loop.run_in_executor(None, control.get)
+        finally:
+            poller.cancel()
+            await asyncio.gather(poller, return_exceptions=True)
+            flush()
+            results.put((shard, None))
+
+
+def _shard_main(*args) -> None:
+    """Entry point of a shard process."""
+    asyncio.run(_run_shard(*args))
+
+
+class ShardedPoller:
+    """Polls a large fleet from several processes, so that polling is not bound to one core.
+
+    The devices are split across `shards` worker processes. Each worker runs its own event loop
+    with one pooled `ClientSession` and a `PollScheduler` for its devices, and sends the results
+    back to the parent in batches of plain tuples (see `encode`). The parent decodes them and
+    passes them to `on_result`, like `PollScheduler` does.
+
+    Devices can be added and removed while the poller runs. New devices go to the shard with the
+    fewest devices; `rebalance` evens out the shards after removals. A device moved to another
+    shard starts with fresh client state (e.g. its debounce state).
+    """
+
+    def __init__(
+        self,
+        inverters: Mapping[str, Address],
+        shards: int | None = None,
+        rates: dict[str, PollRate | None] | None = None,
+        on_result: ResultCallback | None = None,
+        on_rebalance: Callable[[str, int, int], None] | None = None,
+        client_options: dict[str, Any] | None = None,
+        scheduler_options: dict[str, Any] | None = None,
+        connection_limit: int = 100,
+        batch_size: int = 500,
+        batch_interval: float = 0.2,
+        mp_context: str = "spawn",
+    ) -> None:
+        """
+        :param inverters: The addresses of the inverters to poll by name.
+        :param shards: Number of worker processes. Defaults to the number of CPUs.
+        :param rates: Poll rates by method name, see `PollScheduler`.
+        :param on_result: Called (or awaited) in the parent with device name, method name and
+                          the result of every poll. The result is None if the poll failed.
+        :param on_rebalance: Called with device name, old shard and new shard when a device is
+                             moved by `rebalance`.
+        :param client_options: Keyword arguments for the `APsystemsEZ1M` clients of the workers.
+        :param scheduler_options: Keyword arguments for the `PollScheduler` of the workers.
+        :param connection_limit: Maximum number of connections of a worker's session.
+        :param batch_size: Results a worker collects before it sends a batch.
+        :param batch_interval: Seconds after which a worker sends a batch that is not full.
+        :param mp_context: The multiprocessing start method.
+        :raises ValueError: If `rates` has a method a shard cannot poll, see `METHODS`.
+        """
+        unknown = sorted(set(rates or {}) - set(METHODS))
+        if unknown:
+            raise ValueError(f"Cannot poll {', '.join(unknown)} in a shard, expected some of {', '.join(METHODS)}")
+        self.inverters = dict(inverters)
+        count = shards or os.cpu_count() or 1
+        self.shards: list[list[str]] = [list(self.inverters)[shard::count] for shard in range(count)]
+        self.rates = rates
+        self.on_result = on_result
+        self.on_rebalance = on_rebalance
+        self.client_options = client_options or {}
+        self.scheduler_options = scheduler_options or {}
+        self.connection_limit = connection_limit
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.results = 0
+        self.batches = 0
+        self._context = multiprocessing.get_context(mp_context)
+        self._processes: list[multiprocessing.Process] = []
+        self._controls: list[multiprocessing.Queue] = []
+        self._results: multiprocessing.Queue | None = None
+        self._receiver: asyncio.Task | None = None
+
+    def shard_of(self, device: str) -> int:
+        """The shard a device is polled by."""
+        for shard, devices in enumerate(self.shards):
+            if device in devices:
+                return shard
+        raise KeyError(device)
+
+    def _send(self, shard: int, message: tuple) -> None:
+        if self._controls:
+            self._controls[shard].put(message)
+
+    def add(self, device: str, address: Address) -> int:
+        """
+        Adds an inverter to the shard with the fewest devices.
+
+        :return: The shard the inverter was added to.
+        """
+        if device in self.inverters:
+            raise ValueError(f"{device} is already polled")
+        shard = min(range(len(self.shards)), key=lambda index: len(self.shards[index]))
+        self.inverters[device] = address
+        self.shards[shard].append(device)
+        self._send(shard, ("add", device, address))
+        return shard
+
+    def remove(self, device: str) -> None:
+        """Stops polling an inverter."""
+        shard = self.shard_of(device)
+        self.shards[shard].remove(device)
+        del self.inverters[device]
+        self._send(shard, ("remove", device))
+
+    def rebalance(self) -> dict[str, tuple[int, int]]:
+        """
+        Moves devices from the largest to the smallest shards until their sizes differ by one at
+        most.
+
+        :return: The moved devices with their old and new shard.
+        """
+        moves: dict[str, tuple[int, int]] = {}
+        while True:
+            sizes = [len(devices) for devices in self.shards]
+            largest, smallest = sizes.index(max(sizes)), sizes.index(min(sizes))
+            if sizes[largest] - sizes[smallest] <= 1:
+                break
+            device = self.shards[largest].pop()
+            self.shards[smallest].append(device)
+            moves[device] = (moves.get(device, (largest,))[0], smallest)
+        for device, (old, new) in moves.items():
+            self._send(old, ("remove", device))
+            self._send(new, ("add", device, self.inverters[device]))
+            if self.on_rebalance is not None:
+                self.on_rebalance(device, old, new)
+        return moves
+
+    async def start(self) -> None:
+        """Starts the worker processes."""
+        self._results = self._context.Queue()
+        for shard, devices in enumerate(self.shards):
+            control = self._context.Queue()
+            process = self._context.Process(
+                target=_shard_main,
+                args=(
+                    shard,
+                    {device: self.inverters[device] for device in devices},
+                    self.rates,
+                    self.client_options,
+                    self.scheduler_options,
+                    self.connection_limit,
+                    self.batch_size,
+                    self.batch_interval,
+                    self._results,
+                    control,
+                ),
+                name=f"APsystemsEZ1-shard-{shard}",
+                daemon=True,
+            )
+            process.start()
+            self._processes.append(process)
+            self._controls.append(control)
+        self._receiver = asyncio.create_task(self._receive())
+
+    def _get_batch(self) -> tuple[int, list | None] | None:
+        while True:
+            try:
+                return self._results.get(timeout=0.5)
+            except queue.Empty:
+                if not any(process.is_alive() for process in self._processes):
+                    return None
+
+    async def _receive(self) -> None:
+        loop = asyncio.get_running_loop()
+        running = set(range(len(self._processes)))
+        while running:
+            message = await loop.run_in_executor(None, self._get_batch)
+            if message is None:
+                _LOGGER.warning("All shards exited unexpectedly")
+                return
+            shard, batch = message
+            if batch is None:
+                running.discard(shard)
+                continue
+            self.batches += 1
+            self.results += len(batch)
+            if self.on_result is None:
+                continue
+            for device, code, value in batch:
+                result = self.on_result(device, *decode(code, value))
+                if inspect.isawaitable(result):
+                    await result
+
+    async def stop(self) -> None:
+        """Stops the workers after they delivered their last results."""
+        for control in self._controls:
+            control.put(None)
+        if self._receiver is not None:
+            await self._receiver
+        loop = asyncio.get_running_loop()
+        for process in self._processes:
+            await loop.run_in_executor(None, process.join)
+        self._processes.clear()
+        self._controls.clear()
+        self._receiver = None
+
+    async def run(self) -> None:
+        """Polls until cancelled."""
+        await self.start()
+        try:
+            await asyncio.shield(self._receiver)
+        finally:
+            await self.stop()
@@ -0,0 +1,211 @@
+import struct
+import sys
+import time
+from dataclasses import dataclass
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any
+
+from . import ReturnAlarmInfo, ReturnOutputData
+
+_MAGIC = b"EZ1T"
+_HEADER = struct.Struct("<4sII")
+_SEQUENCE = struct.Struct("<Q")
+# device name, output data time, p1, e1, te1, p2, e2, te2, alarm time, og, isce1, isce2, operating
+_BODY = struct.Struct("<32sd6dd4?4x")
+_CACHE_LINE = 64
+# The header and every slot start on a cache line (shared memory is page aligned), so that each
+# sequence counter is aligned to 8 bytes and never straddles two cache lines.
+_HEADER_SIZE = _CACHE_LINE
+_SLOT_SIZE = -(-(_SEQUENCE.size + _BODY.size) // _CACHE_LINE) * _CACHE_LINE
+_OUTPUT_FIELDS = ("p1", "e1", "te1", "p2", "e2", "te2")
+
+
+@dataclass
+class SharedReading:
+    device: str
+    output_data: ReturnOutputData | None
+    output_updated: float | None
+    alarm_info: ReturnAlarmInfo | None
+    alarm_updated: float | None
+
+
+class SharedReadingsTable:
+    """The latest readings of a fleet in shared memory, written by one poller process and read by
+    any number of local consumers without locks or IPC.
+
+    The table has a fixed number of fixed-width slots, one per device. Each slot is guarded by a
+    sequence counter (a seqlock): the writer makes it odd before and even after updating the
+    slot, and a reader retries until it sees the same even counter before and after copying the
+    slot, so it never sees half of an update.
+
+    The poller creates the table with `create` and publishes with `on_result` (a
+    `PollScheduler` callback) or the `publish_*` methods; consumers `attach` by name. There must
+    be only one writer at a time: to hand publishing over to another process, e.g. a poller
+    worker, stop publishing and let that process `attach` with `writer=True`. The creator stays
+    the owner that removes the table on `close`.
+    """
+
+    def __init__(self, memory: shared_memory.SharedMemory, owner: bool, writer: bool) -> None:
+        magic, slots, slot_size = _HEADER.unpack_from(memory.buf, 0)
+        if magic != _MAGIC or slot_size != _SLOT_SIZE:
+            raise ValueError(f"{memory.name} is not a readings table")
+        self._memory = memory
+        self.owner = owner
+        self.writer = writer
+        self.slots = slots
+        self._index: dict[str, int] = {}
+        self._scanned = 0
+        if writer and not owner:
+            self._scan()
+
+    @classmethod
+    def create(cls, name: str | None = None, slots: int = 1024) -> "SharedReadingsTable":
+        """
+        Creates a table and becomes its writer.
+
+        :param name: Name of the shared memory block. None picks a random name, see `name`.
+        :param slots: Maximum number of devices.
+        """
+        memory = shared_memory.SharedMemory(name, create=True, size=_HEADER_SIZE + slots * _SLOT_SIZE)
+        _HEADER.pack_into(memory.buf, 0, _MAGIC, slots, _SLOT_SIZE)
+        return cls(memory, owner=True, writer=True)
+
+    @classmethod
+    def attach(cls, name: str, writer: bool = False) -> "SharedReadingsTable":
+        """
+        Attaches to the table created under `name` by another process.
+
+        :param writer: Take over publishing from the current writer, which must have stopped.
+        """
+        if sys.version_info >= (3, 13):
+            memory = shared_memory.SharedMemory(name, track=False)  # pylint: disable=unexpected-keyword-arg
+        else:
+            # Only the creator may unlink the block, but before Python 3.13 every process that
+            # attaches registers it with its resource tracker, which unlinks it on exit.
+            register = resource_tracker.register
+            resource_tracker.register = lambda name, rtype: None
+            try:
+                memory = shared_memory.SharedMemory(name)
+            finally:
+                resource_tracker.register = register
+        return cls(memory, owner=False, writer=writer)
+
+    @property
+    def name(self) -> str:
+        return self._memory.name
+
+    def _offset(self, index: int) -> int:
+        return _HEADER_SIZE + index * _SLOT_SIZE
+
+    def _read(self, index: int, timeout: float = 1.0) -> tuple:
+        buf = self._memory.buf
+        offset = self._offset(index)
+        deadline = None
+        while True:
+            (before,) = _SEQUENCE.unpack_from(buf, offset)
+            if not before % 2:
+                body = _BODY.unpack_from(buf, offset + _SEQUENCE.size)
+                (after,) = _SEQUENCE.unpack_from(buf, offset)
+                if before == after:
+                    return body
+            # The writer was preempted in the middle of an update; let it finish.
+            now = time.monotonic()
+            if deadline is None:
+                deadline = now + timeout
+            elif now > deadline:
+                raise TimeoutError(f"Slot {index} of {self.name} is not consistent")
+            time.sleep(0)
+
+    def _slot(self, device: str) -> int:
+        index = self._index.get(device)
+        if index is not None:
+            return index
+        if not self.writer:
+            self._scan()
+            if device in self._index:
+                return self._index[device]
+            raise KeyError(device)
+        encoded = device.encode()
+        if len(encoded) > 32:
+            raise ValueError(f"Device names are limited to 32 bytes: {device}")
+        if len(self._index) >= self.slots:
+            raise ValueError(f"The readings table {self.name} is full ({self.slots} slots)")
+        index = self._index[device] = len(self._index)
+        self._write(index, encoded, 0.0, *[0.0] * 6, 0.0, False, False, False, False)
+        return index
+
+    def _scan(self) -> None:
+        """Picks up slots the writer assigned since the last scan."""
+        while self._scanned < self.slots:
+            name = self._read(self._scanned)[0].rstrip(b"\0")
+            if not name:
+                break
+            self._index[name.decode()] = self._scanned
+            self._scanned += 1
+
+    def _write(self, index: int, *body: Any) -> None:
+        buf = self._memory.buf
+        offset = self._offset(index)
+        (sequence,) = _SEQUENCE.unpack_from(buf, offset)
+        _SEQUENCE.pack_into(buf, offset, sequence + 1)
+        _BODY.pack_into(buf, offset + _SEQUENCE.size, *body)
+        _SEQUENCE.pack_into(buf, offset, sequence + 2)
+
+    def publish_output_data(self, device: str, data: ReturnOutputData, updated: float | None = None) -> None:
+        """Publishes the output data of a device, taken at `updated` (Unix time, default: now)."""
+        index = self._slot(device)
+        body = list(self._read(index))
+        body[1:8] = [updated or time.time(), *(float(getattr(data, field)) for field in _OUTPUT_FIELDS)]
+        self._write(index, *body)
+
+    def publish_alarm_info(self, device: str, alarm: ReturnAlarmInfo, updated: float | None = None) -> None:
+        """Publishes the alarm info of a device, taken at `updated` (Unix time, default: now)."""
+        index = self._slot(device)
+        body = list(self._read(index))
+        body[8:13] = [updated or time.time(), alarm.offgrid, alarm.shortcircuit_1, alarm.shortcircuit_2, alarm.operating]
+        self._write(index, *body)
+
+    def on_result(self, device: str, method: str, value: Any) -> None:
+        """A `PollScheduler` result callback that publishes output data and alarm info."""
+        if isinstance(value, ReturnOutputData):
+            self.publish_output_data(device, value)
+        elif isinstance(value, ReturnAlarmInfo):
+            self.publish_alarm_info(device, value)
+
+    @staticmethod
+    def _reading(device: str, body: tuple) -> SharedReading:
+        output_updated, outputs = body[1], body[2:8]
+        alarm_updated, alarms = body[8], body[9:13]
+        return SharedReading(
+            device,
+            ReturnOutputData(**dict(zip(_OUTPUT_FIELDS, outputs))) if output_updated else None,
+            output_updated or None,
+            ReturnAlarmInfo(*alarms) if alarm_updated else None,
+            alarm_updated or None,
+        )
+
+    def get(self, device: str) -> SharedReading | None:
+        """A consistent copy of the latest readings of a device, or None for an unknown device."""
+        try:
+            index = self._slot(device)
+        except KeyError:
+            return None
+        return self._reading(device, self._read(index))
+
+    def snapshot(self) -> dict[str, SharedReading]:
+        """The latest readings of all devices. Each device's readings are consistent."""
+        if not self.writer:
+            self._scan()
+        return {device: self._reading(device, self._read(index)) for device, index in self._index.items()}
+
+    def close(self) -> None:
+        """Detaches from the table. The creator also removes it."""
+        self._memory.close()
+        if self.owner:
+            self._memory.unlink()
+
+    def __enter__(self) -> "SharedReadingsTable":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,125 @@
+import asyncio
+import json
+import logging
+from urllib.parse import parse_qs, urlsplit
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class EZ1Simulator:
+    """A stand-in for the local API of an EZ1 inverter, for tests and benchmarks.
+
+    Serves the same endpoints and response format as the inverter over plain HTTP/1.1 with
+    keep-alive. Setpoints written with `setMaxPower`/`setOnOff` are remembered.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        device_id: str = "E07000000001",
+        latency: float = 0.0,
+    ) -> None:
+        """
+        :param host: The address to listen on.
+        :param port: The port to listen on. 0 picks a free port, see `port` after `start`.
+        :param device_id: The deviceId reported by the simulated inverter.
+        :param latency: Seconds to wait before answering a request.
+        """
+        self.host = host
+        self.port = port
+        self.device_id = device_id
+        self.latency = latency
+        self.output_data = {"p1": 120.0, "e1": 0.5, "te1": 80.2, "p2": 130.0, "e2": 0.6, "te2": 82.4}
+        self.alarm = {"og": "0", "isce1": "0", "isce2": "0", "oe": "0"}
+        self.max_power = 800
+        self.status = "0"
+        self.requests = 0
+        self.connections = 0
+        self._server: asyncio.Server | None = None
+        self._handlers: dict[asyncio.Task, asyncio.StreamWriter] = {}
+
+    def _data(self, path: str, query: dict[str, list[str]]) -> dict | None:
+        match path:
+            case "getDeviceInfo":
+                return {
+                    "deviceId": self.device_id,
+                    "devVer": "EZ1 1.6.0",
+                    "ssid": "simulator",
+                    "ipAddr": self.host,
+                    "minPower": "30",
+                    "maxPower": "800",
+                }
+            case "getOutputData":
+                return dict(self.output_data)
+            case "getAlarm":
+                return dict(self.alarm)
+            case "getMaxPower":
+                return {"maxPower": str(self.max_power)}
+            case "setMaxPower":
+                self.max_power = int(query["p"][0])
+                return {"maxPower": str(self.max_power)}
+            case "getOnOff":
+                return {"status": self.status}
+            case "setOnOff":
+                self.status = query["status"][0]
+                return {"status": self.status}
+        return None
+
+    def respond(self, target: str) -> tuple[int, dict]:
+        """Returns the HTTP status and JSON body the inverter answers for a request target."""
+        parts = urlsplit(target)
+        try:
+            data = self._data(parts.path.lstrip("/"), parse_qs(parts.query))
+        except (KeyError, ValueError):
+            data = {}
+        if data is None:
+            return 404, {"data": {}, "message": "FAILED", "deviceId": self.device_id}
+        return 200, {"data": data, "message": "SUCCESS" if data else "FAILED", "deviceId": self.device_id}
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._handlers[asyncio.current_task()] = writer
+        self.connections += 1
+        try:
+            while request_line := await reader.readline():
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                self.requests += 1
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                status, body = self.respond(request_line.split()[1].decode())
+                payload = json.dumps(body).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} {'OK' if status == 200 else 'Not Found'}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(payload)}\r\n"
+                    f"Connection: keep-alive\r\n\r\n".encode()
+                    + payload
+                )
+                await writer.drain()
+        except (ConnectionError, IndexError):
+            pass
+        finally:
+            self._handlers.pop(asyncio.current_task(), None)
+            writer.close()
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            handlers = dict(self._handlers)
+            for writer in handlers.values():
+                writer.close()
+            await asyncio.gather(*handlers, return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self) -> "EZ1Simulator":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.stop()
@@ -0,0 +1,117 @@
+import datetime
+import math
+from dataclasses import dataclass
+
+
+@dataclass
+class Daylight:
+    start: datetime.datetime
+    end: datetime.datetime
+
+
+def sun_times(day: datetime.date, latitude: float, longitude: float) -> Daylight | None:
+    """
+    Computes sunrise and sunset of a day offline, with the NOAA approximation of the solar
+    position (accurate to a few minutes, which is plenty to schedule polling).
+
+    :param day: The (UTC) day.
+    :param latitude: Latitude of the site in degrees, north positive.
+    :param longitude: Longitude of the site in degrees, east positive.
+    :return: Sunrise and sunset as UTC datetimes, the whole day during midnight sun and None
+             during polar night.
+    """
+    gamma = 2 * math.pi / 365 * (day.timetuple().tm_yday - 1)
+    equation_of_time = 229.18 * (
+        0.000075
+        + 0.001868 * math.cos(gamma)
+        - 0.032077 * math.sin(gamma)
+        - 0.014615 * math.cos(2 * gamma)
+        - 0.040849 * math.sin(2 * gamma)
+    )
+    declination = (
+        0.006918
+        - 0.399912 * math.cos(gamma)
+        + 0.070257 * math.sin(gamma)
+        - 0.006758 * math.cos(2 * gamma)
+        + 0.000907 * math.sin(2 * gamma)
+        - 0.002697 * math.cos(3 * gamma)
+        + 0.00148 * math.sin(3 * gamma)
+    )
+    lat = math.radians(latitude)
+    cos_hour_angle = math.cos(math.radians(90.833)) / (
+        math.cos(lat) * math.cos(declination)
+    ) - math.tan(lat) * math.tan(declination)
+
+    midnight = datetime.datetime.combine(day, datetime.time(), tzinfo=datetime.timezone.utc)
+    if cos_hour_angle > 1:
+        return None
+    if cos_hour_angle < -1:
+        return Daylight(midnight, midnight + datetime.timedelta(days=1))
+    hour_angle = math.degrees(math.acos(cos_hour_angle))
+    sunrise = 720 - 4 * (longitude + hour_angle) - equation_of_time
+    sunset = 720 - 4 * (longitude - hour_angle) - equation_of_time
+    return Daylight(
+        midnight + datetime.timedelta(minutes=sunrise),
+        midnight + datetime.timedelta(minutes=sunset),
+    )
+
+
+class NightMode:
+    """Tells when a site is dark, so that polling its inverters can be suspended.
+
+    Night is the time between sunset and sunrise, shrunk by `margin` on both ends so that polling
+    starts a little before sunrise and ends a little after sunset.
+    """
+
+    def __init__(
+        self,
+        latitude: float,
+        longitude: float,
+        margin: datetime.timedelta = datetime.timedelta(minutes=30),
+        night_interval: float | None = None,
+    ) -> None:
+        """
+        :param latitude: Latitude of the site in degrees, north positive.
+        :param longitude: Longitude of the site in degrees, east positive.
+        :param margin: Time before sunrise and after sunset that still counts as day.
+        :param night_interval: Poll every this many seconds at night. None suspends polling.
+        """
+        self.latitude = latitude
+        self.longitude = longitude
+        self.margin = margin
+        self.night_interval = night_interval
+
+    def daylight(self, day: datetime.date) -> Daylight | None:
+        """The time of a (UTC) day in which the inverters are polled, margins included."""
+        times = sun_times(day, self.latitude, self.longitude)
+        if times is None:
+            return None
+        return Daylight(times.start - self.margin, times.end + self.margin)
+
+    def _windows(self, now: datetime.datetime, days: int):
+        for offset in range(-1, days):
+            if (window := self.daylight(now.date() + datetime.timedelta(days=offset))) is not None:
+                yield window
+
+    def is_night(self, now: datetime.datetime | None = None) -> bool:
+        """Whether it is night at the site. `now` defaults to the current time."""
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+        return not any(window.start <= now < window.end for window in self._windows(now, 2))
+
+    def next_dawn(self, now: datetime.datetime | None = None) -> datetime.datetime:
+        """The time polling resumes after the current (or next) night."""
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+        for window in self._windows(now, 367):
+            if window.start > now:
+                return window.start
+        raise ValueError("No sunrise within a year")
+
+    def pause(self, now: datetime.datetime | None = None) -> float:
+        """Seconds to wait before the next poll, if it is night; 0.0 during the day."""
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+        if not self.is_night(now):
+            return 0.0
+        seconds = (self.next_dawn(now) - now).total_seconds()
+        if self.night_interval is not None:
+            return min(seconds, self.night_interval)
+        return seconds
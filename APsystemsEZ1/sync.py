@@ -0,0 +1,227 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Iterable, Mapping
+
+from aiohttp import ClientSession
+
+from . import APsystemsEZ1M, ReturnAlarmInfo, ReturnDeviceInfo, ReturnOutputData
+
+Call = str | tuple
+"""A method name, or a tuple of method name and arguments, e.g. `("set_max_power", 600)`."""
+
+
+class BackgroundLoop:
+    """An event loop running forever in a daemon thread, for calling async code from sync code.
+
+    One loop can be shared by any number of sync clients; it also owns the pooled `ClientSession`
+    they send their requests with.
+    """
+
+    def __init__(self) -> None:
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="APsystemsEZ1-loop", daemon=True)
+        self._thread.start()
+        self.session: ClientSession = self.run(self._open_session())
+
+    @staticmethod
+    async def _open_session() -> ClientSession:
+        return ClientSession()
+
+    def run(self, coroutine: Awaitable, timeout: float | None = None) -> Any:
+        """
+        Runs a coroutine on the loop and returns its result. Must not be called from the loop.
+
+        :raises TimeoutError: If there is no result after `timeout` seconds; the coroutine is
+                              cancelled, so that it does not hold on to its device's request slot.
+        """
+        future = asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    def close(self) -> None:
+        """Closes the session and stops the loop."""
+        if self.loop.is_closed():
+            return
+        self.run(self.session.close())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+
+    def __enter__(self) -> "BackgroundLoop":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+async def _gather(calls: list[Awaitable], return_exceptions: bool) -> list:
+    return await asyncio.gather(*calls, return_exceptions=return_exceptions)
+
+
+def _split(call: Call) -> tuple[str, tuple]:
+    if isinstance(call, str):
+        return call, ()
+    return call[0], tuple(call[1:])
+
+
+class SyncAPsystemsEZ1M:
+    """A blocking `APsystemsEZ1M` for synchronous code.
+
+    Instead of a new event loop and session per call (as with `asyncio.run`), all calls run on one
+    long-lived `BackgroundLoop` and reuse its connections. `batch` sends many calls in one hop.
+    """
+
+    def __init__(
+        self,
+        ip_address: str,
+        port: int = 8050,
+        background: BackgroundLoop | None = None,
+        call_timeout: float | None = None,
+        **options: Any,
+    ) -> None:
+        """
+        :param ip_address: The IP address of the EZ1 Microinverter.
+        :param port: The port on which the microinverter's server is running.
+        :param background: The loop to run on, e.g. shared with other clients. Default is a loop
+                           of this client's own, closed with `close`.
+        :param call_timeout: Seconds to wait for the result of a call. None waits for the request
+                             timeouts of the client.
+        :param options: Further keyword arguments of `APsystemsEZ1M`.
+        """
+        self._owns_background = background is None
+        self.background = background or BackgroundLoop()
+        self.call_timeout = call_timeout
+        options.setdefault("session", self.background.session)
+        self.ez1m: APsystemsEZ1M = self.background.run(self._create(ip_address, port, options))
+
+    @staticmethod
+    async def _create(ip_address: str, port: int, options: dict[str, Any]) -> APsystemsEZ1M:
+        # Created on the loop, so that the client's asyncio primitives belong to it.
+        return APsystemsEZ1M(ip_address, port, **options)
+
+    def _call(self, method: str, *args: Any) -> Any:
+        return self.background.run(getattr(self.ez1m, method)(*args), self.call_timeout)
+
+    def batch(self, calls: Iterable[Call], return_exceptions: bool = False) -> list:
+        """
+        Runs several calls concurrently in one hop to the background loop.
+
+        :param calls: Method names, or tuples of method name and arguments.
+        :param return_exceptions: Return exceptions in place of results instead of raising the
+                                  first one.
+        :return: The results in the order of `calls`.
+        """
+        coroutines = [getattr(self.ez1m, method)(*args) for method, args in map(_split, calls)]
+        return self.background.run(_gather(coroutines, return_exceptions), self.call_timeout)
+
+    def get_device_info(self) -> ReturnDeviceInfo | None:
+        return self._call("get_device_info")
+
+    def get_alarm_info(self) -> ReturnAlarmInfo | None:
+        return self._call("get_alarm_info")
+
+    def get_output_data(self) -> ReturnOutputData | None:
+        return self._call("get_output_data")
+
+    def get_total_output(self) -> float | None:
+        return self._call("get_total_output")
+
+    def get_total_energy_today(self) -> float | None:
+        return self._call("get_total_energy_today")
+
+    def get_total_energy_lifetime(self) -> float | None:
+        return self._call("get_total_energy_lifetime")
+
+    def get_max_power(self) -> int | None:
+        return self._call("get_max_power")
+
+    def set_max_power(self, power_limit: int) -> int | None:
+        return self._call("set_max_power", power_limit)
+
+    def get_device_power_status(self) -> bool:
+        return self._call("get_device_power_status")
+
+    def set_device_power_status(self, power_status: bool) -> bool | None:
+        return self._call("set_device_power_status", power_status)
+
+    def close(self) -> None:
+        """Stops the background loop, if it is this client's own."""
+        if self._owns_background:
+            self.background.close()
+
+    def __enter__(self) -> "SyncAPsystemsEZ1M":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class SyncFleet:
+    """Blocking access to many inverters through one background loop and one session."""
+
+    def __init__(
+        self,
+        inverters: Mapping[str, str | tuple[str, int]],
+        background: BackgroundLoop | None = None,
+        call_timeout: float | None = None,
+        **options: Any,
+    ) -> None:
+        """
+        :param inverters: The inverters by name: an IP address (port 8050) or (IP address, port).
+        :param background: The loop to run on. Default is a loop of the fleet's own.
+        :param call_timeout: Seconds to wait for the result of a call.
+        :param options: Further keyword arguments of `APsystemsEZ1M`.
+        """
+        self._owns_background = background is None
+        self.background = background or BackgroundLoop()
+        self.inverters: dict[str, SyncAPsystemsEZ1M] = {}
+        for name, address in inverters.items():
+            ip_address, port = (address, 8050) if isinstance(address, str) else address
+            self.inverters[name] = SyncAPsystemsEZ1M(
+                ip_address, port, background=self.background, call_timeout=call_timeout, **options
+            )
+        self.call_timeout = call_timeout
+
+    def __getitem__(self, name: str) -> SyncAPsystemsEZ1M:
+        return self.inverters[name]
+
+    def call(self, method: str, *args: Any, devices: Iterable[str] | None = None) -> dict[str, Any]:
+        """
+        Calls a method on many inverters concurrently, in one hop to the background loop.
+
+        :param method: The `APsystemsEZ1M` method, e.g. "get_output_data".
+        :param args: Arguments of the method.
+        :param devices: The names of the inverters to call. Default: all.
+        :return: The result per inverter name, or the exception the call raised.
+        """
+        names = list(self.inverters if devices is None else devices)
+        coroutines = [getattr(self.inverters[name].ez1m, method)(*args) for name in names]
+        results = self.background.run(_gather(coroutines, return_exceptions=True), self.call_timeout)
+        return dict(zip(names, results))
+
+    def batch(self, calls: Iterable[tuple[str, Call]]) -> list:
+        """
+        Runs calls on different inverters concurrently, in one hop to the background loop.
+
+        :param calls: Tuples of inverter name and call, e.g. `("garage", "get_max_power")`.
+        :return: The results (or the exceptions raised) in the order of `calls`.
+        """
+        coroutines = [
+            getattr(self.inverters[name].ez1m, method)(*args)
+            for name, (method, args) in ((name, _split(call)) for name, call in calls)
+        ]
+        return self.background.run(_gather(coroutines, return_exceptions=True), self.call_timeout)
+
+    def close(self) -> None:
+        """Stops the background loop, if it is the fleet's own."""
+        if self._owns_background:
+            self.background.close()
+
+    def __enter__(self) -> "SyncFleet":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,345 @@
+import asyncio
+import contextlib
+import gzip
+import json
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, TYPE_CHECKING, Any, Protocol
+from urllib.parse import urlsplit
+
+from .monitor import phase
+
+if TYPE_CHECKING:
+    from aiohttp import ClientSession
+
+
+class TransportError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class RequestTimeout:
+    """Separate timeouts (in seconds) for the phases of a request. None means no limit.
+
+    `first_byte` limits the wait for the response to start, not the gaps while it is read. The
+    raw transport starts this wait once the request is sent; the aiohttp transport cannot tell
+    when its connection is ready, so its wait also includes getting a connection, which is
+    instant on a pooled one.
+    """
+
+    total: float | None = 10.0
+    connect: float | None = None
+    first_byte: float | None = None
+
+
+def as_request_timeout(timeout: float | RequestTimeout) -> RequestTimeout:
+    """Turns a plain number of seconds into a `RequestTimeout` for the whole request."""
+    if isinstance(timeout, RequestTimeout):
+        return timeout
+    return RequestTimeout(total=float(timeout))
+
+
+async def probe_port(host: str, port: int = 8050, connect_timeout: float = 0.3) -> bool:
+    """
+    Checks whether a TCP connection to a host can be established.
+
+    :param host: The host to connect to.
+    :param port: The port to connect to.
+    :param connect_timeout: Seconds to wait for the connection.
+    :return: True if the port accepted the connection.
+    """
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), connect_timeout)
+    except (OSError, asyncio.TimeoutError):
+        return False
+    writer.close()
+    return True
+
+
+class Transport(Protocol):
+    """The interface `APsystemsEZ1M` uses to talk to the inverter."""
+
+    async def get(self, url: str, timeout: float | RequestTimeout) -> tuple[int, Any]:
+        """
+        Sends a GET request and decodes the JSON response.
+
+        :param url: The full URL of the request.
+        :param timeout: Seconds the whole request (including connecting) may take, or separate
+                        timeouts for its phases.
+        :return: The HTTP status and the decoded JSON body.
+        """
+
+    async def close(self) -> None:
+        """Releases all resources held by the transport."""
+
+
+class AiohttpTransport:
+    """The default transport, based on an aiohttp `ClientSession`.
+
+    Without a session a new `ClientSession` is created (and closed) for every request. aiohttp
+    is imported with the first request.
+    """
+
+    def __init__(self, session: "ClientSession | None" = None) -> None:
+        """
+        :param session: A session shared by all requests. It is not closed by `close`.
+        """
+        self.session = session
+
+    async def get(self, url: str, timeout: float | RequestTimeout) -> tuple[int, Any]:
+        import aiohttp  # pylint: disable=import-outside-toplevel
+
+        first_byte = None
+        if isinstance(timeout, RequestTimeout):
+            first_byte = timeout.first_byte
+            timeout = aiohttp.ClientTimeout(total=timeout.total, connect=timeout.connect)
+        if self.session is None:
+            ses = aiohttp.ClientSession()
+        else:
+            ses = self.session
+        try:
+            # aiohttp has no first byte timeout (sock_read limits every read), so the wait for
+            # the response headers gets a deadline of its own.
+            async with contextlib.AsyncExitStack() as stack:
+                async with asyncio.timeout(first_byte):
+                    resp = await stack.enter_async_context(ses.get(url, timeout=timeout))
+                await resp.read()
+                with phase("parse"):
+                    return resp.status, await resp.json()
+        finally:
+            # Close if session created on per-execution base
+
+            if self.session is None:
+                await ses.close()
+
+    async def close(self) -> None:
+        pass
+
+
+class RawHTTPTransport:
+    """A minimal HTTP/1.1 client for the local API, built directly on `asyncio.open_connection`.
+
+    The EZ1 only ever answers small JSON documents to GET requests, so this transport speaks just
+    enough HTTP for that: keep-alive connections that are reused per host and port, and bodies
+    delimited by `Content-Length` (or by the end of the connection). It avoids the import time,
+    memory and per-request overhead of an aiohttp `ClientSession` on small gateways.
+    """
+
+    def __init__(self, max_idle: int = 1) -> None:
+        """
+        :param max_idle: Maximum number of idle keep-alive connections kept per host and port.
+        """
+        self.max_idle = max_idle
+        self._idle: dict[tuple[str, int], list[tuple[asyncio.StreamReader, asyncio.StreamWriter]]] = {}
+
+    async def _exchange(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        host: str,
+        port: int,
+        target: str,
+        first_byte_timeout: float | None,
+    ) -> tuple[int, bytes, bool]:
+        writer.write(
+            f"GET {target} HTTP/1.1\r\nHost: {host}:{port}\r\nConnection: keep-alive\r\n\r\n".encode()
+        )
+        await writer.drain()
+
+        status_line = await asyncio.wait_for(reader.readline(), first_byte_timeout)
+        if not status_line:
+            raise ConnectionResetError("Connection closed by the device")
+        try:
+            status = int(status_line.split()[1])
+        except (IndexError, ValueError) as exc:
+            raise TransportError(f"Malformed status line: {status_line!r}") from exc
+
+        length = None
+        keep_alive = status_line.startswith(b"HTTP/1.1")
+        while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+            name, _, value = line.decode("latin-1").partition(":")
+            match name.strip().lower():
+                case "content-length":
+                    length = int(value)
+                case "connection":
+                    keep_alive = value.strip().lower() == "keep-alive"
+                case "transfer-encoding" if value.strip().lower() != "identity":
+                    raise TransportError(f"Unsupported transfer encoding: {value.strip()}")
+
+        if length is None:
+            return status, await reader.read(), False
+        return status, await reader.readexactly(length), keep_alive
+
+    async def get(self, url: str, timeout: float | RequestTimeout) -> tuple[int, Any]:
+        """
+        Sends a GET request and decodes the JSON response.
+
+        :param url: The full URL of the request.
+        :param timeout: Seconds the whole request (including connecting) may take, or separate
+                        timeouts for its phases.
+        :return: The HTTP status and the decoded JSON body.
+        :raises TransportError: If the body is not JSON.
+        """
+        timeout = as_request_timeout(timeout)
+        parts = urlsplit(url)
+        host, port = parts.hostname or "", parts.port or 80
+        target = f"{parts.path or '/'}?{parts.query}" if parts.query else parts.path or "/"
+        key = (host, port)
+
+        async with asyncio.timeout(timeout.total):
+            idle = self._idle.setdefault(key, [])
+            while True:
+                reused = bool(idle)
+                if reused:
+                    reader, writer = idle.pop()
+                else:
+                    reader, writer = await asyncio.wait_for(
+                        asyncio.open_connection(host, port), timeout.connect
+                    )
+                try:
+                    status, body, keep_alive = await self._exchange(
+                        reader, writer, host, port, target, timeout.first_byte
+                    )
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    writer.close()
+                    if reused:
+                        # The device dropped the idle connection, try again on a fresh one.
+                        continue
+                    raise
+                except BaseException:
+                    writer.close()
+                    raise
+                break
+
+        if keep_alive and len(idle) < self.max_idle:
+            idle.append((reader, writer))
+        else:
+            writer.close()
+
+        try:
+            with phase("parse"):
+                return status, json.loads(body)
+        except ValueError as exc:
+            # Fail like the aiohttp transport does, instead of returning a body the client
+            # cannot use.
+            raise TransportError(f"Response of {url} is not JSON: {body[:100]!r}") from exc
+
+    async def close(self) -> None:
+        """Closes all idle connections."""
+        for connections in self._idle.values():
+            for _, writer in connections:
+                writer.close()
+        self._idle.clear()
+
+
+def _open(path: Path, mode: str) -> IO[str]:
+    if path.suffix == ".gz":
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def _target(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.path.lstrip('/')}?{parts.query}" if parts.query else parts.path.lstrip("/")
+
+
+_REPLAYED_ERRORS: dict[str, type[Exception]] = {
+    "TimeoutError": TimeoutError,
+    "ConnectionRefusedError": ConnectionRefusedError,
+    "ConnectionResetError": ConnectionResetError,
+    "OSError": OSError,
+}
+
+
+class RecordingTransport:
+    """Passes requests on to another transport and records them, with timings, to a file.
+
+    Every request is stored as one JSON line with the request time (seconds since the recording
+    started), the endpoint, the HTTP status, the JSON body and the time the device took to
+    answer. Failed requests are recorded with the exception name. Files ending in `.gz` are
+    compressed. Play recordings back with `ReplayTransport`.
+    """
+
+    def __init__(self, transport: Transport, path: str | Path) -> None:
+        """
+        :param transport: The transport that actually talks to the inverter.
+        :param path: The file the requests are appended to.
+        """
+        self.transport = transport
+        self.path = Path(path)
+        self._file = _open(self.path, "a")
+        self._started = time.monotonic()
+
+    def _record(self, entry: dict) -> None:
+        self._file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        self._file.flush()
+
+    async def get(self, url: str, timeout: float | RequestTimeout) -> tuple[int, Any]:
+        sent = time.monotonic()
+        entry: dict[str, Any] = {"t": round(sent - self._started, 4), "endpoint": _target(url)}
+        try:
+            status, body = await self.transport.get(url, timeout)
+        except Exception as exc:
+            entry.update(error=type(exc).__name__, elapsed=round(time.monotonic() - sent, 4))
+            self._record(entry)
+            raise
+        entry.update(status=status, body=body, elapsed=round(time.monotonic() - sent, 4))
+        self._record(entry)
+        return status, body
+
+    async def close(self) -> None:
+        self._file.close()
+        await self.transport.close()
+
+
+class ReplayTransport:
+    """Serves the responses of a recording made with `RecordingTransport`.
+
+    Responses are served per endpoint in the order they were recorded, regardless of the host
+    they were recorded from. With `speed` set, every response is delayed by the time the device
+    originally took to answer (divided by `speed`), without it they are served as fast as possible.
+    """
+
+    def __init__(self, path: str | Path, speed: float | None = None, loop: bool = False) -> None:
+        """
+        :param path: The recording to replay.
+        :param speed: Replay device latencies at this speed (1.0 is real time). None replays as
+                      fast as possible.
+        :param loop: Start over once all recorded responses of an endpoint have been served.
+        """
+        self.speed = speed
+        self.loop = loop
+        self.entries: dict[str, list[dict]] = defaultdict(list)
+        with _open(Path(path), "r") as file:
+            for line in file:
+                if line.strip():
+                    entry = json.loads(line)
+                    self.entries[entry["endpoint"]].append(entry)
+        self._queues = {endpoint: deque(entries) for endpoint, entries in self.entries.items()}
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self.entries.values())
+
+    async def get(self, url: str, timeout: float | RequestTimeout) -> tuple[int, Any]:
+        total = as_request_timeout(timeout).total
+        endpoint = _target(url)
+        queue = self._queues.get(endpoint)
+        if not queue and self.loop and self.entries.get(endpoint):
+            queue = self._queues[endpoint] = deque(self.entries[endpoint])
+        if not queue:
+            raise TransportError(f"No recorded response left for '{endpoint}'")
+        entry = queue.popleft()
+        if self.speed:
+            delay = entry.get("elapsed", 0.0) / self.speed
+            if total is not None and delay > total:
+                await asyncio.sleep(total)
+                raise TimeoutError
+            await asyncio.sleep(delay)
+        if "error" in entry:
+            raise _REPLAYED_ERRORS.get(entry["error"], TransportError)(entry["error"])
+        return entry["status"], entry["body"]
+
+    async def close(self) -> None:
+        pass
@@ -0,0 +1,185 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+from . import APsystemsEZ1M
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class WriteBehindStats:
+    requested: int = 0
+    written: int = 0
+    skipped: int = 0
+    superseded: int = 0
+    errors: int = 0
+    failed: int = 0
+
+
+class Setpoint:
+    """Desired and confirmed state of one writable device setting."""
+
+    def __init__(
+        self,
+        name: str,
+        write: Callable[[Any], Awaitable[Any]],
+        min_interval: float,
+        stats: WriteBehindStats,
+        max_attempts: int = 5,
+        retry_delay: float = 1.0,
+        max_retry_delay: float = 60.0,
+    ) -> None:
+        self.name = name
+        self.desired: Any = None
+        self.confirmed: Any = None
+        self.last_write = float("-inf")
+        self.last_error: Exception | None = None
+        self._write = write
+        self._min_interval = min_interval
+        self._stats = stats
+        self._max_attempts = max_attempts
+        self._retry_delay = retry_delay
+        self._max_retry_delay = max_retry_delay
+        self._task: asyncio.Task | None = None
+
+    @property
+    def pending(self) -> bool:
+        """Whether a write of the desired value is still outstanding."""
+        return self._task is not None and not self._task.done()
+
+    def request(self, value: Any) -> None:
+        self._stats.requested += 1
+        if self.pending:
+            # The flusher always sends the latest desired value, older ones are never written.
+            if value != self.desired:
+                self._stats.superseded += 1
+            self.desired = value
+            return
+        self.desired = value
+        if value == self.confirmed:
+            self._stats.skipped += 1
+            return
+        self._task = asyncio.create_task(self._flush())
+
+    @property
+    def failed(self) -> bool:
+        """Whether the last write gave up after `max_attempts` failed attempts."""
+        return self.last_error is not None and not self.pending
+
+    async def _flush(self) -> None:
+        attempts = 0
+        backoff = 0.0
+        while self.desired != self.confirmed:
+            next_write = self.last_write + max(self._min_interval, backoff)
+            await asyncio.sleep(max(0.0, next_write - time.monotonic()))
+            if self.desired == self.confirmed:
+                # Reverted to the confirmed value while waiting: nothing to write.
+                return
+            value = self.desired
+            self.last_write = time.monotonic()
+            attempts += 1
+            try:
+                confirmed = await self._write(value)
+                if confirmed is None:
+                    raise ValueError("not acknowledged")
+            except Exception as exc:  # pylint: disable=broad-except
+                self._stats.errors += 1
+                self.last_error = exc
+                _LOGGER.debug("Writing %s=%s failed: %s", self.name, value, exc)
+                if attempts >= self._max_attempts:
+                    self._stats.failed += 1
+                    _LOGGER.warning("Giving up writing %s=%s after %d attempts: %s", self.name, value, attempts, exc)
+                    return
+                backoff = min(self._max_retry_delay, self._retry_delay * 2 ** (attempts - 1))
+                continue
+            self._stats.written += 1
+            self.last_error = None
+            # The device may confirm another value than requested (clamped, rounded); it is the
+            # device's answer to this request, so it is not written again.
+            self.confirmed = confirmed
+            if self.desired == value:
+                return
+            attempts, backoff = 0, 0.0
+
+    async def wait(self) -> None:
+        if self._task is not None:
+            await asyncio.shield(self._task)
+
+    def cancel(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+
+
+class WriteBehind:
+    """A write-behind layer for the setpoints of one inverter.
+
+    Only the latest requested value of a setpoint is ever written, requests that match the value
+    last confirmed by the device are skipped, and two writes of the same setpoint are at least
+    `min_interval` seconds apart to protect the device flash.
+    """
+
+    def __init__(
+        self,
+        ez1m: APsystemsEZ1M,
+        min_interval: float = 10.0,
+        max_attempts: int = 5,
+        retry_delay: float = 1.0,
+        max_retry_delay: float = 60.0,
+    ) -> None:
+        """
+        :param ez1m: The inverter to write to.
+        :param min_interval: Minimum number of seconds between two writes of the same setpoint.
+        :param max_attempts: Attempts per requested value before the write gives up; see
+                             `Setpoint.failed` and `Setpoint.last_error`.
+        :param retry_delay: Seconds before the first retry of a failed write, doubled with every
+                            further attempt.
+        :param max_retry_delay: Maximum seconds between two attempts.
+        """
+        self.ez1m = ez1m
+        self.stats = WriteBehindStats()
+        retry = (max_attempts, retry_delay, max_retry_delay)
+        self.max_power = Setpoint("max_power", ez1m.set_max_power, min_interval, self.stats, *retry)
+        self.power_status = Setpoint(
+            "power_status", ez1m.set_device_power_status, min_interval, self.stats, *retry
+        )
+
+    async def refresh(self) -> None:
+        """Reads the confirmed values of all setpoints from the device."""
+        self.max_power.confirmed = await self.ez1m.get_max_power()
+        self.power_status.confirmed = await self.ez1m.get_device_power_status()
+
+    async def set_max_power(self, power_limit: int) -> None:
+        """
+        Requests a new maximum power limit. Returns immediately, the write happens in the
+        background; use `flush` to wait for it.
+
+        :param power_limit: The desired maximum power setting for the device, in watts.
+        :raises ValueError: If 'power_limit' is not within the device's power range.
+        """
+        if not self.ez1m.min_power <= power_limit <= self.ez1m.max_power:
+            raise ValueError(
+                f"Invalid setMaxPower value: expected int between '{self.ez1m.min_power}' "
+                f"and '{self.ez1m.max_power}', got '{power_limit}'"
+            )
+        self.max_power.request(power_limit)
+
+    async def set_device_power_status(self, power_status: bool) -> None:
+        """
+        Requests a new power status. Returns immediately, the write happens in the background;
+        use `flush` to wait for it.
+
+        :param power_status: True to start the inverter, False to stop it.
+        """
+        self.power_status.request(bool(power_status))
+
+    async def flush(self) -> None:
+        """Waits until all requested values have been written."""
+        await asyncio.gather(self.max_power.wait(), self.power_status.wait())
+
+    def close(self) -> None:
+        """Drops all outstanding writes."""
+        self.max_power.cancel()
+        self.power_status.cancel()
@@ -0,0 +1,48 @@
+"""Replays recorded inverter traffic through the parsing and debounce pipeline as fast as possible.
+
+Run with `python benchmarks/bench_replay.py [recording.jsonl[.gz]]`. Without a recording, a
+synthetic day of `getOutputData` traffic (one poll every 5 seconds) is generated.
+"""
+import asyncio
+import json
+import math
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from APsystemsEZ1 import APsystemsEZ1M
+from APsystemsEZ1.transport import ReplayTransport
+
+
+def _synthetic_day(path: Path, interval: int = 5) -> None:
+    energy = 0.0
+    with open(path, "w", encoding="utf-8") as file:
+        for second in range(0, 86400, interval):
+            power = max(0.0, 400 * math.sin((second - 21600) / 43200 * math.pi))
+            energy += power * interval / 3600000
+            data = {"p1": power, "e1": energy, "te1": 80 + energy, "p2": power, "e2": energy, "te2": 80 + energy}
+            entry = {"t": second, "endpoint": "getOutputData", "status": 200, "elapsed": 0.05,
+                     "body": {"data": data, "message": "SUCCESS", "deviceId": "E07000000001"}}
+            file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+
+
+async def main(path: Path) -> None:
+    transport = ReplayTransport(path)
+    requests = len(transport.entries["getOutputData"])
+    ez1m = APsystemsEZ1M("0.0.0.0", transport=transport, enable_debounce=True, max_in_flight=None)
+    started = time.perf_counter()
+    for _ in range(requests):
+        await ez1m.get_output_data()
+    elapsed = time.perf_counter() - started
+    print(f"replayed {requests} getOutputData responses in {elapsed:.3f} s ({requests / elapsed:.0f} req/s)")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        asyncio.run(main(Path(sys.argv[1])))
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            recording = Path(directory) / "day.jsonl"
+            _synthetic_day(recording)
+            asyncio.run(main(recording))
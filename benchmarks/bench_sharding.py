@@ -0,0 +1,69 @@
+"""Measures the poll throughput of `ShardedPoller` with a growing number of shards.
+
+Every shard polls its own stand-in inverter process, so the inverters are not the bottleneck.
+Run with `python benchmarks/bench_sharding.py [devices] [seconds]`; the throughput scales with
+the number of shards up to the number of free CPU cores.
+"""
+import asyncio
+import multiprocessing
+import os
+import sys
+import time
+
+from APsystemsEZ1.polling import PollRate
+from APsystemsEZ1.sharding import ShardedPoller
+from APsystemsEZ1.simulator import EZ1Simulator
+
+RATES = {
+    "get_output_data": PollRate(0.0),
+    "get_alarm_info": None,
+    "get_max_power": None,
+    "get_device_power_status": None,
+    "get_device_info": None,
+}
+
+
+def _serve(port: multiprocessing.Value) -> None:
+    async def main() -> None:
+        async with EZ1Simulator() as simulator:
+            port.value = simulator.port
+            await asyncio.Event().wait()
+
+    asyncio.run(main())
+
+
+async def _measure(shards: int, devices: int, seconds: float) -> None:
+    context = multiprocessing.get_context("spawn")
+    ports, servers = [], []
+    for _ in range(shards):
+        port = context.Value("i", 0)
+        server = context.Process(target=_serve, args=(port,), daemon=True)
+        server.start()
+        servers.append(server)
+        ports.append(port)
+    while not all(port.value for port in ports):
+        await asyncio.sleep(0.05)
+
+    poller = ShardedPoller(
+        {f"inv{i}": ("127.0.0.1", ports[i % shards].value) for i in range(devices)},
+        shards=shards,
+        rates=RATES,
+    )
+    await poller.start()
+    await asyncio.sleep(2.0)  # let the workers start up
+    started, polled = time.perf_counter(), poller.results
+    await asyncio.sleep(seconds)
+    rate = (poller.results - polled) / (time.perf_counter() - started)
+    await poller.stop()
+    for server in servers:
+        server.terminate()
+    print(f"{shards:>2} shards {rate:>10.0f} polls/s")
+
+
+async def main(devices: int, seconds: float) -> None:
+    for shards in sorted({1, 2, 4, os.cpu_count() or 1}):
+        await _measure(shards, devices, seconds)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 64, float(sys.argv[2]) if len(sys.argv) > 2 else 5.0))
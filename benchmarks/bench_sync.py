@@ -0,0 +1,44 @@
+"""Compares the per-call overhead of `asyncio.run` per reading with the sync facade.
+
+Run with `python benchmarks/bench_sync.py [calls]`.
+"""
+import asyncio
+import sys
+import time
+
+from APsystemsEZ1 import APsystemsEZ1M
+from APsystemsEZ1.simulator import EZ1Simulator
+from APsystemsEZ1.sync import BackgroundLoop, SyncAPsystemsEZ1M
+
+
+def _report(name: str, calls: int, elapsed: float) -> None:
+    print(f"{name:<32} {elapsed / calls * 1e6:>10.1f} us/call")
+
+
+def main(calls: int) -> None:
+    with BackgroundLoop() as server:
+        simulator = EZ1Simulator()
+        server.run(simulator.start())
+
+        started = time.perf_counter()
+        for _ in range(calls // 10):
+            asyncio.run(APsystemsEZ1M("127.0.0.1", simulator.port).get_output_data())
+        _report("asyncio.run per call", calls // 10, time.perf_counter() - started)
+
+        with SyncAPsystemsEZ1M("127.0.0.1", simulator.port, max_in_flight=None) as inverter:
+            inverter.get_output_data()
+            started = time.perf_counter()
+            for _ in range(calls):
+                inverter.get_output_data()
+            _report("SyncAPsystemsEZ1M", calls, time.perf_counter() - started)
+
+            started = time.perf_counter()
+            for _ in range(calls // 100):
+                inverter.batch(["get_output_data"] * 100)
+            _report("SyncAPsystemsEZ1M.batch (100)", calls, time.perf_counter() - started)
+
+        server.run(simulator.stop())
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
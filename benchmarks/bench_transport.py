@@ -0,0 +1,55 @@
+"""Compares the aiohttp and the raw asyncio transport against a local stand-in inverter.
+
+Run with `python benchmarks/bench_transport.py [requests]`.
+"""
+import asyncio
+import sys
+import time
+import tracemalloc
+
+from aiohttp import ClientSession
+
+from APsystemsEZ1 import APsystemsEZ1M
+from APsystemsEZ1.simulator import EZ1Simulator
+from APsystemsEZ1.transport import RawHTTPTransport
+
+
+async def _measure(name: str, ez1m: APsystemsEZ1M, requests: int) -> None:
+    await ez1m.get_output_data()  # warm up the connection
+    tracemalloc.start()
+    started = time.perf_counter()
+    for _ in range(requests):
+        await ez1m.get_output_data()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"{name:<28} {requests / elapsed:>8.0f} req/s "
+        f"{elapsed / requests * 1e6:>8.1f} us/req {peak / 1024:>8.1f} KiB peak"
+    )
+
+
+async def main(requests: int) -> None:
+    async with EZ1Simulator() as simulator:
+        await _measure(
+            "aiohttp (session per call)",
+            APsystemsEZ1M("127.0.0.1", simulator.port, max_in_flight=None),
+            requests // 10,
+        )
+        async with ClientSession() as session:
+            await _measure(
+                "aiohttp (shared session)",
+                APsystemsEZ1M("127.0.0.1", simulator.port, session=session, max_in_flight=None),
+                requests,
+            )
+        transport = RawHTTPTransport()
+        await _measure(
+            "raw asyncio",
+            APsystemsEZ1M("127.0.0.1", simulator.port, transport=transport, max_in_flight=None),
+            requests,
+        )
+        await transport.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000))
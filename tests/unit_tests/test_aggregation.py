@@ -0,0 +1,82 @@
+import pytest
+from APsystemsEZ1 import ReturnOutputData
+from APsystemsEZ1.aggregation import FleetReadings, FleetTotals, np
+
+BACKENDS = [
+    pytest.param(False, id="python"),
+    pytest.param(True, id="numpy", marks=pytest.mark.skipif(np is None, reason="NumPy is not installed")),
+]
+
+
+def _output(p1, p2=0.0, e=1.0, te=100.0):
+    return ReturnOutputData(p1=p1, e1=e, te1=te, p2=p2, e2=e, te2=te)
+
+
+def _fleet(use_numpy):
+    fleet = FleetReadings(
+        ["a", "b", "c", "d"],
+        tags={"a": "roof", "b": "roof", "c": "garage"},
+        addresses={"a": "10.0.0.1", "b": "10.0.1.1", "c": "10.0.0.3", "d": "10.0.0.4"},
+        use_numpy=use_numpy,
+    )
+    fleet.update("a", _output(300.0, 300.0))
+    fleet.update("b", _output(250.0, 250.0))
+    fleet.update("c", _output(100.0, 50.0))
+    fleet.update("d", None)
+    return fleet
+
+
+@pytest.mark.parametrize("use_numpy", BACKENDS)
+def test_totals(use_numpy):
+    # Arrange
+    fleet = _fleet(use_numpy)
+
+    # Act
+    totals = fleet.totals()
+
+    # Assert
+    assert totals == FleetTotals(power=1250.0, energy_today=6.0, energy_lifetime=600.0, reporting=3)
+
+
+@pytest.mark.parametrize("use_numpy", BACKENDS)
+def test_group_sums(use_numpy):
+    # Arrange
+    fleet = _fleet(use_numpy)
+
+    # Act
+    by_tag = fleet.sum_by_tag()
+    by_subnet = fleet.sum_by_subnet()
+
+    # Assert
+    assert {tag: totals.power for tag, totals in by_tag.items()} == {"roof": 1100.0, "garage": 150.0}
+    assert by_subnet["10.0.0.0/24"] == FleetTotals(750.0, 4.0, 400.0, 2)
+    assert by_subnet["10.0.1.0/24"].reporting == 1
+
+
+@pytest.mark.parametrize("use_numpy", BACKENDS)
+def test_top_and_underperformers(use_numpy):
+    # Arrange
+    fleet = _fleet(use_numpy)
+    fleet.update("e", _output(480.0))
+
+    # Act / Assert
+    assert fleet.top(2) == [("a", 600.0), ("b", 500.0)]
+    assert [device for device, _ in fleet.top(10)] == ["a", "b", "e", "c"]
+    assert fleet.median_power() == 490.0
+    assert fleet.underperformers(0.5) == [("c", 150.0)]
+
+
+@pytest.mark.parametrize("use_numpy", BACKENDS)
+def test_grows_beyond_initial_capacity(use_numpy):
+    # Arrange
+    fleet = FleetReadings(use_numpy=use_numpy)
+
+    # Act
+    for i in range(100):
+        fleet.on_result(f"inv{i}", "get_output_data", _output(float(i)))
+    fleet.on_result("inv0", "get_max_power", 800)
+
+    # Assert
+    assert len(fleet) == 100
+    assert fleet.totals().power == sum(range(100))
+    assert fleet.sum_by_tag() == {}
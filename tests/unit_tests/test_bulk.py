@@ -0,0 +1,130 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+from APsystemsEZ1 import APsystemsEZ1M
+from APsystemsEZ1.bulk import BulkWriter
+from APsystemsEZ1.simulator import EZ1Simulator
+
+
+def _inverter(limit=800):
+    ez1m = AsyncMock()
+    state = {"limit": limit, "on": True}
+
+    async def set_max_power(value):
+        state["limit"] = value
+        return value
+
+    async def set_device_power_status(value):
+        state["on"] = value
+        return value
+
+    ez1m.set_max_power.side_effect = set_max_power
+    ez1m.get_max_power.side_effect = lambda: state["limit"]
+    ez1m.set_device_power_status.side_effect = set_device_power_status
+    ez1m.get_device_power_status.side_effect = lambda: state["on"]
+    return ez1m
+
+
+@pytest.mark.asyncio
+async def test_only_stragglers_are_retried():
+    # Arrange
+    flaky = _inverter()
+    flaky.set_device_power_status.side_effect = [TimeoutError, None, False]
+    flaky.get_device_power_status.side_effect = [False]
+    inverters = {"a": _inverter(), "b": _inverter(), "flaky": flaky}
+    writer = BulkWriter(inverters, retry_delay=0.0)
+
+    # Act
+    result = await writer.set_device_power_status(False)
+
+    # Assert
+    assert result.ok
+    assert result.outcomes["flaky"].attempts == 3
+    assert inverters["a"].set_device_power_status.await_count == 1
+    assert result.outcomes["a"].value is False
+    assert result.elapsed >= max(outcome.elapsed for outcome in result.outcomes.values())
+
+
+@pytest.mark.asyncio
+async def test_unverified_and_failed_outcomes():
+    # Arrange
+    stuck = _inverter()
+    stuck.get_max_power.side_effect = lambda: 800
+    broken = _inverter()
+    broken.set_max_power.side_effect = ConnectionError("refused")
+    writer = BulkWriter({"ok": _inverter(), "stuck": stuck, "broken": broken}, attempts=2, retry_delay=0.0)
+
+    # Act
+    result = await writer.set_max_power({"ok": 300, "stuck": 400, "broken": 500})
+
+    # Assert
+    assert result.verified == ["ok"]
+    assert result.outcomes["stuck"].status == "unverified" and result.outcomes["stuck"].value == 800
+    assert result.outcomes["broken"].status == "failed" and "refused" in result.outcomes["broken"].error
+    assert result.stragglers == ["stuck", "broken"]
+    assert stuck.set_max_power.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_deadline_and_concurrency():
+    # Arrange
+    running = 0
+    peak = 0
+
+    def slow(seconds):
+        async def set_max_power(value):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(seconds)
+            running -= 1
+            return value
+
+        ez1m = _inverter()
+        ez1m.set_max_power.side_effect = set_max_power
+        ez1m.get_max_power.side_effect = lambda: 600
+        return ez1m
+
+    inverters = {f"inv{i}": slow(0.01) for i in range(6)} | {"hung": slow(10)}
+    writer = BulkWriter(inverters, concurrency=3, deadline=0.2)
+
+    # Act
+    result = await writer.set_max_power(600)
+
+    # Assert
+    assert peak == 3
+    assert result.outcomes["hung"].status == "timeout"
+    assert len(result.verified) == 6
+    assert result.elapsed < 0.5
+
+
+@pytest.mark.asyncio
+async def test_against_simulated_inverters():
+    async with EZ1Simulator() as first, EZ1Simulator() as second:
+        inverters = {
+            "first": APsystemsEZ1M("127.0.0.1", first.port),
+            "second": APsystemsEZ1M("127.0.0.1", second.port),
+        }
+
+        result = await BulkWriter(inverters).set_device_power_status(False)
+
+        assert result.ok
+        assert first.status == second.status == "1"
+
+
+@pytest.mark.asyncio
+async def test_without_read_back_acknowledged_value_counts():
+    # Arrange
+    clamping = _inverter()
+    clamping.set_max_power.side_effect = [590]
+    inverters = {"a": _inverter(), "clamping": clamping}
+    writer = BulkWriter(inverters, attempts=1, verify=False)
+
+    # Act
+    result = await writer.set_max_power(600)
+
+    # Assert
+    assert result.verified == ["a"]
+    assert result.outcomes["clamping"].status == "unverified"
+    assert result.outcomes["clamping"].value == 590
+    inverters["a"].get_max_power.assert_not_awaited()
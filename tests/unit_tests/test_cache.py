@@ -0,0 +1,72 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+from APsystemsEZ1 import ReturnOutputData
+from APsystemsEZ1.cache import StaleWhileRevalidate
+
+FIRST = ReturnOutputData(p1=100.0, e1=1.0, te1=10.0, p2=100.0, e2=1.0, te2=10.0)
+SECOND = ReturnOutputData(p1=200.0, e1=1.1, te1=10.1, p2=200.0, e2=1.1, te2=10.1)
+
+
+@pytest.mark.asyncio
+async def test_fresh_value_served_without_request():
+    # Arrange
+    ez1m = AsyncMock()
+    ez1m.get_output_data.return_value = FIRST
+    cache = StaleWhileRevalidate(ez1m, max_age=10)
+
+    # Act
+    first = await cache.get_output_data()
+    second = await cache.get_output_data()
+
+    # Assert
+    assert first.value == second.value == FIRST
+    assert not second.stale
+    assert ez1m.get_output_data.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_stale_value_served_while_refreshing():
+    # Arrange
+    ez1m = AsyncMock()
+    ez1m.get_output_data.side_effect = [FIRST, SECOND]
+    cache = StaleWhileRevalidate(ez1m, max_age=0.01)
+    await cache.get_output_data()
+    await asyncio.sleep(0.02)
+
+    # Act
+    stale = await cache.get_output_data()
+    await asyncio.sleep(0)
+    refreshed = await cache.get_output_data()
+
+    # Assert
+    assert stale.stale and stale.value == FIRST and stale.age >= 0.01
+    assert not refreshed.stale and refreshed.value == SECOND
+
+
+@pytest.mark.asyncio
+async def test_failed_refresh_keeps_value_until_max_staleness():
+    # Arrange
+    ez1m = AsyncMock()
+    ez1m.get_output_data.side_effect = [FIRST, TimeoutError, None, TimeoutError]
+    cache = StaleWhileRevalidate(ez1m, max_age=0.0, max_staleness=0.05)
+    await cache.get_output_data()
+
+    # Act
+    during_outage = [await cache.get_output_data(), await cache.get_output_data()]
+    await asyncio.sleep(0.06)
+    after_max_staleness = await cache.get_output_data()
+    await asyncio.sleep(0)
+
+    # Assert
+    assert all(reading.value == FIRST and reading.stale for reading in during_outage)
+    assert after_max_staleness is None
+    assert cache.refresh_errors >= 1
+
+
+@pytest.mark.asyncio
+async def test_no_value_yet():
+    ez1m = AsyncMock()
+    ez1m.get_alarm_info.side_effect = TimeoutError
+    cache = StaleWhileRevalidate(ez1m)
+    assert await cache.get_alarm_info() is None
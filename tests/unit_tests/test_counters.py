@@ -0,0 +1,116 @@
+import datetime
+import json
+from unittest.mock import AsyncMock
+
+import pytest
+from APsystemsEZ1 import APsystemsEZ1M, ReturnOutputData
+from APsystemsEZ1.counters import CounterRecovery, CounterSpec
+
+DAY = datetime.date(2024, 6, 1)
+NEXT_DAY = datetime.date(2024, 6, 2)
+
+
+@pytest.mark.parametrize(
+    "spec, values, days, expected, test_id",
+    [
+        (CounterSpec("te1"), [10.0, 11.0, 12.5], [DAY] * 3, [10.0, 11.0, 12.5], "count_up"),
+        (CounterSpec("te1"), [10.0, 11.0, 0.5, 1.0], [DAY] * 4, [10.0, 11.0, 11.5, 12.0], "reset"),
+        (CounterSpec("te1"), [10.0, 11.0, 0.0, 1.0], [DAY, DAY, NEXT_DAY, NEXT_DAY], [10.0, 11.0, 11.0, 12.0], "never_rollover"),
+        (CounterSpec("e1", rollover="day"), [2.0, 3.0, 0.1, 0.2], [DAY, DAY, NEXT_DAY, NEXT_DAY], [2.0, 3.0, 0.1, 0.2], "day_rollover"),
+        (CounterSpec("e1", rollover="day"), [2.0, 0.5, 0.0, 0.1], [DAY, DAY, NEXT_DAY, NEXT_DAY], [2.0, 2.5, 0.0, 0.1], "reset_then_rollover"),
+        (CounterSpec("te1", tolerance=0.05), [10.0, 9.98, 10.1], [DAY] * 3, [10.0, 10.0, 10.1], "jitter_held"),
+        (CounterSpec("te1", relative_tolerance=0.5), [10.0, 6.0, 4.0], [DAY] * 3, [10.0, 10.0, 14.0], "relative_tolerance"),
+    ],
+)
+def test_correct(spec, values, days, expected, test_id):
+    # Arrange
+    recovery = CounterRecovery([spec])
+
+    # Act
+    corrected = [recovery.correct("a", {spec.field: value}, day)[spec.field] for value, day in zip(values, days)]
+
+    # Assert
+    assert corrected == expected
+
+
+def test_devices_and_fields_are_independent():
+    # Arrange
+    recovery = CounterRecovery(devices=["a", "b"])
+
+    # Act
+    recovery.correct("a", {"te1": 100.0, "te2": 50.0}, DAY)
+    recovery.correct("b", {"te1": 10.0, "te2": 5.0}, DAY)
+    a = recovery.correct("a", {"te1": 1.0, "te2": 51.0}, DAY)
+    b = recovery.correct("b", {"te1": 11.0, "te2": 6.0}, DAY)
+
+    # Assert
+    assert a == {"te1": 101.0, "te2": 51.0}
+    assert b == {"te1": 11.0, "te2": 6.0}
+    assert recovery.reset_count("a", "te1") == 1
+    assert recovery.reset_count("a", "te2") == 0
+
+
+def test_missing_fields_are_skipped():
+    # Arrange
+    recovery = CounterRecovery()
+
+    # Act
+    corrected = recovery.correct("a", {"te1": 1.0, "te2": None}, DAY)
+
+    # Assert
+    assert corrected == {"te1": 1.0}
+
+
+def test_state_survives_restart():
+    # Arrange
+    recovery = CounterRecovery()
+    recovery.correct("a", {"te1": 100.0}, DAY)
+    recovery.correct("a", {"te1": 1.0}, DAY)
+    state = json.loads(json.dumps(recovery.state()))
+
+    # Act
+    restored = CounterRecovery([CounterSpec("te1")])
+    restored.restore(state)
+    corrected = restored.correct("a", {"te1": 2.0}, NEXT_DAY)
+
+    # Assert
+    assert corrected == {"te1": 102.0}
+
+
+@pytest.mark.asyncio
+async def test_wrap_corrects_output_data():
+    # Arrange
+    recovery = CounterRecovery()
+    sink = AsyncMock()
+    on_result = recovery.wrap(sink)
+
+    # Act
+    await on_result("a", "get_output_data", ReturnOutputData(te1=100.0, te2=10.0))
+    await on_result("a", "get_output_data", ReturnOutputData(te1=0.5, te2=10.5))
+    await on_result("a", "get_max_power", 600)
+
+    # Assert
+    assert sink.await_args_list[1].args[2] == ReturnOutputData(te1=100.5, te2=10.5)
+    assert sink.await_args_list[2].args == ("a", "get_max_power", 600)
+
+
+@pytest.mark.asyncio
+async def test_client_uses_counter_recovery():
+    # Arrange
+    recovery = CounterRecovery()
+    ez1m = APsystemsEZ1M("10.0.0.1", counter_recovery=recovery)
+    ez1m._request = AsyncMock(
+        side_effect=[
+            {"data": {"p1": 1, "e1": 1.0, "te1": 200.0, "p2": 1, "e2": 1.0, "te2": 300.0}, "status": 0},
+            {"data": {"p1": 1, "e1": 1.0, "te1": 0.2, "p2": 1, "e2": 1.0, "te2": 300.1}, "status": 0},
+        ]
+    )
+
+    # Act
+    await ez1m.get_output_data()
+    result = await ez1m.get_output_data()
+
+    # Assert
+    assert result.te1 == pytest.approx(200.2)
+    assert result.te2 == pytest.approx(300.1)
+    assert recovery.devices == ["10.0.0.1"]
@@ -0,0 +1,35 @@
+import time
+import pytest
+from APsystemsEZ1.discovery import discover, probe_port
+from APsystemsEZ1.simulator import EZ1Simulator
+
+
+@pytest.mark.asyncio
+async def test_discover_simulators_on_loopback():
+    # Arrange
+    async with EZ1Simulator(host="127.0.0.1", device_id="E07000000001") as first:
+        async with EZ1Simulator(host="127.0.0.3", port=first.port, device_id="E07000000003"):
+            # Act
+            started = time.monotonic()
+            found = await discover("127.0.0.0/29", port=first.port)
+            elapsed = time.monotonic() - started
+
+    # Assert
+    assert sorted(found) == ["E07000000001", "E07000000003"]
+    assert found["E07000000003"].ipAddr == "127.0.0.3"
+    assert elapsed < 2
+
+
+@pytest.mark.asyncio
+async def test_discover_ignores_other_services():
+    # Arrange
+    async with EZ1Simulator() as simulator:
+        simulator._data = lambda path, query: None  # answers 404 to everything
+
+        # Act
+        found = await discover("127.0.0.1/32", port=simulator.port)
+        reachable = await probe_port("127.0.0.1", simulator.port)
+
+    # Assert
+    assert found == {}
+    assert reachable
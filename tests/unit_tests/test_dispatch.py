@@ -0,0 +1,82 @@
+import pytest
+from unittest.mock import AsyncMock
+from APsystemsEZ1 import APsystemsEZ1M
+from APsystemsEZ1.dispatch import PowerLimitDispatcher, allocate_limits
+
+BOUNDS = {"a": (30, 800), "b": (30, 800), "c": (30, 800)}
+
+
+@pytest.mark.parametrize(
+    "total_limit, production, strategy, expected, test_id",
+    [
+        (1200, {"a": 600, "b": 300, "c": 300}, "proportional", {"a": 600, "b": 300, "c": 300}, "proportional"),
+        (1500, {"a": 0, "b": 0, "c": 0}, "proportional", {"a": 500, "b": 500, "c": 500}, "no_production_equal"),
+        (1800, {"a": 900, "b": 300, "c": 0}, "proportional", {"a": 800, "b": 800, "c": 200}, "pinned_to_bounds"),
+        (830, {"a": 500, "b": 0, "c": 0}, "proportional", {"a": 770, "b": 30, "c": 30}, "max_and_min_violated"),
+        (1000, {"a": 1000, "b": 1, "c": 0}, "proportional", {"a": 800, "b": 170, "c": 30}, "budget_redistributed"),
+        (60, {"a": 100, "b": 100, "c": 100}, "proportional", {"a": 30, "b": 30, "c": 30}, "below_min_power"),
+        (1300, {"a": 600, "b": 200, "c": 100}, "headroom", {"a": 653, "b": 360, "c": 286}, "headroom"),
+        (600, {"a": 600, "b": 300, "c": 300}, "headroom", {"a": 300, "b": 150, "c": 150}, "headroom_fallback"),
+    ],
+)
+def test_allocate_limits(total_limit, production, strategy, expected, test_id):
+    # Act
+    limits = allocate_limits(total_limit, production, BOUNDS, strategy)
+
+    # Assert
+    assert limits == expected
+    if total_limit >= sum(low for low, _ in BOUNDS.values()):
+        assert sum(limits.values()) <= total_limit
+
+
+def test_allocate_limits_unknown_strategy():
+    with pytest.raises(ValueError):
+        allocate_limits(1000, {}, BOUNDS, "random")
+
+
+def _inverter(max_power_read_back=None):
+    ez1m = APsystemsEZ1M(ip_address="0.0.0.0")
+    ez1m.set_max_power = AsyncMock(side_effect=lambda power_limit: power_limit)
+    ez1m.get_max_power = AsyncMock(side_effect=lambda: max_power_read_back or ez1m.set_max_power.await_args.args[0])
+    ez1m.get_total_output = AsyncMock(return_value=400.0)
+    return ez1m
+
+
+@pytest.mark.asyncio
+async def test_dispatch_pushes_only_changed_limits():
+    # Arrange
+    inverters = {"a": _inverter(), "b": _inverter()}
+    dispatcher = PowerLimitDispatcher(inverters, tolerance=5)
+
+    # Act
+    first = await dispatcher.dispatch(800)
+    second = await dispatcher.dispatch(804)
+    third = await dispatcher.dispatch(600, production={"a": 300, "b": 100})
+
+    # Assert
+    assert first.limits == {"a": 400, "b": 400}
+    assert first.changed == ["a", "b"]
+    assert second.changed == []
+    assert third.limits == {"a": 450, "b": 150}
+    assert third.changed == ["a", "b"]
+    assert inverters["a"].set_max_power.await_count == 2
+    assert third.elapsed > 0
+
+
+@pytest.mark.asyncio
+async def test_dispatch_reports_failed_and_unverified():
+    # Arrange
+    failing = _inverter()
+    failing.set_max_power = AsyncMock(side_effect=TimeoutError)
+    inverters = {"a": _inverter(), "b": failing, "c": _inverter(max_power_read_back=800)}
+    dispatcher = PowerLimitDispatcher(inverters, attempts=2, retry_delay=0.01)
+
+    # Act
+    result = await dispatcher.dispatch(900)
+
+    # Assert
+    assert result.failed == ["b"]
+    assert result.unverified == ["c"]
+    assert dispatcher.setpoints == {"a": 300}
+    assert result.outcomes["a"].attempts == 1
+    assert failing.set_max_power.await_count == result.outcomes["b"].attempts == 2
@@ -0,0 +1,119 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+from APsystemsEZ1 import ReturnAlarmInfo, ReturnOutputData
+from APsystemsEZ1.events import AlarmInfoEvent, EventBus, OutputDataEvent
+
+
+def _output(p1=100.0, e1=1.0, te1=10.0, p2=100.0, e2=1.0, te2=10.0):
+    return ReturnOutputData(p1=p1, e1=e1, te1=te1, p2=p2, e2=e2, te2=te2)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "readings, expected_changes, test_id",
+    [
+        ([_output(), _output()], [("p1", "e1", "te1", "p2", "e2", "te2")], "unchanged_suppressed"),
+        ([_output(), _output(p1=100.5)], [("p1", "e1", "te1", "p2", "e2", "te2")], "within_deadband"),
+        ([_output(), _output(p1=102.0)], [("p1", "e1", "te1", "p2", "e2", "te2"), ("p1",)], "beyond_deadband"),
+        (
+            [_output(), _output(p1=100.6), _output(p1=101.2)],
+            [("p1", "e1", "te1", "p2", "e2", "te2"), ("p1",)],
+            "drift_against_last_emitted",
+        ),
+        ([_output(), None, _output()], [("p1", "e1", "te1", "p2", "e2", "te2")], "offline_ignored"),
+    ],
+)
+async def test_output_data_deadband(readings, expected_changes, test_id):
+    # Arrange
+    bus = EventBus()
+    subscription = bus.subscribe()
+
+    # Act
+    for reading in readings:
+        bus.publish_output_data("inv1", reading)
+
+    # Assert
+    events = [subscription.get_nowait() for _ in range(subscription.qsize())]
+    assert [event.changed for event in events] == expected_changes
+    assert all(isinstance(event, OutputDataEvent) for event in events)
+
+
+@pytest.mark.asyncio
+async def test_alarm_flag_flip():
+    # Arrange
+    bus = EventBus()
+    subscription = bus.subscribe()
+    ok = ReturnAlarmInfo(offgrid=False, shortcircuit_1=False, shortcircuit_2=False, operating=True)
+    offgrid = ReturnAlarmInfo(offgrid=True, shortcircuit_1=False, shortcircuit_2=False, operating=True)
+
+    # Act
+    bus.publish_alarm_info("inv1", ok)
+    bus.publish_alarm_info("inv1", ok)
+    bus.publish_alarm_info("inv1", offgrid)
+
+    # Assert
+    assert subscription.qsize() == 2
+    subscription.get_nowait()
+    event = subscription.get_nowait()
+    assert isinstance(event, AlarmInfoEvent)
+    assert event.changed == ("offgrid",)
+    assert event.previous == ok
+
+
+@pytest.mark.asyncio
+async def test_fan_out_drop_oldest_and_device_filter():
+    # Arrange
+    bus = EventBus(deadbands={"p1": 0.0})
+    small = bus.subscribe(maxsize=2)
+    filtered = bus.subscribe(devices=["inv2"])
+
+    # Act
+    for power in (1.0, 2.0, 3.0):
+        bus.publish_output_data("inv1", _output(p1=power))
+    bus.publish_output_data("inv2", _output())
+
+    # Assert
+    assert small.dropped == 2
+    assert [small.get_nowait().data.p1 for _ in range(2)] == [3.0, 100.0]
+    assert filtered.qsize() == 1
+    assert filtered.get_nowait().device == "inv2"
+
+
+@pytest.mark.asyncio
+async def test_poll_publishes_once_per_change():
+    # Arrange
+    bus = EventBus()
+    subscription = bus.subscribe()
+    ez1m = AsyncMock()
+    ez1m.get_output_data.return_value = _output()
+    ez1m.get_alarm_info.return_value = None
+
+    # Act
+    task = asyncio.create_task(bus.poll("inv1", ez1m, interval=0.001))
+    await asyncio.sleep(0.02)
+    task.cancel()
+
+    # Assert
+    assert ez1m.get_output_data.await_count > 1
+    assert subscription.qsize() == 1
+    assert bus.suppressed == ez1m.get_output_data.await_count - 1
+
+
+@pytest.mark.asyncio
+async def test_poll_publishes_alarms_while_output_data_fails():
+    # Arrange
+    bus = EventBus()
+    subscription = bus.subscribe()
+    ez1m = AsyncMock()
+    ez1m.get_output_data.side_effect = TimeoutError
+    ez1m.get_alarm_info.return_value = ReturnAlarmInfo(offgrid=True, shortcircuit_1=False, shortcircuit_2=False, operating=True)
+
+    # Act
+    task = asyncio.create_task(bus.poll("inv1", ez1m, interval=0.001))
+    event = await asyncio.wait_for(subscription.get(), 1)
+    task.cancel()
+
+    # Assert
+    assert isinstance(event, AlarmInfoEvent)
+    assert event.data.offgrid
@@ -0,0 +1,109 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+from aiohttp.test_utils import TestClient, TestServer
+from APsystemsEZ1 import APsystemsEZ1M
+from APsystemsEZ1.__main__ import _parse_intervals, main
+from APsystemsEZ1.gateway import Gateway
+
+
+OUTPUT_DATA = {
+    "data": {"p1": 100, "e1": 1.0, "te1": 10.0, "p2": 100, "e2": 1.0, "te2": 10.0},
+    "message": "SUCCESS",
+    "deviceId": "E07000000001",
+}
+
+
+def _responses(endpoint):
+    if endpoint.startswith("setMaxPower"):
+        return {"data": {"maxPower": endpoint.split("=")[1]}, "message": "SUCCESS", "deviceId": "E07000000001"}
+    if endpoint == "getOutputData":
+        return OUTPUT_DATA
+    return None
+
+
+@pytest.fixture
+def ez1m():
+    ez1m = APsystemsEZ1M(ip_address="0.0.0.0")
+    ez1m._request = AsyncMock(side_effect=_responses)
+    return ez1m
+
+
+@pytest.mark.asyncio
+async def test_gateway_reads_served_from_cache(ez1m):
+    # Arrange
+    gateway = Gateway(ez1m, poll_intervals={"getOutputData": 3600})
+
+    # Act
+    async with TestClient(TestServer(gateway.make_app())) as client:
+        await asyncio.sleep(0.01)
+        responses = await asyncio.gather(*(client.get("/getOutputData") for _ in range(10)))
+        bodies = [await response.json() for response in responses]
+
+    # Assert
+    assert all(response.status == 200 for response in responses)
+    assert all(body == OUTPUT_DATA for body in bodies)
+    assert [call.args[0] for call in ez1m._request.await_args_list].count("getOutputData") == 1
+
+
+@pytest.mark.asyncio
+async def test_gateway_write_updates_cache(ez1m):
+    # Arrange
+    gateway = Gateway(ez1m)
+
+    # Act
+    async with TestClient(TestServer(gateway.make_app())) as client:
+        write = await client.get("/setMaxPower?p=600")
+        read = await client.get("/getMaxPower")
+        invalid = await client.get("/setMaxPower?p=9000")
+        body = await read.json()
+
+    # Assert
+    assert write.status == 200
+    assert body["data"]["maxPower"] == "600"
+    assert invalid.status == 400
+    assert "setMaxPower?p=9000" not in [call.args[0] for call in ez1m._request.await_args_list]
+
+
+@pytest.mark.asyncio
+async def test_gateway_unavailable_and_unknown_endpoints(ez1m):
+    # Arrange
+    ez1m._request = AsyncMock(side_effect=TimeoutError)
+    gateway = Gateway(ez1m)
+
+    # Act
+    async with TestClient(TestServer(gateway.make_app())) as client:
+        unavailable = await client.get("/getAlarm")
+        unknown = await client.get("/doesNotExist")
+        body = await unavailable.json()
+
+    # Assert
+    assert unavailable.status == 503
+    assert body["message"] == "FAILED"
+    assert unknown.status == 404
+
+
+def test_parse_intervals():
+    assert _parse_intervals(["getOutputData=2", "getAlarm=10.5"]) == {
+        "getOutputData": 2.0,
+        "getAlarm": 10.5,
+    }
+
+
+@pytest.mark.parametrize(
+    "interval, message, test_id",
+    [
+        ("getOutputData", "expected ENDPOINT=SECONDS", "no_seconds"),
+        ("getOutputData=soon", "expected ENDPOINT=SECONDS", "not_a_number"),
+        ("getOutputData=0", "must be positive", "not_positive"),
+        ("getOutputDta=2", "unknown endpoint 'getOutputDta'", "unknown_endpoint"),
+    ],
+)
+def test_invalid_interval_is_a_usage_error(capsys, interval, message, test_id):
+    # Act
+    with pytest.raises(SystemExit) as exit_info:
+        main(["gateway", "192.168.1.100", "--interval", interval])
+
+    # Assert
+    assert exit_info.value.code == 2
+    assert message in capsys.readouterr().err
@@ -0,0 +1,131 @@
+import asyncio
+import pytest
+from APsystemsEZ1 import APsystemsEZ1M
+from APsystemsEZ1.hedging import HedgePolicy
+from APsystemsEZ1.ratelimit import FleetRateLimiter
+
+RESPONSE = (200, {"data": {"maxPower": "800"}, "message": "SUCCESS"})
+
+
+class ScriptedTransport:
+    def __init__(self, latencies):
+        self.latencies = list(latencies)
+        self.sent = 0
+        self.cancelled = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def get(self, url, timeout):
+        latency = self.latencies[self.sent] if self.sent < len(self.latencies) else 0.001
+        self.sent += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(latency)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.in_flight -= 1
+        return RESPONSE
+
+    async def close(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_slow_read_is_hedged_and_loser_cancelled():
+    # Arrange
+    transport = ScriptedTransport([0.001] * 20 + [1.0, 0.001])
+    policy = HedgePolicy(min_samples=20, min_delay=0.01)
+    ez1m = APsystemsEZ1M("0.0.0.0", transport=transport, hedge=policy, max_in_flight=2)
+    for _ in range(20):
+        await ez1m.get_max_power()
+    loop = asyncio.get_running_loop()
+
+    # Act
+    started = loop.time()
+    max_power = await ez1m.get_max_power()
+    elapsed = loop.time() - started
+
+    # Assert
+    assert max_power == 800
+    assert elapsed < 0.5
+    assert transport.cancelled == 1
+    assert policy.stats.hedged == policy.stats.hedge_wins == 1
+    assert policy.stats.hedge_rate == pytest.approx(1 / 21)
+    assert policy.in_flight == 0
+    assert transport.max_in_flight == 2
+    assert ez1m.request_queue.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_no_hedge_beyond_device_request_cap():
+    # Arrange
+    transport = ScriptedTransport([0.001] * 20 + [0.1])
+    policy = HedgePolicy(min_samples=20, min_delay=0.01)
+    ez1m = APsystemsEZ1M("0.0.0.0", transport=transport, hedge=policy)
+    for _ in range(20):
+        await ez1m.get_max_power()
+
+    # Act
+    await ez1m.get_max_power()
+
+    # Assert
+    assert transport.max_in_flight == 1
+    assert policy.stats.hedged == 0
+    assert policy.stats.capped == 1
+    assert ez1m.request_queue.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_hedge_takes_rate_limiter_token():
+    # Arrange
+    transport = ScriptedTransport([0.001] * 20 + [1.0, 0.001])
+    policy = HedgePolicy(min_samples=20, min_delay=0.01)
+    limiter = FleetRateLimiter(rate=1000, burst=100)
+    ez1m = APsystemsEZ1M("0.0.0.0", transport=transport, hedge=policy, max_in_flight=2, rate_limiter=limiter)
+    for _ in range(20):
+        await ez1m.get_max_power()
+
+    # Act
+    await ez1m.get_max_power()
+
+    # Assert
+    assert policy.stats.hedged == 1
+    assert limiter.stats.requests == transport.sent == 22
+
+
+@pytest.mark.asyncio
+async def test_writes_are_never_hedged():
+    # Arrange
+    transport = ScriptedTransport([0.001] * 20 + [0.05])
+    policy = HedgePolicy(min_samples=20, min_delay=0.01)
+    ez1m = APsystemsEZ1M("0.0.0.0", transport=transport, hedge=policy)
+    for _ in range(20):
+        await ez1m.get_max_power()
+
+    # Act
+    await ez1m._request("setMaxPower?p=800")
+
+    # Assert
+    assert transport.sent == 21
+    assert policy.stats.hedged == 0
+
+
+@pytest.mark.asyncio
+async def test_hedges_respect_in_flight_cap():
+    # Arrange
+    transport = ScriptedTransport([0.001] * 20 + [0.1, 0.1])
+    policy = HedgePolicy(min_samples=20, min_delay=0.01, max_in_flight=2)
+    ez1m = APsystemsEZ1M("0.0.0.0", transport=transport, hedge=policy, max_in_flight=None)
+    for _ in range(20):
+        await ez1m.get_max_power()
+
+    # Act
+    await asyncio.gather(ez1m.get_max_power(), ez1m.get_max_power())
+
+    # Assert
+    assert transport.max_in_flight == 2
+    assert policy.stats.capped == 2
+    assert policy.stats.hedged == 0
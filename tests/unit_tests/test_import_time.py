@@ -0,0 +1,62 @@
+import subprocess
+import sys
+from pathlib import Path
+
+IMPORT_BUDGET_US = 100_000
+ROOT = Path(__file__).parents[2]
+
+
+def _run(code):
+    return subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, check=True, cwd=ROOT)
+
+
+def test_http_stack_is_imported_lazily():
+    # Act
+    result = _run(
+        "import sys, APsystemsEZ1\n"
+        "print(sorted(m for m in ('aiohttp', 'asyncio') if m in sys.modules))\n"
+        "APsystemsEZ1.APsystemsEZ1M('127.0.0.1')\n"
+        "print(sorted(m for m in ('aiohttp', 'asyncio') if m in sys.modules))\n"
+        "from APsystemsEZ1 import ClientSession, RequestTimeout\n"
+        "print(sorted(m for m in ('aiohttp', 'asyncio') if m in sys.modules))\n"
+    )
+
+    # Assert
+    assert result.stdout.splitlines() == ["[]", "['asyncio']", "['aiohttp', 'asyncio']"]
+
+
+def test_raw_transport_requests_do_not_import_aiohttp():
+    # Act
+    result = _run(
+        "import asyncio, sys\n"
+        "from APsystemsEZ1 import APsystemsEZ1M, InverterHTTPError\n"
+        "from APsystemsEZ1.simulator import EZ1Simulator\n"
+        "from APsystemsEZ1.transport import RawHTTPTransport\n"
+        "async def main():\n"
+        "    async with EZ1Simulator() as simulator:\n"
+        "        transport = RawHTTPTransport()\n"
+        "        ez1m = APsystemsEZ1M('127.0.0.1', port=simulator.port, transport=transport)\n"
+        "        print(await ez1m.get_max_power())\n"
+        "        try:\n"
+        "            await ez1m._request('doesNotExist')\n"
+        "        except InverterHTTPError as error:\n"
+        "            print(error.status)\n"
+        "        await transport.close()\n"
+        "asyncio.run(main())\n"
+        "print('aiohttp' in sys.modules)\n"
+    )
+
+    # Assert
+    assert result.stdout.splitlines() == ["800", "404", "False"]
+
+
+def test_import_time_budget():
+    # Act
+    timings = []
+    for _ in range(3):
+        stderr = _run("import APsystemsEZ1").stderr
+        package = next(line for line in stderr.splitlines() if line.rstrip().endswith("| APsystemsEZ1"))
+        timings.append(int(package.split("|")[1]))
+
+    # Assert
+    assert min(timings) < IMPORT_BUDGET_US, f"import APsystemsEZ1 took {min(timings)} us"
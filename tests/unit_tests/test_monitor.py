@@ -0,0 +1,109 @@
+import asyncio
+import time
+import pytest
+from APsystemsEZ1 import APsystemsEZ1M
+from APsystemsEZ1.monitor import LoopMonitor
+from APsystemsEZ1.polling import PollRate, PollScheduler
+from APsystemsEZ1.simulator import EZ1Simulator
+
+RATES = {
+    "get_output_data": PollRate(0.02),
+    "get_alarm_info": None,
+    "get_max_power": None,
+    "get_device_power_status": None,
+    "get_device_info": None,
+}
+
+
+@pytest.mark.asyncio
+async def test_lag_is_measured():
+    # Arrange
+    async with LoopMonitor(interval=0.01) as monitor:
+        await asyncio.sleep(0.03)
+
+        # Act
+        time.sleep(0.05)
+        await asyncio.sleep(0.03)
+
+    # Assert
+    report = monitor.report()
+    assert report.lag.samples >= 3
+    assert report.lag.max >= 0.03
+    assert report.slow_callbacks[0].callback == "Task test_lag_is_measured"
+
+
+@pytest.mark.asyncio
+async def test_slow_sink_is_attributed_to_device_and_phase():
+    # Arrange
+    def slow_sink(device, method, value):
+        time.sleep(0.06)
+
+    async with EZ1Simulator() as simulator:
+        ez1m = APsystemsEZ1M("127.0.0.1", simulator.port, enable_debounce=True)
+        await ez1m.get_output_data()  # import the HTTP stack before monitoring
+        scheduler = PollScheduler(
+            {"inv": ez1m},
+            rates=RATES,
+            on_result=slow_sink,
+        )
+
+        # Act
+        async with LoopMonitor(slow_callback=0.05) as monitor:
+            task = asyncio.create_task(scheduler.run())
+            await asyncio.sleep(0.2)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+    # Assert
+    report = monitor.report()
+    assert {"request", "parse", "debounce", "sinks"} <= set(report.phases)
+    assert report.client_time >= report.phases["sinks"].total >= 0.06
+    assert report.device_time > 0
+    slow = report.slow_callbacks[0]
+    assert (slow.device, slow.endpoint) == ("inv", "get_output_data")
+    assert slow.phase_times["sinks"] >= 0.05
+    assert slow.duration >= 0.06
+
+
+@pytest.mark.asyncio
+async def test_phases_are_split_per_poll_cycle():
+    # Arrange
+    async with EZ1Simulator() as simulator:
+        ez1m = APsystemsEZ1M("127.0.0.1", simulator.port)
+        await ez1m.get_output_data()  # import the HTTP stack before monitoring
+        scheduler = PollScheduler({"inv": ez1m}, rates=RATES, cycle_interval=0.05)
+
+        # Act
+        async with LoopMonitor() as monitor:
+            task = asyncio.create_task(scheduler.run())
+            await asyncio.sleep(0.22)
+            simulator.latency = 0.01
+            await asyncio.sleep(0.2)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+    # Assert
+    cycles = list(monitor.cycles)
+    assert len(cycles) >= 6
+    assert sum(cycle.phases["request"].count for cycle in cycles) <= monitor.report().phases["request"].count
+    fast, slow = cycles[1].phases["request"], cycles[-1].phases["request"]
+    assert slow.mean > fast.mean + 0.005
+    assert cycles[-1].device_time > cycles[1].device_time
+
+
+@pytest.mark.asyncio
+async def test_stop_restores_loop():
+    # Arrange
+    original = asyncio.Handle._run
+    monitor = LoopMonitor()
+
+    # Act
+    monitor.start()
+    with pytest.raises(RuntimeError):
+        LoopMonitor().start()
+    await monitor.stop()
+
+    # Assert
+    assert asyncio.Handle._run is original
@@ -0,0 +1,191 @@
+import asyncio
+import time
+
+import pytest
+from APsystemsEZ1 import ReturnOutputData
+from APsystemsEZ1.outbox import DiskSpool, Outbox
+
+
+def _records(count, size=10):
+    return [f"{index:0{size}d}".encode() for index in range(count)]
+
+
+def test_append_read_ack(tmp_path):
+    # Arrange
+    spool = DiskSpool(tmp_path, segment_bytes=100, max_bytes=10_000)
+    for record in _records(25):
+        spool.append(record)
+    spool.flush()
+
+    # Act
+    first, position = spool.read(max_records=10)
+    spool.ack(position)
+    rest, end = spool.read(max_records=100)
+
+    # Assert
+    assert first == _records(10)
+    assert rest == _records(25)[10:]
+    assert len(list(tmp_path.glob("*.seg"))) == 4
+    spool.ack(end)
+    assert len(list(tmp_path.glob("*.seg"))) == 1
+    spool.close()
+
+
+def test_acknowledged_position_survives_restart(tmp_path):
+    # Arrange
+    spool = DiskSpool(tmp_path, segment_bytes=100, max_bytes=10_000)
+    for record in _records(20):
+        spool.append(record)
+    spool.flush()
+    _, position = spool.read(max_records=12)
+    spool.ack(position)
+    spool.close()
+
+    # Act
+    reopened = DiskSpool(tmp_path, segment_bytes=100, max_bytes=10_000)
+    records, _ = reopened.read(max_records=100)
+
+    # Assert
+    assert records == _records(20)[12:]
+    reopened.close()
+
+
+def test_torn_record_is_cut_off(tmp_path):
+    # Arrange
+    spool = DiskSpool(tmp_path)
+    spool.append(b"complete")
+    spool.close()
+    segment = next(tmp_path.glob("*.seg"))
+    with segment.open("ab") as file:
+        file.write(b"\x10\x00\x00\x00\x00\x00\x00\x00torn")
+
+    # Act
+    reopened = DiskSpool(tmp_path)
+    reopened.append(b"next")
+    reopened.flush()
+    records, _ = reopened.read()
+
+    # Assert
+    assert records == [b"complete", b"next"]
+    reopened.close()
+
+
+def test_oldest_segments_are_dropped_when_full(tmp_path):
+    # Arrange
+    spool = DiskSpool(tmp_path, segment_bytes=180, max_bytes=360)
+
+    # Act
+    for record in _records(100):
+        spool.append(record)
+    spool.flush()
+    records, _ = spool.read(max_records=1000)
+
+    # Assert
+    assert spool.size <= 360
+    assert spool.stats.dropped_segments > 0
+    assert records == _records(100)[-len(records):]
+    spool.close()
+
+
+def test_spool_must_hold_two_segments(tmp_path):
+    with pytest.raises(ValueError):
+        DiskSpool(tmp_path, segment_bytes=100, max_bytes=150)
+
+
+@pytest.mark.asyncio
+async def test_outbox_delivers_results(tmp_path):
+    # Arrange
+    batches = []
+
+    async def send(batch):
+        batches.append(batch)
+
+    # Act
+    async with Outbox(tmp_path, send, batch_size=2) as outbox:
+        outbox.on_result("a", "get_output_data", ReturnOutputData(p1=1.0))
+        outbox.on_result("b", "get_output_data", None)
+        outbox.on_result("b", "get_max_power", 600)
+        outbox.on_result("c", "get_max_power", 800)
+        while outbox.stats.delivered < 3:
+            await asyncio.sleep(0.01)
+
+    # Assert
+    records = [record for batch in batches for record in batch]
+    assert [(record["device"], record["method"]) for record in records] == [
+        ("a", "get_output_data"),
+        ("b", "get_max_power"),
+        ("c", "get_max_power"),
+    ]
+    assert records[0]["value"]["p1"] == 1.0
+    assert len(batches) == 2
+    assert outbox.spool.acked != (0, 0)
+
+
+@pytest.mark.asyncio
+async def test_outbox_retries_until_sink_recovers(tmp_path):
+    # Arrange
+    delivered = []
+    failures = 2
+
+    async def send(batch):
+        nonlocal failures
+        if failures:
+            failures -= 1
+            raise ConnectionError("sink down")
+        delivered.extend(batch)
+
+    # Act
+    async with Outbox(tmp_path, send, retry_delay=0.01) as outbox:
+        outbox.put({"n": 1})
+        outbox.put({"n": 2})
+        while len(delivered) < 2:
+            await asyncio.sleep(0.01)
+
+    # Assert
+    assert delivered == [{"n": 1}, {"n": 2}]
+    assert outbox.stats.failures == 2
+
+
+@pytest.mark.asyncio
+async def test_outbox_keeps_undelivered_records(tmp_path):
+    # Arrange
+    async def down(batch):
+        raise ConnectionError("sink down")
+
+    async with Outbox(tmp_path, down, retry_delay=10) as outbox:
+        outbox.put({"n": 1})
+        await asyncio.sleep(0.05)
+    delivered = []
+
+    async def send(batch):
+        delivered.extend(batch)
+
+    # Act
+    async with Outbox(tmp_path, send) as outbox:
+        outbox.put({"n": 2})
+        while len(delivered) < 2:
+            await asyncio.sleep(0.01)
+
+    # Assert
+    assert delivered == [{"n": 1}, {"n": 2}]
+
+
+@pytest.mark.asyncio
+async def test_outbox_drain_rate(tmp_path):
+    # Arrange
+    delivered = []
+
+    async def send(batch):
+        delivered.extend(batch)
+
+    # Act
+    async with Outbox(tmp_path, send, rate=100, batch_size=5) as outbox:
+        for n in range(15):
+            outbox.put({"n": n})
+        started = time.monotonic()
+        while len(delivered) < 15:
+            await asyncio.sleep(0.01)
+        elapsed = time.monotonic() - started
+
+    # Assert
+    assert elapsed >= 0.09
@@ -0,0 +1,114 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+from APsystemsEZ1 import ReturnAlarmInfo, ReturnOutputData
+from APsystemsEZ1.polling import PollRate, PollScheduler
+
+OK = ReturnAlarmInfo(offgrid=False, shortcircuit_1=False, shortcircuit_2=False, operating=True)
+OFFGRID = ReturnAlarmInfo(offgrid=True, shortcircuit_1=False, shortcircuit_2=False, operating=True)
+
+
+def _output(power):
+    return ReturnOutputData(p1=power, e1=0.0, te1=0.0, p2=0.0, e2=0.0, te2=0.0)
+
+
+def _inverter():
+    ez1m = AsyncMock()
+    ez1m.get_output_data.return_value = _output(100.0)
+    ez1m.get_alarm_info.return_value = OK
+    ez1m.get_device_info.return_value = "info"
+    return ez1m
+
+
+def test_phases_are_staggered():
+    # Arrange
+    scheduler = PollScheduler({f"inv{i}": _inverter() for i in range(4)}, rates={"get_max_power": None, "get_device_power_status": None})
+
+    # Act
+    scheduler._stagger(0.0)
+
+    # Assert
+    due = sorted((method, round(time, 3)) for time, _, _, method in scheduler._heap)
+    assert [time for method, time in due if method == "get_output_data"] == [0.0, 0.25, 0.5, 0.75]
+    assert [time for method, time in due if method == "get_alarm_info"] == [0.0, 7.5, 15.0, 22.5]
+    assert [time for method, time in due if method == "get_device_info"] == [0.0] * 4
+
+
+def test_intervals_stretch_when_stable_and_tighten_on_activity():
+    # Arrange
+    scheduler = PollScheduler({"inv": _inverter()})
+
+    # Act / Assert
+    assert scheduler._next_interval("inv", "get_output_data", _output(100.0)) == 1.0
+    stretched = [scheduler._next_interval("inv", "get_output_data", _output(105.0)) for _ in range(8)]
+    assert stretched == [1.5, 2.25, 3.375, 5.0625, 7.59375, 10.0, 10.0, 10.0]
+    assert scheduler._next_interval("inv", "get_output_data", _output(300.0)) == 1.0
+    assert scheduler._next_interval("inv", "get_max_power", 800) == 300.0
+
+
+def test_alarm_tightens_alarm_and_output_intervals():
+    # Arrange
+    scheduler = PollScheduler({"inv": _inverter()})
+    scheduler.intervals[("inv", "get_output_data")] = 10.0
+
+    # Act / Assert
+    assert scheduler._next_interval("inv", "get_alarm_info", OK) == 45.0
+    assert scheduler._next_interval("inv", "get_alarm_info", OFFGRID) == 5.0
+    assert scheduler.intervals[("inv", "get_output_data")] == 1.0
+    assert scheduler._next_interval("inv", "get_alarm_info", OFFGRID) == 5.0
+
+
+@pytest.mark.asyncio
+async def test_run_polls_each_getter_on_its_own_rate():
+    # Arrange
+    inverter = _inverter()
+    results = []
+    scheduler = PollScheduler(
+        {"inv": inverter},
+        rates={
+            "get_output_data": PollRate(0.01),
+            "get_alarm_info": PollRate(10.0),
+            "get_max_power": None,
+            "get_device_power_status": None,
+        },
+        on_result=lambda device, method, value: results.append(method),
+    )
+
+    # Act
+    task = asyncio.create_task(scheduler.run())
+    await asyncio.sleep(0.1)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    # Assert
+    assert results.count("get_device_info") == 1
+    assert results.count("get_alarm_info") == 1
+    assert results.count("get_output_data") > 3
+    inverter.get_max_power.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_devices_added_and_removed_while_running():
+    # Arrange
+    polled = set()
+    scheduler = PollScheduler(
+        {"inv": _inverter()},
+        rates={"get_output_data": PollRate(0.01), "get_alarm_info": None, "get_max_power": None, "get_device_power_status": None, "get_device_info": None},
+        on_result=lambda device, method, value: polled.add(device),
+    )
+    task = asyncio.create_task(scheduler.run())
+    await asyncio.sleep(0.03)
+
+    # Act
+    scheduler.remove("inv")
+    scheduler.add("new", _inverter())
+    polled.clear()
+    await asyncio.sleep(0.05)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    # Assert
+    assert polled == {"new"}
+    assert all(device == "new" for _, _, device, _ in scheduler._heap)
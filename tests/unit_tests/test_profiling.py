@@ -0,0 +1,127 @@
+import asyncio
+import os
+import signal
+import time
+import pytest
+from unittest.mock import AsyncMock
+from APsystemsEZ1 import ReturnOutputData
+from APsystemsEZ1.polling import PollRate, PollScheduler
+from APsystemsEZ1.profiling import PROFILE_DIR_ENV, PROFILE_ENV, PollProfiler
+
+RATES = {
+    "get_output_data": PollRate(0.001),
+    "get_alarm_info": None,
+    "get_max_power": None,
+    "get_device_power_status": None,
+    "get_device_info": None,
+}
+
+
+def busy_parsing(seconds=0.003):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+    return ReturnOutputData(p1=1.0, e1=0.0, te1=0.0, p2=0.0, e2=0.0, te2=0.0)
+
+
+def _inverter():
+    ez1m = AsyncMock()
+    ez1m.get_output_data.side_effect = lambda: busy_parsing()
+    return ez1m
+
+
+async def _poll_until_profiled(scheduler, profiler):
+    task = asyncio.create_task(scheduler.run())
+    for _ in range(200):
+        await asyncio.sleep(0.01)
+        if profiler.last_paths:
+            break
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+
+@pytest.mark.parametrize(
+    "mode, profile_suffix, test_id",
+    [("sampling", ".collapsed", "sampling"), ("cprofile", ".prof", "cprofile")],
+)
+@pytest.mark.asyncio
+async def test_profiles_poll_cycles_of_all_devices(tmp_path, mode, profile_suffix, test_id):
+    # Arrange
+    profiler = PollProfiler(cycles=20, mode=mode, output_dir=tmp_path, autostart=True)
+    scheduler = PollScheduler({f"inv{i}": _inverter() for i in range(3)}, rates=RATES, profiler=profiler)
+
+    # Act
+    await _poll_until_profiled(scheduler, profiler)
+
+    # Assert
+    report, profile = profiler.last_paths
+    assert report.suffix == ".txt" and profile.suffix == profile_suffix
+    assert report.read_text().startswith("20 poll cycles in")
+    assert "busy_parsing" in report.read_text()
+    assert not profiler.active
+    if mode == "sampling":
+        lines = profile.read_text().splitlines()
+        assert any("busy_parsing" in line.split(";")[-1] for line in lines)
+        assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+
+@pytest.mark.asyncio
+async def test_signal_starts_profiler(tmp_path):
+    # Arrange
+    profiler = PollProfiler(cycles=5, output_dir=tmp_path)
+    scheduler = PollScheduler({"inv": _inverter()}, rates=RATES, profiler=profiler)
+    task = asyncio.create_task(scheduler.run())
+    await asyncio.sleep(0.02)
+    assert not profiler.last_paths
+
+    # Act
+    os.kill(os.getpid(), signal.SIGUSR1)
+    for _ in range(100):
+        await asyncio.sleep(0.01)
+        if profiler.last_paths:
+            break
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    # Assert
+    assert len(profiler.last_paths) == 2
+
+
+@pytest.mark.parametrize(
+    "value, cycles, mode, autostart, test_id",
+    [
+        (None, 200, "sampling", False, "armed_by_default"),
+        ("50:cprofile", 50, "cprofile", False, "configured"),
+        ("50:cprofile:start", 50, "cprofile", True, "started"),
+        ("start", 200, "sampling", True, "started_with_defaults"),
+    ],
+)
+def test_profiler_from_environment(monkeypatch, tmp_path, value, cycles, mode, autostart, test_id):
+    # Arrange
+    if value is None:
+        monkeypatch.delenv(PROFILE_ENV, raising=False)
+    else:
+        monkeypatch.setenv(PROFILE_ENV, value)
+    monkeypatch.setenv(PROFILE_DIR_ENV, str(tmp_path))
+
+    # Act
+    scheduler = PollScheduler({"inv": _inverter()})
+
+    # Assert
+    assert scheduler.profiler.cycles == cycles
+    assert scheduler.profiler.mode == mode
+    assert scheduler.profiler.output_dir == tmp_path
+    assert scheduler.profiler.autostart == autostart
+
+
+def test_profiler_can_be_disabled(monkeypatch):
+    # Arrange
+    monkeypatch.setenv(PROFILE_ENV, "off")
+
+    # Act
+    scheduler = PollScheduler({"inv": _inverter()})
+
+    # Assert
+    assert scheduler.profiler is None
@@ -0,0 +1,75 @@
+import asyncio
+import time
+import pytest
+from APsystemsEZ1 import APsystemsEZ1M
+from APsystemsEZ1.ratelimit import FleetRateLimiter, TokenBucket
+from APsystemsEZ1.simulator import EZ1Simulator
+
+
+@pytest.mark.asyncio
+async def test_bucket_allows_burst_then_sustained_rate():
+    # Arrange
+    bucket = TokenBucket(rate=100, burst=5)
+
+    # Act
+    waits = [await bucket.acquire() for _ in range(10)]
+
+    # Assert
+    assert all(wait < 0.005 for wait in waits[:5])
+    assert sum(waits[5:]) == pytest.approx(0.05, abs=0.02)
+
+
+@pytest.mark.parametrize(
+    "rate, burst, test_id",
+    [(0, 1, "no_rate"), (1, 0, "no_burst")],
+)
+def test_bucket_rejects_invalid_parameters(rate, burst, test_id):
+    with pytest.raises(ValueError):
+        TokenBucket(rate, burst)
+
+
+@pytest.mark.parametrize(
+    "host, expected, test_id",
+    [
+        ("192.168.1.17", "192.168.1.0/24", "ipv4"),
+        ("inverter.local", "inverter.local", "hostname"),
+    ],
+)
+def test_subnet(host, expected, test_id):
+    assert FleetRateLimiter(rate=10).subnet(host) == expected
+
+
+@pytest.mark.asyncio
+async def test_subnet_limit_does_not_slow_other_subnets():
+    # Arrange
+    limiter = FleetRateLimiter(rate=1000, burst=100, subnet_rate=20, subnet_burst=1)
+    await limiter.acquire("10.0.0.1")
+
+    # Act
+    other_subnet = await limiter.acquire("10.0.1.1")
+    same_subnet = await limiter.acquire("10.0.0.2")
+
+    # Assert
+    assert other_subnet < 0.005
+    assert same_subnet == pytest.approx(0.05, abs=0.02)
+    assert limiter.stats.requests == 3
+    assert limiter.stats.delayed == 1
+    assert limiter.stats.max_wait == same_subnet
+
+
+@pytest.mark.asyncio
+async def test_clients_share_limiter():
+    # Arrange
+    limiter = FleetRateLimiter(rate=50, burst=2)
+
+    async with EZ1Simulator() as simulator:
+        clients = [APsystemsEZ1M("127.0.0.1", simulator.port, rate_limiter=limiter) for _ in range(3)]
+
+        # Act
+        started = time.monotonic()
+        await asyncio.gather(*(client.get_max_power() for client in clients * 2))
+        elapsed = time.monotonic() - started
+
+    # Assert
+    assert limiter.stats.requests == 6
+    assert elapsed >= 0.07
@@ -0,0 +1,113 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+from APsystemsEZ1 import registry as registry_module
+from APsystemsEZ1.registry import DeviceMismatchError, DeviceRegistry
+from APsystemsEZ1.simulator import EZ1Simulator
+
+
+@pytest.mark.asyncio
+async def test_registry_persists_and_starts_without_requests(tmp_path):
+    # Arrange
+    path = tmp_path / "registry.json"
+
+    async with EZ1Simulator() as simulator:
+        registry = DeviceRegistry(path)
+        await registry.add("127.0.0.1", simulator.port)
+        requests_before = simulator.requests
+
+        # Act
+        restored = DeviceRegistry(path)
+        client = restored.client("E07000000001")
+        info = restored.device_info("E07000000001")
+        max_power = await client.get_max_power()
+
+    # Assert
+    assert simulator.requests == requests_before + 1
+    assert info.devVer == "EZ1 1.6.0"
+    assert client.base_url == f"http://127.0.0.1:{simulator.port}"
+    assert max_power == 800
+
+
+@pytest.mark.asyncio
+async def test_registry_re_resolves_moved_device(tmp_path):
+    # Arrange
+    registry = DeviceRegistry(tmp_path / "registry.json", network="127.0.0.0/30", failure_threshold=2)
+
+    async with EZ1Simulator(host="127.0.0.1") as simulator:
+        client = await registry.add("127.0.0.1", simulator.port)
+    port = simulator.port
+
+    async with EZ1Simulator(host="127.0.0.2", port=port):
+        # Act
+        for _ in range(2):
+            with pytest.raises(Exception):
+                await client.get_max_power()
+        await registry.schedule_resolve("E07000000001")
+        max_power = await client.get_max_power()
+
+    # Assert
+    assert client.base_url == f"http://127.0.0.2:{port}"
+    assert registry.entries["E07000000001"].ip_address == "127.0.0.2"
+    assert DeviceRegistry(tmp_path / "registry.json").entries["E07000000001"].ip_address == "127.0.0.2"
+    assert max_power == 800
+
+
+@pytest.mark.asyncio
+async def test_registry_detects_other_device_at_address(tmp_path):
+    # Arrange
+    registry = DeviceRegistry(tmp_path / "registry.json", network="127.0.0.1/32")
+
+    async with EZ1Simulator() as simulator:
+        client = await registry.add("127.0.0.1", simulator.port)
+        simulator.device_id = "E07000000099"
+
+        # Act / Assert
+        with pytest.raises(DeviceMismatchError):
+            await client.get_output_data()
+        await registry.schedule_resolve("E07000000001")
+
+    assert "E07000000099" in registry.entries
+
+
+class _UnreachableTransport:
+    async def get(self, url, timeout):
+        raise ConnectionError("no route to host")
+
+    async def close(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_registry_rescans_are_rate_limited(tmp_path, monkeypatch):
+    # Arrange
+    path = tmp_path / "registry.json"
+    path.write_text('{"devices": {"E07000000001": {"ip_address": "127.0.0.1"}}}')
+    discover = AsyncMock(return_value={})
+    monkeypatch.setattr(registry_module, "discover", discover)
+    registry = DeviceRegistry(
+        path,
+        failure_threshold=2,
+        client_options={"transport": _UnreachableTransport(), "max_in_flight": None},
+        rescan_interval=0.05,
+    )
+    client = registry.client("E07000000001")
+
+    # Act
+    for _ in range(20):
+        with pytest.raises(ConnectionError):
+            await client.get_max_power()
+        await asyncio.sleep(0)
+    await registry.schedule_resolve("E07000000001")
+    rescans_in_cooldown = discover.await_count
+    await asyncio.sleep(0.06)
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            await client.get_max_power()
+    await registry.schedule_resolve("E07000000001")
+
+    # Assert
+    assert rescans_in_cooldown == 1
+    assert discover.await_count == 2
+    assert registry._rescan_delay["E07000000001"] == pytest.approx(0.2)
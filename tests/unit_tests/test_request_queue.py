@@ -0,0 +1,130 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+from APsystemsEZ1 import APsystemsEZ1M
+from APsystemsEZ1.request_queue import RequestQueue
+
+
+def _recorder(order: list, delay: float = 0.01):
+    in_flight = {"now": 0, "max": 0}
+
+    def factory(endpoint):
+        async def send():
+            in_flight["now"] += 1
+            in_flight["max"] = max(in_flight["max"], in_flight["now"])
+            await asyncio.sleep(delay)
+            in_flight["now"] -= 1
+            order.append(endpoint)
+            return endpoint
+
+        return send
+
+    return factory, in_flight
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("max_in_flight", [1, 2])
+async def test_in_flight_limit(max_in_flight):
+    # Arrange
+    queue = RequestQueue(max_in_flight=max_in_flight)
+    order = []
+    factory, in_flight = _recorder(order)
+
+    # Act
+    await asyncio.gather(*(queue.submit(f"get{i}", factory(f"get{i}")) for i in range(6)))
+
+    # Assert
+    assert in_flight["max"] == max_in_flight
+    assert queue.stats.max_depth == 6 - max_in_flight
+    assert queue.stats.completed == 6
+    assert queue.stats.max_wait > 0
+
+
+@pytest.mark.asyncio
+async def test_writes_jump_ahead_and_duplicate_reads_coalesce():
+    # Arrange
+    queue = RequestQueue()
+    order = []
+    factory, _ = _recorder(order)
+
+    # Act
+    results = await asyncio.gather(
+        queue.submit("getOutputData", factory("getOutputData")),
+        queue.submit("getAlarm", factory("getAlarm")),
+        queue.submit("getAlarm", factory("getAlarm")),
+        queue.submit("setMaxPower?p=600", factory("setMaxPower?p=600"), write=True),
+    )
+
+    # Assert
+    assert order == ["getOutputData", "setMaxPower?p=600", "getAlarm"]
+    assert results == ["getOutputData", "getAlarm", "getAlarm", "setMaxPower?p=600"]
+    assert queue.stats.coalesced == 1
+    assert queue.depth == 0
+
+
+@pytest.mark.asyncio
+async def test_errors_propagate_to_all_waiters():
+    # Arrange
+    queue = RequestQueue()
+    send = AsyncMock(side_effect=TimeoutError)
+
+    # Act
+    results = await asyncio.gather(
+        queue.submit("getOutputData", AsyncMock(return_value=None)),
+        queue.submit("getAlarm", send),
+        queue.submit("getAlarm", send),
+        return_exceptions=True,
+    )
+
+    # Assert
+    assert results[0] is None
+    assert all(isinstance(result, TimeoutError) for result in results[1:])
+    assert send.await_count == 1
+    assert queue.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_ez1m_requests_are_serialized():
+    # Arrange
+    ez1m = APsystemsEZ1M(ip_address="0.0.0.0")
+    order = []
+    factory, in_flight = _recorder(order)
+
+    async def send(endpoint, retry):
+        return await factory(endpoint)()
+
+    ez1m._send = send
+
+    # Act
+    await asyncio.gather(ez1m._request("getOutputData"), ez1m._request("getAlarm"), ez1m._request("setOnOff?status=0"))
+
+    # Assert
+    assert in_flight["max"] == 1
+    assert order == ["getOutputData", "setOnOff?status=0", "getAlarm"]
+    assert APsystemsEZ1M(ip_address="0.0.0.0", max_in_flight=None).request_queue is None
+
+
+@pytest.mark.asyncio
+async def test_cancelled_requests_give_back_their_slot():
+    # Arrange
+    queue = RequestQueue()
+    order = []
+    factory, _ = _recorder(order, delay=10)
+    sent = asyncio.ensure_future(queue.submit("getOutputData", factory("getOutputData")))
+    queued = asyncio.ensure_future(queue.submit("getAlarm", factory("getAlarm")))
+    shared = asyncio.ensure_future(queue.submit("getAlarm", factory("getAlarm")))
+    await asyncio.sleep(0)
+
+    # Act
+    sent.cancel()
+    queued.cancel()
+    await asyncio.sleep(0.01)
+    depth = queue.depth
+    in_flight = queue.in_flight
+    shared.cancel()
+    await asyncio.sleep(0.01)
+
+    # Assert
+    assert (depth, in_flight) == (0, 1)
+    assert (queue.depth, queue.in_flight) == (0, 0)
+    assert order == []
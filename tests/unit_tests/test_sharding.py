@@ -0,0 +1,91 @@
+import asyncio
+import pytest
+from APsystemsEZ1 import ReturnAlarmInfo, ReturnOutputData
+from APsystemsEZ1.polling import PollRate
+from APsystemsEZ1.sharding import ShardedPoller, decode, encode
+from APsystemsEZ1.simulator import EZ1Simulator
+
+
+@pytest.mark.parametrize(
+    "method, value, test_id",
+    [
+        ("get_output_data", ReturnOutputData(p1=1.0, e1=2.0, te1=3.0, p2=4.0, e2=5.0, te2=6.0), "output_data"),
+        ("get_alarm_info", ReturnAlarmInfo(offgrid=False, shortcircuit_1=True, shortcircuit_2=False, operating=True), "alarm"),
+        ("get_max_power", 800, "max_power"),
+        ("get_output_data", None, "failed_poll"),
+    ],
+)
+def test_encode_decode_round_trip(method, value, test_id):
+    # Act
+    code, packed = encode(method, value)
+
+    # Assert
+    assert isinstance(code, int)
+    assert not isinstance(packed, (ReturnOutputData, ReturnAlarmInfo))
+    assert decode(code, packed) == (method, value)
+
+
+def test_add_and_rebalance():
+    # Arrange
+    moved = []
+    poller = ShardedPoller(
+        {f"inv{i}": f"10.0.0.{i}" for i in range(6)},
+        shards=3,
+        on_rebalance=lambda device, old, new: moved.append((device, old, new)),
+    )
+
+    # Act
+    poller.remove("inv0")
+    poller.remove("inv3")
+    added = poller.add("new", ("10.0.1.1", 8051))
+    poller.remove("inv1")
+    poller.remove("inv4")
+    moves = poller.rebalance()
+
+    # Assert
+    assert added == 0
+    assert sorted(len(devices) for devices in poller.shards) == [1, 1, 1]
+    assert moved == [(device, old, new) for device, (old, new) in moves.items()]
+    assert len(moves) == 1
+
+
+def test_unknown_rate_is_rejected():
+    with pytest.raises(ValueError, match="get_total_output"):
+        ShardedPoller({"inv": "10.0.0.1"}, shards=1, rates={"get_total_output": PollRate(5.0)})
+
+
+@pytest.mark.asyncio
+async def test_shards_poll_all_devices():
+    # Arrange
+    results = {}
+    rates = {method: None for method in ("get_alarm_info", "get_max_power", "get_device_power_status", "get_device_info")}
+    rates["get_output_data"] = PollRate(0.05)
+
+    async with EZ1Simulator() as simulator:
+        poller = ShardedPoller(
+            {f"inv{i}": ("127.0.0.1", simulator.port) for i in range(4)},
+            shards=2,
+            rates=rates,
+            on_result=lambda device, method, value: results.setdefault(device, value),
+            batch_interval=0.05,
+        )
+
+        # Act
+        task = asyncio.create_task(poller.run())
+        for _ in range(200):
+            await asyncio.sleep(0.05)
+            if len(results) == 4:
+                break
+        poller.add("late", ("127.0.0.1", simulator.port))
+        for _ in range(100):
+            await asyncio.sleep(0.05)
+            if "late" in results:
+                break
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    # Assert
+    assert set(results) == {"inv0", "inv1", "inv2", "inv3", "late"}
+    assert all(isinstance(value, ReturnOutputData) and value.p1 == 120.0 for value in results.values())
+    assert poller.batches <= poller.results
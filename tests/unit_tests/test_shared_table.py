@@ -0,0 +1,84 @@
+import multiprocessing
+import pytest
+from APsystemsEZ1 import ReturnAlarmInfo, ReturnOutputData
+from APsystemsEZ1.shared_table import SharedReadingsTable
+
+OK = ReturnAlarmInfo(offgrid=False, shortcircuit_1=False, shortcircuit_2=False, operating=True)
+
+
+def _output(value):
+    return ReturnOutputData(p1=value, e1=value, te1=value, p2=value, e2=value, te2=value)
+
+
+def _publish(name, updates):
+    table = SharedReadingsTable.attach(name, writer=True)
+    for value in range(1, updates + 1):
+        table.publish_output_data("inv", _output(float(value)))
+    table.close()
+
+
+@pytest.fixture
+def table():
+    with SharedReadingsTable.create(slots=4) as table:
+        yield table
+
+
+def test_readers_see_published_values(table):
+    # Arrange
+    table.on_result("inv1", "get_output_data", _output(100.0))
+    table.on_result("inv2", "get_alarm_info", OK)
+    table.on_result("inv2", "get_max_power", 800)
+    reader = SharedReadingsTable.attach(table.name)
+
+    # Act
+    inv1 = reader.get("inv1")
+    snapshot = reader.snapshot()
+
+    # Assert
+    assert inv1.output_data == _output(100.0) and inv1.output_updated is not None
+    assert inv1.alarm_info is None and inv1.alarm_updated is None
+    assert snapshot["inv2"].alarm_info == OK and snapshot["inv2"].output_data is None
+    assert reader.get("unknown") is None
+    table.publish_alarm_info("inv1", OK)
+    assert reader.get("inv1").alarm_info == OK
+    assert reader.get("inv1").output_data == _output(100.0)
+    reader.close()
+
+
+def test_slots_are_cache_line_aligned(table):
+    # Act
+    offsets = [table._offset(index) for index in range(table.slots)]
+
+    # Assert
+    assert all(offset % 64 == 0 for offset in offsets)
+
+
+@pytest.mark.parametrize(
+    "devices, test_id",
+    [(["a", "b", "c", "d", "e"], "full"), (["x" * 33], "name_too_long")],
+)
+def test_invalid_slots(table, devices, test_id):
+    with pytest.raises(ValueError):
+        for device in devices:
+            table.publish_alarm_info(device, OK)
+
+
+def test_reader_never_sees_torn_updates(table):
+    # Arrange
+    table.publish_output_data("inv", _output(0.0))
+    writer = multiprocessing.get_context("spawn").Process(target=_publish, args=(table.name, 20000))
+
+    # Act
+    writer.start()
+    torn = 0
+    reads = 0
+    while writer.is_alive() or reads == 0:
+        data = table.get("inv").output_data
+        reads += 1
+        torn += len({data.p1, data.e1, data.te1, data.p2, data.e2, data.te2}) != 1
+    writer.join()
+
+    # Assert
+    assert writer.exitcode == 0
+    assert reads > 1 and torn == 0
+    assert table.get("inv").output_data == _output(20000.0)
@@ -0,0 +1,128 @@
+import asyncio
+import datetime
+import pytest
+from unittest.mock import MagicMock
+from APsystemsEZ1 import APsystemsEZ1M
+from APsystemsEZ1.polling import PollRate, PollScheduler
+from APsystemsEZ1.simulator import EZ1Simulator
+from APsystemsEZ1.sun import NightMode, sun_times
+
+UTC = datetime.timezone.utc
+
+
+@pytest.mark.parametrize(
+    "day, latitude, longitude, sunrise, sunset, test_id",
+    [
+        (datetime.date(2024, 6, 21), 52.52, 13.405, (2, 43), (19, 33), "berlin_summer"),
+        (datetime.date(2024, 12, 21), 52.52, 13.405, (7, 15), (14, 54), "berlin_winter"),
+        (datetime.date(2024, 6, 21), 34.05, -118.24, (12, 42), (3, 8), "los_angeles_sunset_next_utc_day"),
+    ],
+)
+def test_sun_times(day, latitude, longitude, sunrise, sunset, test_id):
+    # Act
+    daylight = sun_times(day, latitude, longitude)
+
+    # Assert
+    def minutes(hour_minute):
+        return hour_minute[0] * 60 + hour_minute[1]
+
+    assert abs(daylight.start.hour * 60 + daylight.start.minute - minutes(sunrise)) <= 5
+    assert abs(daylight.end.hour * 60 + daylight.end.minute - minutes(sunset)) <= 5
+
+
+def test_polar_night_and_midnight_sun():
+    assert sun_times(datetime.date(2024, 12, 21), 69.65, 18.96) is None
+    midnight_sun = sun_times(datetime.date(2024, 6, 21), 69.65, 18.96)
+    assert midnight_sun.end - midnight_sun.start == datetime.timedelta(days=1)
+
+
+@pytest.mark.parametrize(
+    "now, night_interval, expected_pause, test_id",
+    [
+        (datetime.datetime(2024, 6, 21, 12, 0, tzinfo=UTC), None, 0.0, "day"),
+        (datetime.datetime(2024, 6, 21, 2, 30, tzinfo=UTC), None, 0.0, "within_morning_margin"),
+        (datetime.datetime(2024, 6, 21, 23, 0, tzinfo=UTC), None, 3.2 * 3600, "night"),
+        (datetime.datetime(2024, 6, 21, 23, 0, tzinfo=UTC), 900, 900, "night_reduced_polling"),
+    ],
+)
+def test_night_mode_pause(now, night_interval, expected_pause, test_id):
+    # Arrange
+    night_mode = NightMode(52.52, 13.405, night_interval=night_interval)
+
+    # Act
+    pause = night_mode.pause(now)
+
+    # Assert
+    assert pause == pytest.approx(expected_pause, abs=300)
+
+
+def test_night_mode_west_longitude_evening():
+    night_mode = NightMode(34.05, -118.24, margin=datetime.timedelta(0))
+    assert not night_mode.is_night(datetime.datetime(2024, 6, 22, 2, 0, tzinfo=UTC))
+    assert night_mode.is_night(datetime.datetime(2024, 6, 22, 4, 0, tzinfo=UTC))
+
+
+@pytest.mark.asyncio
+async def test_scheduler_suspends_at_night_and_wakes_with_probe():
+    # Arrange
+    night_mode = MagicMock()
+    night_mode.night_interval = None
+    night_mode.pause.side_effect = [0.05] + [0.0] * 100
+    results = []
+
+    async with EZ1Simulator() as simulator:
+        ez1m = APsystemsEZ1M("127.0.0.1", simulator.port, enable_debounce=True)
+        await ez1m.get_max_power()  # warm up the lazily imported HTTP stack
+        ez1m._e1.base_state = 3.1
+        scheduler = PollScheduler(
+            {"inv": ez1m},
+            rates={method: None for method in ("get_alarm_info", "get_max_power", "get_device_power_status", "get_device_info")}
+            | {"get_output_data": PollRate(10.0)},
+            on_result=lambda device, method, value: results.append(value),
+            night_mode=night_mode,
+        )
+
+        # Act
+        task = asyncio.create_task(scheduler.run())
+        await asyncio.sleep(0.02)
+        asleep = set(scheduler.asleep)
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    # Assert
+    assert asleep == {"inv"}
+    assert scheduler.asleep == set()
+    assert len(results) == 1
+    assert results[0].e1 == 0.5
+
+
+@pytest.mark.asyncio
+async def test_scheduler_polls_at_night_interval():
+    # Arrange
+    night_mode = MagicMock()
+    night_mode.night_interval = 0.03
+    night_mode.pause.return_value = 0.03
+    results = []
+
+    async with EZ1Simulator() as simulator:
+        ez1m = APsystemsEZ1M("127.0.0.1", simulator.port)
+        scheduler = PollScheduler(
+            {"inv": ez1m},
+            rates={method: None for method in ("get_alarm_info", "get_max_power", "get_device_power_status", "get_device_info")}
+            | {"get_output_data": PollRate(0.01)},
+            on_result=lambda device, method, value: results.append(value),
+            night_mode=night_mode,
+        )
+
+        # Act
+        task = asyncio.create_task(scheduler.run())
+        await asyncio.sleep(0.25)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    # Assert
+    assert 2 <= len(results) <= 8
+    assert all(result is not None for result in results)
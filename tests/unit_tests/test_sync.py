@@ -0,0 +1,88 @@
+import time
+
+import pytest
+from APsystemsEZ1 import ReturnOutputData
+from APsystemsEZ1.simulator import EZ1Simulator
+from APsystemsEZ1.sync import BackgroundLoop, SyncAPsystemsEZ1M, SyncFleet
+
+
+@pytest.fixture
+def simulator():
+    with BackgroundLoop() as server:
+        simulator = EZ1Simulator()
+        server.run(simulator.start())
+        yield simulator
+        server.run(simulator.stop())
+
+
+def test_calls_reuse_one_connection(simulator):
+    # Arrange
+    with SyncAPsystemsEZ1M("127.0.0.1", simulator.port) as inverter:
+
+        # Act
+        output_data = inverter.get_output_data()
+        power = inverter.get_total_output()
+        limit = inverter.set_max_power(600)
+
+    # Assert
+    assert isinstance(output_data, ReturnOutputData)
+    assert power == 250.0
+    assert limit == 600
+    assert simulator.connections == 1
+
+
+def test_batch(simulator):
+    # Arrange
+    with SyncAPsystemsEZ1M("127.0.0.1", simulator.port, max_in_flight=None) as inverter:
+
+        # Act
+        results = inverter.batch(["get_max_power", ("set_device_power_status", False), "get_total_energy_today"])
+
+    # Assert
+    assert results == [800, False, 1.1]
+
+
+def test_fleet_shares_loop_and_session(simulator):
+    # Arrange
+    inverters = {"a": ("127.0.0.1", simulator.port), "b": ("127.0.0.1", simulator.port), "down": ("127.0.0.1", 1)}
+
+    with SyncFleet(inverters, timeout=2) as fleet:
+
+        # Act
+        powers = fleet.call("get_total_output", devices=["a", "b"])
+        down = fleet.call("get_max_power", devices=["down"])
+        batch = fleet.batch([("a", "get_max_power"), ("b", ("set_max_power", 500))])
+        single = fleet["a"].get_max_power()
+
+    # Assert
+    assert powers == {"a": 250.0, "b": 250.0}
+    assert isinstance(down["down"], Exception)
+    assert batch == [800, 500]
+    assert single == 500
+    assert fleet["a"].ez1m.session is fleet["b"].ez1m.session
+
+
+def test_timed_out_calls_free_request_slot(simulator):
+    # Arrange
+    simulator.latency = 2.0
+    with SyncFleet({"a": ("127.0.0.1", simulator.port)}, call_timeout=0.1) as fleet:
+        inverter = fleet["a"]
+
+        # Act
+        with pytest.raises(TimeoutError):
+            inverter.get_max_power()
+        with pytest.raises(TimeoutError):
+            inverter.batch(["get_max_power"])
+        with pytest.raises(TimeoutError):
+            fleet.call("get_max_power")
+        for _ in range(20):
+            if not inverter.ez1m.request_queue.in_flight:
+                break
+            time.sleep(0.01)
+        in_flight = inverter.ez1m.request_queue.in_flight
+        simulator.latency = 0.0
+        limit = inverter.get_max_power()
+
+    # Assert
+    assert in_flight == 0
+    assert limit == 800
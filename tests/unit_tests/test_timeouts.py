@@ -0,0 +1,103 @@
+import asyncio
+import socket
+import pytest
+from unittest.mock import AsyncMock
+from APsystemsEZ1 import APsystemsEZ1M, InverterUnreachableError, RequestTimeout
+from APsystemsEZ1.simulator import EZ1Simulator
+from APsystemsEZ1.transport import AiohttpTransport, RawHTTPTransport
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.mark.asyncio
+async def test_endpoint_timeout_overrides():
+    # Arrange
+    transport = AsyncMock()
+    transport.get.return_value = (200, {"data": {"maxPower": "600"}, "message": "SUCCESS"})
+    write_timeout = RequestTimeout(total=30, connect=1)
+    ez1m = APsystemsEZ1M("0.0.0.0", timeout=5, transport=transport, endpoint_timeouts={"setMaxPower": write_timeout})
+
+    # Act
+    await ez1m.get_max_power()
+    await ez1m.set_max_power(600)
+
+    # Assert
+    assert [call.args[1] for call in transport.get.await_args_list] == [5, write_timeout]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("transport_type", [RawHTTPTransport, AiohttpTransport])
+async def test_first_byte_timeout(transport_type):
+    # Arrange
+    transport = transport_type()
+
+    async with EZ1Simulator(latency=0.3) as simulator:
+        ez1m = APsystemsEZ1M("127.0.0.1", simulator.port, transport=transport, timeout=RequestTimeout(total=5, connect=1, first_byte=0.05))
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+
+        # Act
+        with pytest.raises(asyncio.TimeoutError):
+            await ez1m.get_output_data()
+        elapsed = loop.time() - started
+        await transport.close()
+
+    # Assert
+    assert elapsed < 0.25
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("transport_type", [RawHTTPTransport, AiohttpTransport])
+async def test_first_byte_timeout_does_not_limit_body(transport_type):
+    # Arrange
+    body = b'{"data": {"maxPower": "600"}, "message": "SUCCESS"}'
+
+    async def handle(reader, writer):
+        await reader.readuntil(b"\r\n\r\n")
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: %d\r\n\r\n" % len(body))
+        await writer.drain()
+        await asyncio.sleep(0.2)
+        writer.write(body)
+        await writer.drain()
+        writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    transport = transport_type()
+    timeout = RequestTimeout(total=5, connect=1, first_byte=0.1)
+    ez1m = APsystemsEZ1M("127.0.0.1", server.sockets[0].getsockname()[1], transport=transport, timeout=timeout)
+
+    # Act
+    async with server:
+        max_power = await ez1m.get_max_power()
+    await transport.close()
+
+    # Assert
+    assert max_power == 600
+
+
+@pytest.mark.asyncio
+async def test_reachability_probe_short_circuits_dead_host():
+    # Arrange
+    port = _free_port()
+    transport = RawHTTPTransport()
+    ez1m = APsystemsEZ1M("127.0.0.1", port, transport=transport, probe_reachability=True, probe_interval=0.05)
+
+    # Act / Assert
+    with pytest.raises(OSError):
+        await ez1m.get_output_data()
+    with pytest.raises(InverterUnreachableError):
+        await ez1m.get_output_data()
+
+    async with EZ1Simulator(port=port) as simulator:
+        with pytest.raises(InverterUnreachableError):
+            await ez1m.get_output_data()
+        assert simulator.connections == 0
+        await asyncio.sleep(0.06)
+        output_data = await ez1m.get_output_data()
+        await transport.close()
+
+    assert output_data is not None
@@ -0,0 +1,134 @@
+import asyncio
+
+import pytest
+from APsystemsEZ1 import APsystemsEZ1M, InverterHTTPError, ReturnOutputData
+from APsystemsEZ1.simulator import EZ1Simulator
+from APsystemsEZ1.transport import RawHTTPTransport, RecordingTransport, ReplayTransport, TransportError
+
+
+@pytest.mark.asyncio
+async def test_raw_transport_reuses_connection():
+    # Arrange
+    transport = RawHTTPTransport()
+
+    async with EZ1Simulator() as simulator:
+        url = f"http://127.0.0.1:{simulator.port}/getMaxPower"
+
+        # Act
+        results = [await transport.get(url, timeout=1) for _ in range(5)]
+        await transport.close()
+
+    # Assert
+    assert all(result == (200, {"data": {"maxPower": "800"}, "message": "SUCCESS", "deviceId": "E07000000001"}) for result in results)
+    assert simulator.requests == 5
+    assert simulator.connections == 1
+
+
+@pytest.mark.asyncio
+async def test_raw_transport_reconnects_dropped_idle_connection():
+    # Arrange
+    transport = RawHTTPTransport()
+
+    async with EZ1Simulator() as simulator:
+        url = f"http://127.0.0.1:{simulator.port}/getOnOff"
+        await transport.get(url, timeout=1)
+        for writer in list(simulator._handlers.values()):
+            writer.close()
+
+        # Act
+        status, body = await transport.get(url, timeout=1)
+        await transport.close()
+
+    # Assert
+    assert status == 200
+    assert body["data"] == {"status": "0"}
+    assert simulator.connections == 2
+
+
+@pytest.mark.asyncio
+async def test_raw_transport_rejects_body_that_is_not_json():
+    # Arrange
+    async def handle(reader, writer):
+        await reader.readuntil(b"\r\n\r\n")
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/plain\r\nContent-Length: 5\r\n\r\nhello")
+        await writer.drain()
+        writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    transport = RawHTTPTransport()
+    ez1m = APsystemsEZ1M("127.0.0.1", port=port, transport=transport)
+
+    # Act / Assert
+    async with server:
+        with pytest.raises(TransportError):
+            await ez1m.get_max_power()
+    await transport.close()
+
+
+@pytest.mark.asyncio
+async def test_ez1m_with_raw_transport():
+    # Arrange
+    transport = RawHTTPTransport()
+
+    async with EZ1Simulator() as simulator:
+        ez1m = APsystemsEZ1M("127.0.0.1", port=simulator.port, transport=transport)
+
+        # Act
+        output_data = await ez1m.get_output_data()
+        max_power = await ez1m.set_max_power(600)
+        with pytest.raises(InverterHTTPError) as error:
+            await ez1m._request("doesNotExist")
+        await transport.close()
+
+    # Assert
+    assert output_data == ReturnOutputData(p1=120.0, e1=0.5, te1=80.2, p2=130.0, e2=0.6, te2=82.4)
+    assert max_power == 600
+    assert simulator.max_power == 600
+    assert error.value.status == 404
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("file_name", ["traffic.jsonl", "traffic.jsonl.gz"])
+async def test_record_and_replay(tmp_path, file_name):
+    # Arrange
+    path = tmp_path / file_name
+
+    async with EZ1Simulator() as simulator:
+        recorder = RecordingTransport(RawHTTPTransport(), path)
+        ez1m = APsystemsEZ1M("127.0.0.1", port=simulator.port, transport=recorder, enable_debounce=True)
+        recorded = [await ez1m.get_output_data()]
+        simulator.output_data["e1"] = 0.1
+        recorded.append(await ez1m.get_output_data())
+        recorded.append(await ez1m.set_max_power(500))
+        await recorder.close()
+
+    # Act
+    replay = ReplayTransport(path)
+    ez1m = APsystemsEZ1M("192.168.1.100", transport=replay, enable_debounce=True)
+    replayed = [await ez1m.get_output_data(), await ez1m.get_output_data(), await ez1m.set_max_power(500)]
+
+    # Assert
+    assert len(replay) == 3
+    assert replayed == recorded
+    assert replayed[1].e1 == pytest.approx(0.6)
+    with pytest.raises(TransportError):
+        await ez1m.get_output_data()
+
+
+@pytest.mark.asyncio
+async def test_replay_errors_latency_and_loop(tmp_path):
+    # Arrange
+    path = tmp_path / "traffic.jsonl"
+    path.write_text(
+        '{"t":0.0,"endpoint":"getOnOff","error":"TimeoutError","elapsed":10.0}\n'
+        '{"t":1.0,"endpoint":"getOnOff","status":200,"body":{"data":{"status":"1"},"message":"SUCCESS"},"elapsed":0.02}\n'
+    )
+    replay = ReplayTransport(path, speed=1.0, loop=True)
+
+    # Act / Assert
+    with pytest.raises(TimeoutError):
+        await replay.get("http://0.0.0.0:8050/getOnOff", timeout=0.01)
+    assert await replay.get("http://0.0.0.0:8050/getOnOff", timeout=1) == (200, {"data": {"status": "1"}, "message": "SUCCESS"})
+    with pytest.raises(TimeoutError):
+        await replay.get("http://0.0.0.0:8050/getOnOff", timeout=0.01)
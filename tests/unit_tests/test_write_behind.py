@@ -0,0 +1,131 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+from APsystemsEZ1 import APsystemsEZ1M
+from APsystemsEZ1.write_behind import WriteBehind
+
+
+@pytest.fixture
+def ez1m():
+    ez1m = APsystemsEZ1M(ip_address="0.0.0.0")
+    ez1m.set_max_power = AsyncMock(side_effect=lambda power_limit: power_limit)
+    ez1m.set_device_power_status = AsyncMock(side_effect=lambda power_status: power_status)
+    ez1m.get_max_power = AsyncMock(return_value=800)
+    ez1m.get_device_power_status = AsyncMock(return_value=True)
+    return ez1m
+
+
+@pytest.mark.asyncio
+async def test_only_latest_setpoint_is_written(ez1m):
+    # Arrange
+    write_behind = WriteBehind(ez1m, min_interval=0.0)
+
+    # Act
+    for power_limit in (300, 400, 500, 600):
+        await write_behind.set_max_power(power_limit)
+    await write_behind.flush()
+
+    # Assert
+    assert [call.args[0] for call in ez1m.set_max_power.await_args_list] == [600]
+    assert write_behind.max_power.confirmed == 600
+    assert write_behind.stats.superseded == 3
+
+
+@pytest.mark.asyncio
+async def test_no_op_writes_are_skipped(ez1m):
+    # Arrange
+    write_behind = WriteBehind(ez1m, min_interval=0.0)
+    await write_behind.refresh()
+
+    # Act
+    await write_behind.set_max_power(800)
+    await write_behind.set_device_power_status(True)
+    await write_behind.flush()
+
+    # Assert
+    ez1m.set_max_power.assert_not_awaited()
+    ez1m.set_device_power_status.assert_not_awaited()
+    assert write_behind.stats.skipped == 2
+
+
+@pytest.mark.asyncio
+async def test_min_interval_between_writes(ez1m):
+    # Arrange
+    write_behind = WriteBehind(ez1m, min_interval=0.05)
+
+    # Act
+    await write_behind.set_max_power(500)
+    await write_behind.flush()
+    await write_behind.set_max_power(600)
+    await asyncio.sleep(0.01)
+    written_early = ez1m.set_max_power.await_count
+    await write_behind.flush()
+
+    # Assert
+    assert written_early == 1
+    assert ez1m.set_max_power.await_count == 2
+    assert write_behind.max_power.desired == write_behind.max_power.confirmed == 600
+    assert not write_behind.max_power.pending
+
+
+@pytest.mark.asyncio
+async def test_reverted_setpoint_is_not_written(ez1m):
+    # Arrange
+    write_behind = WriteBehind(ez1m, min_interval=0.05)
+    await write_behind.set_max_power(200)
+    await write_behind.flush()
+
+    # Act
+    await write_behind.set_max_power(300)
+    await write_behind.set_max_power(200)
+    await write_behind.flush()
+
+    # Assert
+    assert [call.args[0] for call in ez1m.set_max_power.await_args_list] == [200]
+    assert write_behind.max_power.confirmed == 200
+    assert not write_behind.max_power.pending
+
+
+@pytest.mark.asyncio
+async def test_invalid_power_limit(ez1m):
+    write_behind = WriteBehind(ez1m)
+    with pytest.raises(ValueError):
+        await write_behind.set_max_power(9000)
+
+
+@pytest.mark.asyncio
+async def test_clamped_confirmation_is_not_rewritten(ez1m):
+    # Arrange
+    ez1m.set_max_power = AsyncMock(return_value=590)
+    write_behind = WriteBehind(ez1m, min_interval=0.01)
+
+    # Act
+    await write_behind.set_max_power(600)
+    await write_behind.flush()
+    await asyncio.sleep(0.05)
+
+    # Assert
+    assert ez1m.set_max_power.await_count == 1
+    assert write_behind.max_power.confirmed == 590
+    assert not write_behind.max_power.failed
+
+
+@pytest.mark.asyncio
+async def test_failing_writes_give_up_with_backoff(ez1m):
+    # Arrange
+    ez1m.set_max_power = AsyncMock(side_effect=TimeoutError)
+    write_behind = WriteBehind(ez1m, min_interval=0.0, max_attempts=3, retry_delay=0.01)
+    loop = asyncio.get_running_loop()
+
+    # Act
+    started = loop.time()
+    await write_behind.set_max_power(600)
+    await write_behind.flush()
+    elapsed = loop.time() - started
+
+    # Assert
+    assert ez1m.set_max_power.await_count == 3
+    assert elapsed >= 0.03
+    assert write_behind.max_power.failed
+    assert isinstance(write_behind.max_power.last_error, TimeoutError)
+    assert write_behind.stats.failed == 1